@@ -41,6 +41,61 @@ class Settings:
     # Guest mode (skip auth for demo/preview)
     GUEST_MODE: bool = os.getenv("GUEST_MODE", "false").lower() == "true"
 
+    # Identity cache (email -> Student) shared by auth middleware/dependencies
+    IDENTITY_CACHE_SIZE: int = int(os.getenv("IDENTITY_CACHE_SIZE", "1024"))
+    IDENTITY_CACHE_TTL_SECONDS: float = float(
+        os.getenv("IDENTITY_CACHE_TTL_SECONDS", "30")
+    )
+
+    # Seconds between checks that the in-memory attribute rule snapshot is current
+    RULE_SNAPSHOT_CHECK_SECONDS: float = float(
+        os.getenv("RULE_SNAPSHOT_CHECK_SECONDS", "2")
+    )
+
+    # Seconds between checks that the in-memory "achievement earned" bitsets are current
+    ACHIEVEMENT_CACHE_CHECK_SECONDS: float = float(
+        os.getenv("ACHIEVEMENT_CACHE_CHECK_SECONDS", "2")
+    )
+
+    # Daily login tracking is written behind in batches (seconds between flushes)
+    LOGIN_FLUSH_INTERVAL_SECONDS: float = float(
+        os.getenv("LOGIN_FLUSH_INTERVAL_SECONDS", "5")
+    )
+
+    # SQLite tuning, applied to every new connection (see app/sqlite_tuning.py)
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Negative = KiB (-20000 ~ 20 MB page cache per connection)
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", "134217728"))
+    SQLITE_TEMP_STORE: str = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+    # Seconds between background PASSIVE WAL checkpoints (0 = disabled)
+    SQLITE_WAL_CHECKPOINT_SECONDS: float = float(
+        os.getenv("SQLITE_WAL_CHECKPOINT_SECONDS", "300")
+    )
+
+    # Warn when one request repeats the same SQL statement this often (0 = off)
+    QUERY_REPEAT_WARN_THRESHOLD: int = int(
+        os.getenv("QUERY_REPEAT_WARN_THRESHOLD", "10")
+    )
+
+    # TronClass Excel uploads are parsed as a stream, so this only bounds disk/upload size
+    EXCEL_MAX_UPLOAD_MB: int = int(os.getenv("EXCEL_MAX_UPLOAD_MB", "50"))
+
+    # CPU-bound workbook parsing runs in a process pool (0 workers = thread fallback)
+    PARSE_POOL_WORKERS: int = int(os.getenv("PARSE_POOL_WORKERS", "2"))
+    PARSE_POOL_MAX_JOBS: int = int(os.getenv("PARSE_POOL_MAX_JOBS", "2"))
+    PARSE_POOL_TIMEOUT_SECONDS: float = float(
+        os.getenv("PARSE_POOL_TIMEOUT_SECONDS", "120")
+    )
+
+    # Excel preview results kept for commit (in-memory LRU size, seconds until expiry)
+    IMPORT_TOKEN_CACHE_SIZE: int = int(os.getenv("IMPORT_TOKEN_CACHE_SIZE", "16"))
+    IMPORT_TOKEN_TTL_SECONDS: float = float(
+        os.getenv("IMPORT_TOKEN_TTL_SECONDS", "1800")
+    )
+
     # Cloudflare
     CF_AUTH_HEADER: str = os.getenv(
         "CF_AUTH_HEADER", "cf-access-authenticated-user-email"
@@ -1,11 +1,22 @@
 """Async SQLAlchemy database engine, session factory, and utilities."""
 
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import Pool
 
 from app.config import settings
+from app.sqlite_tuning import WalCheckpointScheduler, install_sqlite_pragmas
 
 engine = create_async_engine(settings.DATABASE_URL, echo=settings.APP_DEBUG)
+install_sqlite_pragmas(engine)
+
+wal_checkpointer = WalCheckpointScheduler(
+    engine, interval=settings.SQLITE_WAL_CHECKPOINT_SECONDS
+)
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -15,12 +26,99 @@ class Base(DeclarativeBase):
 
 
 async def init_db() -> None:
-    """Create all tables defined by ORM models."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Create missing tables and apply pending migrations (see app.migrations).
+
+    Skips all DDL when the stored schema fingerprint is already current.
+    """
+    from app.migrations import upgrade
+
+    await upgrade(engine)
+
+
+class RequestSession:
+    """One lazily opened AsyncSession shared by everything serving a request.
+
+    ``AuthMiddleware`` puts an instance on ``request.state.db`` and closes it
+    once the response has been sent; ``get_db`` hands out the same session,
+    so the middleware, ``get_current_user`` and the route share one identity
+    map and one connection checkout.
+    """
 
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
 
-async def get_db():
-    """FastAPI dependency that yields an async database session."""
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def get(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+async def get_db(request: Request):
+    """FastAPI dependency that yields an async database session.
+
+    Reuses the request-scoped session opened by ``AuthMiddleware`` when there
+    is one; otherwise (no middleware, e.g. a bare app) opens its own.
+    """
+    request_session = getattr(request.state, "db", None)
+    if request_session is not None:
+        yield request_session.get()
+        return
     async with async_session() as session:
         yield session
+
+
+# ---------------------------------------------------------------------------
+# Connection checkout metrics
+# ---------------------------------------------------------------------------
+
+
+class ConnectionMetrics:
+    """Pool checkouts per HTTP request, fed by ``AuthMiddleware``."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.checkouts = 0
+        self.max_per_request = 0
+
+    def record(self, checkouts: int) -> None:
+        self.requests += 1
+        self.checkouts += checkouts
+        self.max_per_request = max(self.max_per_request, checkouts)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "checkouts": self.checkouts,
+            "avg_per_request": (
+                round(self.checkouts / self.requests, 3) if self.requests else 0.0
+            ),
+            "max_per_request": self.max_per_request,
+        }
+
+
+connection_metrics = ConnectionMetrics()
+
+# Mutable one-element counter for the request currently being served
+request_checkouts: ContextVar[list[int] | None] = ContextVar(
+    "request_checkouts", default=None
+)
+
+
+@event.listens_for(Pool, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    counter = request_checkouts.get()
+    if counter is not None:
+        counter[0] += 1
@@ -7,6 +7,7 @@ from app.config import settings
 from app.database import get_db
 from app.models.student import Student
 from app.services.auth import get_user_by_email
+from app.services.identity_cache import identity_cache
 
 
 async def get_current_user_or_guest(
@@ -33,13 +34,24 @@ async def get_current_user_or_guest(
 
 
 async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)) -> Student:
-    """Require an authenticated and registered user. Returns Student."""
+    """Require an authenticated and registered user. Returns Student.
+
+    Reuses the Student already resolved by ``AuthMiddleware`` (or the shared
+    identity cache) and attaches it to *db* without re-querying, so routes
+    can mutate and commit it as usual.
+    """
     email = request.state.user_email
     if not email:
         raise HTTPException(status_code=401, detail="Not authenticated")
+
+    resolved = getattr(request.state, "user", None) or identity_cache.get(email)
+    if resolved is not None and resolved.email == email:
+        return await db.merge(resolved, load=False)
+
     user = await get_user_by_email(db, email)
     if user is None:
         raise HTTPException(status_code=403, detail="Not registered")
+    identity_cache.put(user)
     return user
 
 
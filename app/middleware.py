@@ -1,56 +1,209 @@
 """Auth middleware - resolves Cloudflare user on every request."""
 
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response, RedirectResponse
+import logging
+import re
+from collections.abc import Iterable
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.responses import RedirectResponse
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import settings
-from app.database import async_session
-from app.services.auth import get_user_by_email, track_daily_login
+from app.database import (
+    RequestSession,
+    async_session,
+    connection_metrics,
+    request_checkouts,
+)
+from app.query_stats import QueryStats, track_queries
+from app.services.auth import get_user_by_email
+from app.services.identity_cache import identity_cache
+from app.services.login_tracker import login_tracker
+
+logger = logging.getLogger(__name__)
 
 # Paths that don't require a registered user
 PUBLIC_PATHS = frozenset({"/register", "/static", "/api/internal", "/api/images/proxy", "/api/images/card", "/logout"})
 
+# Paths that never look at the user at all: no identity lookup, no daily-login
+# write. Mount points (e.g. StaticFiles at /static) are added automatically.
+BYPASS_PATHS = frozenset({"/static", "/api/images", "/api/internal"})
+
+ROUTE_BYPASS = "bypass"
+ROUTE_PUBLIC = "public"
+ROUTE_PROTECTED = "protected"
+
+
+def _prefix_pattern(prefixes: Iterable[str]) -> re.Pattern[str] | None:
+    """Compile path prefixes into one anchored regex matching whole segments."""
+    cleaned = sorted({p.rstrip("/") for p in prefixes if p.rstrip("/")}, key=len, reverse=True)
+    if not cleaned:
+        return None
+    alternation = "|".join(re.escape(p) for p in cleaned)
+    return re.compile(rf"^(?:{alternation})(?:/|$)")
+
+
+class RouteClassifier:
+    """Precompiled path-prefix matcher deciding how much auth work a path needs.
+
+    - ``bypass``:    static assets, image proxies, VM callbacks — skip the DB
+    - ``public``:    resolve the user if possible but never redirect
+    - ``protected``: resolve the user and redirect unregistered visitors
+    """
+
+    def __init__(
+        self,
+        bypass_prefixes: Iterable[str] = BYPASS_PATHS,
+        public_prefixes: Iterable[str] = PUBLIC_PATHS,
+    ) -> None:
+        self._bypass = _prefix_pattern(bypass_prefixes)
+        self._public = _prefix_pattern(public_prefixes)
+
+    @classmethod
+    def for_app(cls, app: ASGIApp) -> "RouteClassifier":
+        """Build a classifier from the default prefixes plus the app's mounts."""
+        mounts = [
+            route.path
+            for route in getattr(app, "routes", [])
+            if isinstance(route, Mount) and route.path
+        ]
+        return cls(bypass_prefixes=BYPASS_PATHS | set(mounts))
+
+    def classify(self, path: str) -> str:
+        if self._bypass is not None and self._bypass.match(path):
+            return ROUTE_BYPASS
+        if self._public is not None and self._public.match(path):
+            return ROUTE_PUBLIC
+        return ROUTE_PROTECTED
+
+
+_default_classifier = RouteClassifier()
+
 
 def _is_public(path: str) -> bool:
-    return any(path.startswith(p) for p in PUBLIC_PATHS)
+    return _default_classifier.classify(path) != ROUTE_PROTECTED
+
 
+def _log_query_stats(scope: Scope, stats: QueryStats) -> None:
+    if not stats.count:
+        return
+    method, path = scope["method"], scope["path"]
+    logger.debug(
+        "%s %s: %d queries, %.1f ms in DB", method, path, stats.count, stats.duration * 1000
+    )
+    for statement, times in stats.repeated(settings.QUERY_REPEAT_WARN_THRESHOLD):
+        logger.warning(
+            "Possible N+1 on %s %s: statement ran %d times: %s",
+            method, path, times, " ".join(statement.split())[:200],
+        )
 
-class AuthMiddleware(BaseHTTPMiddleware):
+
+class AuthMiddleware:
     """Resolve CF-authenticated email -> local user on every request.
 
     Sets ``request.state.user`` (Student | None) and
     ``request.state.user_email`` (str | None).
 
-    The session factory can be overridden via ``app.state.session_factory``
-    for testing purposes.
+    Also opens the request-scoped ``RequestSession`` (``request.state.db``)
+    that ``get_db`` reuses, and records pool checkouts per request in
+    ``connection_metrics``. SQL statements are counted per request and
+    reported as a ``Server-Timing`` header. The session factory can be
+    overridden via ``app.state.session_factory`` for testing purposes.
+
+    Lookups go through ``identity_cache`` first; the database is only hit on
+    a cache miss. The daily login is handed to ``login_tracker``, which
+    records it in a later batched write instead of on the request path. Paths
+    classified as ``bypass`` (see ``RouteClassifier``) skip resolution
+    entirely; pass ``fast_path=False`` to resolve on every path.
+
+    Implemented as plain ASGI rather than ``BaseHTTPMiddleware`` so responses
+    (CSV exports, image proxy) stream straight through without an extra task
+    and memory stream per request.
     """
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        email = request.headers.get(settings.CF_AUTH_HEADER)
-        request.state.user_email = email
-        request.state.user = None
+    def __init__(self, app: ASGIApp, *, fast_path: bool = True) -> None:
+        self.app = app
+        self.fast_path = fast_path
+        self._classifier: RouteClassifier | None = None
+
+    def _classify(self, conn: HTTPConnection) -> str:
+        if self._classifier is None:
+            # Built lazily: mounts are registered after add_middleware()
+            self._classifier = RouteClassifier.for_app(conn.app)
+        route_class = self._classifier.classify(conn.url.path)
+        if route_class == ROUTE_BYPASS and not self.fast_path:
+            return ROUTE_PUBLIC
+        return route_class
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # HTTPConnection.state writes through to scope["state"], which is what
+        # every downstream Request(scope).state reads from.
+        conn = HTTPConnection(scope)
+        # Use overridable session factory (for tests) or default
+        session_factory = getattr(
+            conn.app.state, "session_factory", None
+        ) or async_session
+        request_session = RequestSession(session_factory)
+        conn.state.db = request_session
+
+        checkouts = [0]
+        token = request_checkouts.set(checkouts)
+        with track_queries() as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing())
+                await send(message)
+
+            try:
+                await self._dispatch(conn, scope, receive, send_with_timing)
+            finally:
+                await request_session.close()
+                request_checkouts.reset(token)
+                connection_metrics.record(checkouts[0])
+        _log_query_stats(scope, stats)
+
+    async def _dispatch(
+        self, conn: HTTPConnection, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        email = conn.headers.get(settings.CF_AUTH_HEADER)
+        conn.state.user_email = email
+        conn.state.user = None
+
+        route_class = self._classify(conn)
+        if route_class == ROUTE_BYPASS:
+            await self.app(scope, receive, send)
+            return
 
         if email:
-            # Use overridable session factory (for tests) or default
-            session_factory = getattr(
-                request.app.state, "session_factory", None
-            ) or async_session
-            async with session_factory() as db:
-                user = await get_user_by_email(db, email)
+            user = identity_cache.get(email)
+            if user is None:
+                # Loaded into the request session, so get_current_user and
+                # the route see this very instance.
+                user = await get_user_by_email(conn.state.db.get(), email)
                 if user:
-                    await track_daily_login(db, user)
-                request.state.user = user
+                    identity_cache.put(user)
+            if user:
+                # Daily login / bonus is written behind by the tracker
+                login_tracker.observe(user)
+            conn.state.user = user
 
             # Redirect unregistered users to registration page
             # (skip redirect in guest mode so visitors can browse)
             if (
                 user is None
-                and not _is_public(request.url.path)
+                and route_class == ROUTE_PROTECTED
                 and not settings.GUEST_MODE
             ):
-                return RedirectResponse(url="/register", status_code=302)
+                response = RedirectResponse(url="/register", status_code=302)
+                await response(scope, receive, send)
+                return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
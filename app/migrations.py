@@ -0,0 +1,314 @@
+"""Versioned schema migrations with a fast fingerprint check at startup.
+
+``init_db`` calls ``upgrade(engine)`` on every boot. The fast path is a
+single ``SELECT`` on ``schema_version``: when the newest applied version is
+the latest one below *and* its stored fingerprint matches the fingerprint of
+the current ORM metadata, nothing else runs — no ``create_all``, no table
+reflection, no DDL.
+
+Otherwise, under an exclusive write lock (``BEGIN IMMEDIATE`` on SQLite, so
+several worker processes booting together never race on DDL):
+
+1. ``Base.metadata.create_all`` creates tables that do not exist yet;
+2. every migration newer than the stored version is applied in order;
+3. the new version and fingerprint are recorded.
+
+Migrations must be idempotent: databases in the wild have had some of the
+old one-off ``scripts/migrate_add_*.py`` scripts applied by hand, and fresh
+databases already get the final shape from ``create_all``.
+
+Adding a migration: append a ``Migration`` with the next version number.
+Changing a model without a migration still works for new tables / indexes
+(``create_all`` picks them up once the fingerprint changes) but not for new
+columns on existing tables — those need an ``_add_columns`` migration.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateIndex
+
+import app.models  # noqa: F401  (register every table on Base.metadata)
+from app.database import Base
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {col["name"] for col in inspect(conn).get_columns(table)}
+
+
+def _add_columns(conn: Connection, table: str, columns: list[tuple[str, str]]) -> list[str]:
+    """ALTER TABLE ADD COLUMN for each (name, DDL type) not already present."""
+    existing = _columns(conn, table)
+    added = []
+    for name, ddl in columns:
+        if name in existing:
+            continue
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+        added.append(name)
+    if added:
+        logger.info("Added columns %s to %s.", added, table)
+    return added
+
+
+def _create_model_indexes(conn: Connection, *tables: str) -> None:
+    for table in tables:
+        for index in sorted(Base.metadata.tables[table].indexes, key=lambda i: i.name):
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# ---------------------------------------------------------------------------
+# Migrations (ported from the one-off scripts/migrate_add_*.py and
+# scripts/migration_00x_*.py, in the order they were rolled out)
+# ---------------------------------------------------------------------------
+
+
+def _m001_cards_job_id(conn: Connection) -> None:
+    _add_columns(conn, "cards", [("job_id", "TEXT")])
+
+
+def _m002_cards_display_hidden(conn: Connection) -> None:
+    added = _add_columns(
+        conn,
+        "cards",
+        [
+            ("is_display", "BOOLEAN NOT NULL DEFAULT 0"),
+            ("is_hidden", "BOOLEAN NOT NULL DEFAULT 0"),
+        ],
+    )
+    if "is_display" in added:
+        # Backfill: mirror is_latest -> is_display for existing cards
+        conn.exec_driver_sql("UPDATE cards SET is_display = is_latest")
+
+
+def _m003_cards_rarity(conn: Connection) -> None:
+    if _add_columns(conn, "cards", [("rarity", "TEXT")]):
+        # Existing cards predate rarity rolls
+        conn.exec_driver_sql("UPDATE cards SET rarity = 'N' WHERE rarity IS NULL")
+
+
+def _m004_cards_prompt_debug_fields(conn: Connection) -> None:
+    _add_columns(
+        conn,
+        "cards",
+        [
+            ("final_prompt", "TEXT"),
+            ("llm_model", "TEXT"),
+            ("lora_used", "TEXT"),
+            ("seed", "INTEGER"),
+        ],
+    )
+
+
+def _m005_students_last_login(conn: Connection) -> None:
+    _add_columns(
+        conn,
+        "students",
+        [("last_login_date", "DATE"), ("last_login_at", "DATETIME")],
+    )
+
+
+def _m006_cards_history_visible(conn: Connection) -> None:
+    _add_columns(conn, "cards", [("history_visible", "BOOLEAN NOT NULL DEFAULT 1")])
+
+
+def _m007_cards_cloud(conn: Connection) -> None:
+    _add_columns(
+        conn,
+        "cards",
+        [
+            ("backend_used", "TEXT NOT NULL DEFAULT 'local'"),
+            ("cloud_model", "TEXT"),
+            ("cloud_mode", "TEXT"),
+            ("fallback_from_cloud", "BOOLEAN NOT NULL DEFAULT 0"),
+            ("cloud_error", "TEXT"),
+            ("reference_card_id", "INTEGER"),
+        ],
+    )
+
+
+def _m008_cards_cloud_quality(conn: Connection) -> None:
+    _add_columns(conn, "cards", [("cloud_quality", "TEXT")])
+
+
+def _m009_hot_query_indexes(conn: Connection) -> None:
+    _create_model_indexes(conn, "cards", "token_transactions", "learning_records")
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "cards_job_id", _m001_cards_job_id),
+    Migration(2, "cards_display_hidden", _m002_cards_display_hidden),
+    Migration(3, "cards_rarity", _m003_cards_rarity),
+    Migration(4, "cards_prompt_debug_fields", _m004_cards_prompt_debug_fields),
+    Migration(5, "students_last_login", _m005_students_last_login),
+    Migration(6, "cards_history_visible", _m006_cards_history_visible),
+    Migration(7, "cards_cloud", _m007_cards_cloud),
+    Migration(8, "cards_cloud_quality", _m008_cards_cloud_quality),
+    Migration(9, "hot_query_indexes", _m009_hot_query_indexes),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ---------------------------------------------------------------------------
+# Fingerprint
+# ---------------------------------------------------------------------------
+
+
+def schema_fingerprint() -> str:
+    """Stable hash of the ORM metadata (tables, columns, indexes) + migrations."""
+    parts = [f"migrations:{LATEST_VERSION}"]
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(f"table:{table.name}")
+        for col in table.columns:
+            parts.append(
+                f"  col:{col.name}:{col.type!r}:{col.nullable}:{col.primary_key}"
+            )
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            where = index.dialect_options["sqlite"].get("where")
+            parts.append(
+                f"  index:{index.name}:{[c.name for c in index.columns]}:{index.unique}:{where}"
+            )
+        # table.constraints is a set; sort the rendered lines, not the objects
+        parts.extend(
+            sorted(
+                f"  constraint:{type(c).__name__}:{c.name}:{sorted(col.name for col in c.columns)}"
+                for c in table.constraints
+            )
+        )
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+_CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    fingerprint TEXT,
+    applied_at DATETIME NOT NULL
+)
+"""
+
+
+def _current_state(conn: Connection) -> tuple[int, str | None] | None:
+    """(version, fingerprint) of the newest row, or None if never migrated."""
+    try:
+        row = conn.exec_driver_sql(
+            "SELECT version, fingerprint FROM schema_version ORDER BY version DESC LIMIT 1"
+        ).first()
+    except OperationalError:
+        return None  # no schema_version table yet
+    return (row[0], row[1]) if row else None
+
+
+def _is_current(state: tuple[int, str | None] | None, fingerprint: str) -> bool:
+    return state is not None and state[0] >= LATEST_VERSION and state[1] == fingerprint
+
+
+def _upgrade_locked(conn: Connection, fingerprint: str) -> list[int]:
+    # Re-check under the lock: another worker may have just finished
+    state = _current_state(conn)
+    if _is_current(state, fingerprint):
+        return []
+
+    Base.metadata.create_all(conn)
+    conn.exec_driver_sql(_CREATE_VERSION_TABLE)
+
+    current = state[0] if state else 0
+    now = datetime.now(timezone.utc).isoformat(sep=" ")
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logger.info("Applying migration %03d %s", migration.version, migration.name)
+        migration.apply(conn)
+        conn.execute(
+            text(
+                "INSERT INTO schema_version (version, name, fingerprint, applied_at) "
+                "VALUES (:version, :name, NULL, :applied_at)"
+            ),
+            {"version": migration.version, "name": migration.name, "applied_at": now},
+        )
+        applied.append(migration.version)
+
+    if current > LATEST_VERSION:
+        logger.warning(
+            "Database schema version %d is newer than this code (%d)", current, LATEST_VERSION
+        )
+    conn.execute(
+        text("UPDATE schema_version SET fingerprint = :fp WHERE version = :version"),
+        {"fp": fingerprint, "version": max(current, LATEST_VERSION)},
+    )
+    return applied
+
+
+def _upgrade(conn: Connection) -> list[int] | None:
+    """Returns applied versions, or None when the fast path skipped all DDL."""
+    fingerprint = schema_fingerprint()
+    if _is_current(_current_state(conn), fingerprint):
+        return None
+
+    is_sqlite = conn.dialect.name == "sqlite"
+    if is_sqlite:
+        # Connection runs in AUTOCOMMIT so we control the transaction: take the
+        # write lock up front so concurrent workers serialise here.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            applied = _upgrade_locked(conn, fingerprint)
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+        return applied
+
+    # Other backends: plain transaction, committed by ``upgrade``
+    return _upgrade_locked(conn, fingerprint)
+
+
+async def upgrade(engine: AsyncEngine) -> list[int] | None:
+    """Bring the database schema up to date (see module docstring)."""
+    async with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        applied = await conn.run_sync(_upgrade)
+        if engine.dialect.name != "sqlite":
+            await conn.commit()
+    if applied is None:
+        logger.debug("Schema fingerprint matches — skipping DDL.")
+    elif applied:
+        logger.info("Applied migrations: %s", applied)
+    return applied
+
+
+async def schema_status(engine: AsyncEngine) -> dict:
+    async with engine.connect() as conn:
+        state = await conn.run_sync(_current_state)
+    return {
+        "version": state[0] if state else 0,
+        "latest_version": LATEST_VERSION,
+        "fingerprint_matches": _is_current(state, schema_fingerprint()),
+    }
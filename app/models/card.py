@@ -2,7 +2,7 @@
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Integer, String, Text, Boolean, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -10,6 +10,22 @@ from app.database import Base
 
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        # "my display card" / cloud keep-mode anchor lookups
+        Index("ix_cards_student_display", "student_id", "is_display"),
+        # regen / in-flight checks and the gallery
+        Index("ix_cards_student_status", "student_id", "status"),
+        # hall of heroes, ordered by level
+        Index("ix_cards_hall", "is_display", "is_hidden", "level_number"),
+        # generation history only ever looks at cards that were sent to a
+        # worker, so index just those rows
+        Index(
+            "ix_cards_generation_history",
+            "history_visible",
+            "created_at",
+            sqlite_where=text("job_id IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     student_id: Mapped[int] = mapped_column(
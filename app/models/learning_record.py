@@ -2,7 +2,7 @@
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Integer, Float, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Integer, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -12,6 +12,8 @@ class LearningRecord(Base):
     __tablename__ = "learning_records"
     __table_args__ = (
         UniqueConstraint("student_id", "unit_id", name="uq_learning_record_student_unit"),
+        # per-unit aggregates (admin dashboard); student lookups use the unique index
+        Index("ix_learning_records_unit", "unit_id"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
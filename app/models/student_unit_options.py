@@ -0,0 +1,31 @@
+"""StudentUnitOptions ORM model — materialized attribute options per student/unit."""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class StudentUnitOptions(Base):
+    """Output of ``get_available_options`` for one scored unit of one student.
+
+    Maintained by ``app.services.student_options``; never edit by hand.
+    """
+
+    __tablename__ = "student_unit_options"
+    __table_args__ = (
+        # also serves "all units of a student" via its student_id prefix
+        UniqueConstraint("student_id", "unit_code", name="uq_student_unit_options"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    student_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("students.id"), nullable=False
+    )
+    unit_code: Mapped[str] = mapped_column(String, nullable=False)
+    options: Mapped[str] = mapped_column(Text, nullable=False)  # JSON
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc)
+    )
@@ -0,0 +1,70 @@
+"""Query builders for the hot per-request queries shared by several routers.
+
+Routes run exactly these statements, and
+``tests/test_routers/test_query_plans.py`` runs ``EXPLAIN QUERY PLAN`` on the
+same builders, so a change to a query (or to the indexes it relies on) is
+checked against what is actually executed.
+"""
+
+from collections.abc import Sequence
+
+from sqlalchemy import Select, func, select
+
+from app.models.card import Card
+from app.models.learning_record import LearningRecord
+from app.models.token_transaction import TokenTransaction
+
+# Cards that count as "has a card" (regeneration costs tokens)
+ACTIVE_CARD_STATUSES = ("pending", "generating", "completed")
+IN_FLIGHT_CARD_STATUSES = ("pending", "generating")
+
+
+def display_cards(student_id: int) -> Select:
+    """The student's hall-of-fame card(s); at most one outside legacy data."""
+    return select(Card).where(Card.student_id == student_id, Card.is_display == True)  # noqa: E712
+
+
+def first_card_in_status(student_id: int, statuses: Sequence[str]) -> Select:
+    """Any one of the student's cards in *statuses* (existence checks)."""
+    return (
+        select(Card)
+        .where(Card.student_id == student_id, Card.status.in_(statuses))
+        .limit(1)
+    )
+
+
+def gallery_cards(student_id: int) -> Select:
+    """The student's visible, non-failed cards, newest first."""
+    return (
+        select(Card)
+        .where(Card.student_id == student_id, Card.is_hidden == False, Card.status != "failed")  # noqa: E712
+        .order_by(Card.created_at.desc())
+    )
+
+
+def hall_cards() -> Select:
+    """Every student's displayed card, highest level first."""
+    return (
+        select(Card)
+        .where(Card.is_display == True, Card.is_hidden == False)  # noqa: E712
+        .order_by(Card.level_number.desc())
+    )
+
+
+def unit_record_stats() -> Select:
+    """Average quiz / completion and record count per unit id (NULLs ignored)."""
+    return select(
+        LearningRecord.unit_id,
+        func.avg(LearningRecord.quiz_score),
+        func.avg(LearningRecord.completion_rate),
+        func.count(LearningRecord.id),
+    ).group_by(LearningRecord.unit_id)
+
+
+def token_history(student_id: int) -> Select:
+    """The student's token transactions, newest first."""
+    return (
+        select(TokenTransaction)
+        .where(TokenTransaction.student_id == student_id)
+        .order_by(TokenTransaction.created_at.desc())
+    )
@@ -0,0 +1,84 @@
+"""Per-request SQL query counting and N+1 detection.
+
+Engine-level ``before_cursor_execute`` / ``after_cursor_execute`` hooks feed
+every statement into the ``QueryStats`` objects active in the current
+context. ``AuthMiddleware`` opens one per request and reports it as a
+``Server-Timing`` header (``db;dur=<ms>;desc="<n> queries"``) and in the logs,
+warning when the same statement repeats often enough to look like an N+1
+loop. Tests use ``track_queries()`` directly (see ``assert_max_queries`` in
+``tests/conftest.py``); trackers nest, so a test-level tracker also sees the
+queries issued inside the request.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    """Statement count, total DB time and per-statement repeat counts."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least *threshold* times (likely N+1 loops)."""
+        if threshold <= 0:
+            return []
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+
+_active: ContextVar[tuple[QueryStats, ...]] = ContextVar("active_query_stats", default=())
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count statements executed in this context (nests with outer trackers)."""
+    stats = QueryStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _active.get():
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    active = _active.get()
+    if not active:
+        return
+    starts = conn.info.get("query_start")
+    duration = time.perf_counter() - starts.pop() if starts else 0.0
+    for stats in active:
+        stats.record(statement, duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:
+    # after_cursor_execute is skipped on failure; drop the pending start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
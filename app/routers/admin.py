@@ -1,32 +1,39 @@
 """Admin dashboard routes — HTML pages and API endpoints."""
 
+import asyncio
 import csv
+import hashlib
 import io
 import json
 import logging
 import re
+from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from pathlib import Path
+from typing import IO
 from urllib.parse import urlencode, urlparse
 
 import httpx
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Request, UploadFile, File, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, UploadFile, File, Form, Query
 from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy import case, delete, select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, wal_checkpointer
 from app.dependencies import require_admin, require_teacher
-from app.models.achievement import ACHIEVEMENT_TYPES, StudentAchievement
+from app.models.achievement import ACHIEVEMENT_TYPES
 from app.models.attribute_rule import AttributeRule
 from app.models.card import Card
 from app.models.system_setting import SystemSetting
 from app.models.card_config import CardConfig
 from app.models.learning_record import LearningRecord
 from app.models.student import Student
-from app.models.token_transaction import TokenTransaction
 from app.models.unit import Unit
+from app import queries
+from app.services.achievement_engine import AchievementGrant, achievement_engine
+from app.services.cohort import load_cohort
 from app.services.excel_import import (
     ExcelParseResult,
     StudentRecord,
@@ -34,7 +41,27 @@ from app.services.excel_import import (
     parse_score_excel,
 )
 from app.config import settings
+from app.services.identity_cache import identity_cache
+from app.services.import_tokens import ImportPlan, ImportPreview, import_tokens
+from app.services.parse_pool import ParseTimeoutError, parse_pool
+from app.services.rarity_lab import parse_table, run_rarity_lab
+from app.services.record_import import (
+    RecordChange,
+    RecordUpdate,
+    UpsertResult,
+    diff_records,
+    load_existing_records,
+    resolve_records,
+    upsert_records,
+    write_record_diff,
+)
+from app.services.roster_import import import_roster
+from app.services.rule_snapshot import rule_snapshot
 from app.services.storage import get_storage_service
+from app.services.student_options import (
+    refresh_all_student_options,
+    refresh_student_options,
+)
 from app.services.system_settings import (
     OLLAMA_MODEL_SUGGESTIONS,
     SYSTEM_SETTING_LABELS,
@@ -42,6 +69,9 @@ from app.services.system_settings import (
     get_system_settings_map,
     set_system_setting,
 )
+from app.services.token_ledger import Grant, apply_grants
+from app.sqlite_tuning import read_sqlite_status
+from scripts import export_preview_rates
 from app.templating import templates
 
 logger = logging.getLogger(__name__)
@@ -124,17 +154,6 @@ def _build_simulation_reuse_url(card: Card, student: Student | None = None) -> s
     return f"/admin/simulation?{query}" if query else "/admin/simulation"
 
 
-def _student_unit_exp(unit: Unit, lr: LearningRecord | None) -> float | None:
-    if lr is None:
-        return None
-    if unit.code == "unit_6":
-        return lr.completion_rate
-    pv = (lr.preview_score or 0.0) * 0.2
-    cv = (lr.completion_rate or 0.0) * 0.4
-    qv = (lr.quiz_score or 0.0) * 0.4
-    return round(pv + cv + qv, 1)
-
-
 # ─── HTML Pages ───────────────────────────────────────────────────────
 
 
@@ -166,30 +185,16 @@ async def admin_dashboard(
     units_result = await db.execute(select(Unit).order_by(Unit.sort_order))
     units = units_result.scalars().all()
 
+    # Per-unit aggregates in SQL: one GROUP BY over ix_learning_records_unit
+    stats_by_unit = {
+        unit_id: (avg_quiz, avg_completion, record_count)
+        for unit_id, avg_quiz, avg_completion, record_count in (
+            await db.execute(queries.unit_record_stats())
+        ).all()
+    }
     unit_stats = []
     for unit in units:
-        avg_quiz = (
-            await db.execute(
-                select(func.avg(LearningRecord.quiz_score)).where(
-                    LearningRecord.unit_id == unit.id
-                )
-            )
-        ).scalar()
-        avg_completion = (
-            await db.execute(
-                select(func.avg(LearningRecord.completion_rate)).where(
-                    LearningRecord.unit_id == unit.id
-                )
-            )
-        ).scalar()
-        record_count = (
-            await db.execute(
-                select(func.count(LearningRecord.id)).where(
-                    LearningRecord.unit_id == unit.id
-                )
-            )
-        ).scalar() or 0
-
+        avg_quiz, avg_completion, record_count = stats_by_unit.get(unit.id, (None, None, 0))
         unit_stats.append({
             "code": unit.code,
             "name": unit.name,
@@ -207,6 +212,7 @@ async def admin_dashboard(
             "total_cards": total_cards,
             "completed_cards": completed_cards,
             "unit_stats": unit_stats,
+            "sqlite_status": await read_sqlite_status(db, wal_checkpointer),
         },
     )
 
@@ -248,27 +254,21 @@ async def admin_students(
         )
         card_counts = {row[0]: row[1] for row in cc_result.all()}
 
-    # Learning records — one query, grouped by student_id → unit_id
-    lr_map: dict[int, dict[int, LearningRecord]] = {}
-    if student_ids:
-        lr_result = await db.execute(
-            select(LearningRecord).where(
-                LearningRecord.student_id.in_(student_ids)
-            )
-        )
-        for lr in lr_result.scalars().all():
-            lr_map.setdefault(lr.student_id, {})[lr.unit_id] = lr
+    # Learning records — one query, scored as a students × units matrix
+    cohort = await load_cohort(db, units, student_ids)
+    tiers = cohort.tiers
 
     student_data = []
-    for s in students:
-        unit_exps = []
-        for u in units:
-            lr = lr_map.get(s.id, {}).get(u.id)
-            unit_exps.append({"unit": u, "exp": _student_unit_exp(u, lr)})
+    for i, s in enumerate(students):
+        unit_exps = [
+            {"unit": u, "exp": exp, "tier": tiers[i, j]}
+            for j, (u, exp) in enumerate(zip(units, cohort.display_exp(s.id)))
+        ]
         student_data.append({
             "student": s,
             "card_count": card_counts.get(s.id, 0),
             "unit_exps": unit_exps,
+            "level": int(cohort.levels[i]),
         })
 
     return templates.TemplateResponse(
@@ -317,12 +317,7 @@ async def admin_students_export_selected(
     )
     card_counts = {row[0]: row[1] for row in cc_result.all()}
 
-    lr_map: dict[int, dict[int, LearningRecord]] = {}
-    lr_result = await db.execute(
-        select(LearningRecord).where(LearningRecord.student_id.in_(selected_ids))
-    )
-    for lr in lr_result.scalars().all():
-        lr_map.setdefault(lr.student_id, {})[lr.unit_id] = lr
+    cohort = await load_cohort(db, units, selected_ids)
 
     output = io.StringIO()
     writer = csv.writer(output)
@@ -340,9 +335,7 @@ async def admin_students_export_selected(
             student.tokens or 0,
             card_counts.get(student.id, 0),
         ]
-        for unit in units:
-            exp = _student_unit_exp(unit, lr_map.get(student.id, {}).get(unit.id))
-            row.append("" if exp is None else exp)
+        row.extend("" if exp is None else exp for exp in cohort.display_exp(student.id))
         writer.writerow(row)
 
     filename = f"selected-students-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.csv"
@@ -385,12 +378,7 @@ async def admin_student_detail(
     cards = cards_result.scalars().all()
 
     # Token transactions
-    from app.models.token_transaction import TokenTransaction
-    txn_result = await db.execute(
-        select(TokenTransaction)
-        .where(TokenTransaction.student_id == student.id)
-        .order_by(TokenTransaction.created_at.desc())
-    )
+    txn_result = await db.execute(queries.token_history(student.id))
     token_transactions = txn_result.scalars().all()
 
     # Achievements
@@ -506,6 +494,41 @@ async def api_admin_dashboard(
     }
 
 
+@router.get("/api/admin/sqlite")
+async def api_admin_sqlite_status(
+    user: Student = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return current SQLite pragma values, WAL size and checkpoint state."""
+    status = await read_sqlite_status(db, wal_checkpointer)
+    if status is None:
+        raise HTTPException(status_code=404, detail="目前資料庫不是 SQLite")
+    return status
+
+
+@router.post("/api/admin/rarity-lab")
+async def api_admin_rarity_lab(
+    payload: dict = Body(default={}),
+    user: Student = Depends(require_teacher),
+    db: AsyncSession = Depends(get_db),
+):
+    """Simulate a rarity table over the current cohort and compare with real cards.
+
+    Body (all optional): ``table`` as ``[[lo, hi, {rarity: weight}], ...]``
+    (default: the live RARITY_TABLE), ``draws_per_student`` and ``seed``.
+    """
+    try:
+        draws = int(payload.get("draws_per_student", 1000))
+        seed = int(payload["seed"]) if payload.get("seed") is not None else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="draws_per_student 與 seed 必須是整數")
+    try:
+        table = parse_table(payload["table"]) if payload.get("table") is not None else None
+        return await run_rarity_lab(db, table, draws_per_student=draws, seed=seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.put("/api/admin/students/{student_pk}")
 async def api_admin_update_student(
     student_pk: int,
@@ -570,6 +593,7 @@ async def api_admin_update_student(
     student.updated_at = datetime.now(timezone.utc)
     await db.commit()
     await db.refresh(student)
+    identity_cache.invalidate(student.email, student_id=student.id)
 
     return {
         "id": student.id,
@@ -619,13 +643,20 @@ async def api_admin_update_record(
         existing = LearningRecord(student_id=student_pk, unit_id=unit_id)
         db.add(existing)
 
+    changes: list[RecordChange] = []
     for field in ("preview_score", "pretest_score", "completion_rate", "quiz_score"):
         if field in payload:
             val = payload[field]
-            setattr(existing, field, float(val) if val is not None and val != "" else None)
+            val = float(val) if val is not None and val != "" else None
+            if val != getattr(existing, field):
+                changes.append(RecordChange(student_pk, unit_id, field, val))
+            setattr(existing, field, val)
 
     existing.updated_at = datetime.now(timezone.utc)
+    grants = await achievement_engine.process(db, changes)
+    await refresh_student_options(db, [student_pk])
     await db.commit()
+    _record_committed_grants(grants)
     await db.refresh(existing)
 
     return {
@@ -636,6 +667,7 @@ async def api_admin_update_record(
         "pretest_score": existing.pretest_score,
         "completion_rate": existing.completion_rate,
         "quiz_score": existing.quiz_score,
+        "achievements": [key for _, key in grants],
     }
 
 
@@ -683,6 +715,7 @@ async def api_admin_copy_records_to_admin(
             updated_at=now,
         ))
 
+    await refresh_student_options(db, [admin.id])
     await db.commit()
     return {
         "status": "ok",
@@ -708,10 +741,12 @@ async def api_admin_unbind_student(
     student_name = student.name
 
     # Reset email to placeholder (preserves roster entry)
+    bound_email = student.email
     student.email = f"__unbound__{student.student_id}@placeholder"
     student.nickname = None
     student.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    identity_cache.invalidate(bound_email, student_id=student.id)
     return {"status": "ok", "message": f"已解除 {student_name} 的 Email 綁定"}
 
 
@@ -728,9 +763,6 @@ async def api_admin_batch_tokens(
     When achievement_key is provided, students who already have the achievement
     are skipped (idempotent per-student).
     """
-    from app.models.token_transaction import TokenTransaction
-    from app.models.achievement import StudentAchievement, ACHIEVEMENT_TYPES
-
     student_ids = payload.get("student_ids", [])
     amount = payload.get("amount", 0)
     note = payload.get("note", "").strip() or None
@@ -746,56 +778,40 @@ async def api_admin_batch_tokens(
         raise HTTPException(status_code=400, detail=f"無效的成就代碼：{achievement_key}")
 
     result = await db.execute(
-        select(Student).where(Student.id.in_(student_ids))
+        select(Student.id, Student.name).where(Student.id.in_(student_ids))
     )
-    students = result.scalars().all()
+    students = result.all()
 
     if not students:
         raise HTTPException(status_code=404, detail="找不到指定學生")
 
-    # If an achievement key is provided, find students who already have it
-    already_earned_ids: set[int] = set()
+    # If an achievement key is provided, skip students who already have it
+    eligible_ids = {sid for sid, _ in students}
     if achievement_key:
-        earned_result = await db.execute(
-            select(StudentAchievement.student_id).where(
-                StudentAchievement.achievement_key == achievement_key,
-                StudentAchievement.student_id.in_(student_ids),
+        eligible_ids = {
+            sid for sid, _ in await achievement_engine.unearned(
+                db, [(sid, achievement_key) for sid, _ in students]
             )
-        )
-        already_earned_ids = {row[0] for row in earned_result.all()}
+        }
 
-    now = datetime.now(timezone.utc)
+    tx_reason = note or (ACHIEVEMENT_TYPES[achievement_key]["label"] if achievement_key else None)
     updated_ids = []
     skipped_names = []
-
-    for s in students:
-        if achievement_key and s.id in already_earned_ids:
-            skipped_names.append(s.name)
+    for sid, name in students:
+        if sid not in eligible_ids:
+            skipped_names.append(name)
             continue
+        updated_ids.append(sid)
 
-        s.tokens = (s.tokens or 0) + amount
-        s.updated_at = now
-        tx_reason = note or (ACHIEVEMENT_TYPES[achievement_key]["label"] if achievement_key else None)
-        tx = TokenTransaction(
-            student_id=s.id,
-            amount=amount,
-            reason=tx_reason,
-            created_at=now,
-        )
-        db.add(tx)
-
-        if achievement_key:
-            await db.flush()  # get tx.id
-            db.add(StudentAchievement(
-                student_id=s.id,
-                achievement_key=achievement_key,
-                token_transaction_id=tx.id,
-                awarded_at=now,
-            ))
-
-        updated_ids.append(s.id)
+    await apply_grants(
+        db, [Grant(sid, amount, tx_reason, achievement_key) for sid in updated_ids]
+    )
 
     await db.commit()
+    if achievement_key:
+        achievement_engine.mark_earned((sid, achievement_key) for sid in updated_ids)
+    for sid in updated_ids:
+        identity_cache.invalidate(student_id=sid)
     return {
         "updated": len(updated_ids),
         "skipped": len(skipped_names),
@@ -821,13 +837,28 @@ async def api_admin_import(
 
     content = await file.read()
     text = content.decode("utf-8-sig")  # handle BOM
-    reader = csv.DictReader(io.StringIO(text))
+    rows = list(enumerate(csv.DictReader(io.StringIO(text)), start=2))  # row 1 = header
+
+    # One lookup for every student in the file, one for the (few) units
+    sids = {(row.get("student_id") or "").strip() for _, row in rows}
+    sids.discard("")
+    student_pks: dict[str, int] = {}
+    if sids:
+        student_pks = {
+            sid: pk
+            for sid, pk in (
+                await db.execute(
+                    select(Student.student_id, Student.id).where(Student.student_id.in_(sids))
+                )
+            ).all()
+        }
+    unit_pks = {
+        code: pk for code, pk in (await db.execute(select(Unit.code, Unit.id))).all()
+    }
 
-    created = 0
-    updated = 0
     errors = []
-
-    for row_num, row in enumerate(reader, start=2):  # row 1 = header
+    updates: list[RecordUpdate] = []
+    for row_num, row in rows:
         try:
             sid = row.get("student_id", "").strip()
             unit_code = row.get("unit_code", "").strip()
@@ -836,67 +867,40 @@ async def api_admin_import(
                 errors.append(f"Row {row_num}: missing student_id or unit_code")
                 continue
 
-            # Find student by student_id field (not PK)
-            student_result = await db.execute(
-                select(Student).where(Student.student_id == sid)
-            )
-            student = student_result.scalar_one_or_none()
-            if student is None:
+            student_pk = student_pks.get(sid)
+            if student_pk is None:
                 errors.append(f"Row {row_num}: student '{sid}' not found")
                 continue
 
-            # Find unit
-            unit_result = await db.execute(
-                select(Unit).where(Unit.code == unit_code)
-            )
-            unit = unit_result.scalar_one_or_none()
-            if unit is None:
+            unit_pk = unit_pks.get(unit_code)
+            if unit_pk is None:
                 errors.append(f"Row {row_num}: unit '{unit_code}' not found")
                 continue
 
-            # Parse scores
-            preview = _parse_float(row.get("preview_score"))
-            completion = _parse_float(row.get("completion_rate"))
-            quiz = _parse_float(row.get("quiz_score"))
-
-            # Upsert learning record
-            existing_result = await db.execute(
-                select(LearningRecord).where(
-                    LearningRecord.student_id == student.id,
-                    LearningRecord.unit_id == unit.id,
-                )
-            )
-            existing = existing_result.scalar_one_or_none()
-
-            if existing:
-                if preview is not None:
-                    existing.preview_score = preview
-                if completion is not None:
-                    existing.completion_rate = completion
-                if quiz is not None:
-                    existing.quiz_score = quiz
-                existing.updated_at = datetime.now(timezone.utc)
-                updated += 1
-            else:
-                lr = LearningRecord(
-                    student_id=student.id,
-                    unit_id=unit.id,
-                    preview_score=preview,
-                    completion_rate=completion,
-                    quiz_score=quiz,
-                )
-                db.add(lr)
-                created += 1
+            updates.append(RecordUpdate(student_pk, unit_pk, {
+                "preview_score": _parse_float(row.get("preview_score")),
+                "completion_rate": _parse_float(row.get("completion_rate")),
+                "quiz_score": _parse_float(row.get("quiz_score")),
+            }))
 
         except Exception as e:
             errors.append(f"Row {row_num}: {e}")
 
+    result = await upsert_records(
+        db, updates, ("preview_score", "completion_rate", "quiz_score")
+    )
+    grants = await achievement_engine.process(db, result.changes)
+    await refresh_student_options(db, {u.student_pk for u in updates})
     await db.commit()
+    _record_committed_grants(grants)
 
     return {
-        "created": created,
-        "updated": updated,
-        "total": created + updated,
+        "created": result.created,
+        "updated": result.updated,
+        "unchanged": result.unchanged,
+        "total": result.total,
+        "field_changes": result.field_changes,
+        "achievements": _summarize_grants(grants),
         "errors": errors[:20],  # cap error list
     }
 
@@ -904,77 +908,156 @@ async def api_admin_import(
 @router.post("/api/admin/roster")
 async def api_admin_roster(
     file: UploadFile = File(...),
+    dry_run: bool = Query(False),
     user: Student = Depends(require_teacher),
     db: AsyncSession = Depends(get_db),
 ):
     """Import student roster from CSV.
 
     Expected CSV columns: id (學號), name (姓名)
-    Creates unbound roster students with placeholder emails.
+    Creates unbound roster students with placeholder emails and renames
+    existing ones. With ``dry_run`` nothing is written; the response lists
+    what would change.
     """
     if not file.filename or not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Please upload a CSV file")
 
-    content = await file.read()
-    text = content.decode("utf-8-sig")  # handle BOM
-    reader = csv.DictReader(io.StringIO(text))
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")  # handle BOM
+    try:
+        result = await import_roster(db, csv.DictReader(text), dry_run=dry_run)
+    except UnicodeDecodeError as exc:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="CSV 檔案必須是 UTF-8 編碼") from exc
+    finally:
+        text.detach()  # leave closing the upload to Starlette
 
-    created = 0
-    updated = 0
-    errors = []
+    if not dry_run:
+        await db.commit()
+        if result.renamed:
+            identity_cache.clear()
 
-    for row_num, row in enumerate(reader, start=2):  # row 1 = header
-        try:
-            sid = row.get("id", "").strip()
-            name = row.get("name", "").strip()
+    return {
+        "dry_run": dry_run,
+        "created": len(result.created),
+        "updated": len(result.renamed),
+        "unchanged": result.unchanged,
+        "total": result.total,
+        "changes": {
+            "created": [{"id": sid, "name": name} for sid, name in result.created[:50]],
+            "renamed": [
+                {"id": sid, "old_name": old, "name": new}
+                for sid, old, new in result.renamed[:50]
+            ],
+        },
+        "errors": result.errors[:20],
+    }
 
-            if not sid or not name:
-                errors.append(f"Row {row_num}: missing id or name")
-                continue
 
-            # Check if student already exists
-            result = await db.execute(
-                select(Student).where(Student.student_id == sid)
-            )
-            existing = result.scalar_one_or_none()
-
-            if existing:
-                existing.name = name
-                existing.updated_at = datetime.now(timezone.utc)
-                updated += 1
-            else:
-                placeholder_email = f"__unbound__{sid}@placeholder"
-                student = Student(
-                    student_id=sid,
-                    name=name,
-                    email=placeholder_email,
-                    role="student",
-                    tokens=0,
-                )
-                db.add(student)
-                created += 1
+# ─── Excel Import Endpoints ───────────────────────────────────────────
 
-        except Exception as e:
-            errors.append(f"Row {row_num}: {e}")
+def _validate_excel_upload(file: UploadFile) -> IO[bytes]:
+    """Check name and size; return the spooled upload for the streaming parsers."""
+    if not file.filename or not file.filename.lower().endswith(".xlsx"):
+        raise HTTPException(status_code=400, detail="請上傳 .xlsx 格式的 Excel 檔案")
+    size = file.size
+    if size is None:
+        size = file.file.seek(0, io.SEEK_END)
+    if size > settings.EXCEL_MAX_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=400, detail=f"檔案超過 {settings.EXCEL_MAX_UPLOAD_MB}MB 限制"
+        )
+    file.file.seek(0)
+    return file.file
 
-    await db.commit()
 
-    return {
-        "created": created,
-        "updated": updated,
-        "total": created + updated,
-        "errors": errors[:20],
-    }
+async def _parse_excel_preview(
+    file: UploadFile, import_type: str, parser: Callable[[str], ExcelParseResult]
+) -> tuple[str, ExcelParseResult]:
+    """Validate and parse an upload for preview; returns (import token, result).
+
+    Parsing runs in the worker pool, off the event loop. Re-previewing the
+    same file reuses the stored parse instead of parsing it again.
+    """
+    upload = _validate_excel_upload(file)
+    digest = await asyncio.to_thread(_upload_digest, upload)
+    token = import_tokens.token_for(import_type, digest)
+    stored = import_tokens.get(token, import_type)
+    if stored is not None:
+        return token, stored.parse_result
+    try:
+        return token, await parse_pool.parse_upload(parser, upload)
+    except ParseTimeoutError as exc:
+        raise HTTPException(
+            status_code=504, detail="Excel 解析逾時，請稍後再試或分批匯入"
+        ) from exc
 
 
-# ─── Excel Import Endpoints ───────────────────────────────────────────
+def _upload_digest(upload: IO[bytes]) -> str:
+    upload.seek(0)
+    digest = hashlib.file_digest(upload, "sha256").hexdigest()
+    upload.seek(0)
+    return digest
 
-_MAX_EXCEL_SIZE = 5 * 1024 * 1024  # 5 MB
 
+def _claim_import_preview(token: str, import_type: str) -> ImportPreview:
+    """Take the stored preview for commit (each preview commits at most once)."""
+    preview = import_tokens.pop(token, import_type)
+    if preview is None:
+        raise HTTPException(
+            status_code=404, detail="預覽已過期或已匯入，請重新上傳檔案預覽"
+        )
+    return preview
 
-def _validate_excel_upload(file: UploadFile) -> None:
-    if not file.filename or not file.filename.lower().endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="請上傳 .xlsx 格式的 Excel 檔案")
+
+async def _plan_import(
+    db: AsyncSession,
+    parse_result: ExcelParseResult,
+    student_map: dict[str, int],
+    unit_map: dict[str, int],
+    fields: tuple[str, ...],
+) -> ImportPlan:
+    """Diff the parsed rows against the current records without writing them,
+    and let the achievement engine evaluate the changes the commit would make.
+    """
+    updates, warnings = resolve_records(parse_result.records, student_map, unit_map, fields)
+    existing = await load_existing_records(db, (u.student_pk for u in updates), fields)
+    diff = diff_records(existing, updates, fields)
+    base = {(u.student_pk, u.unit_pk): None for u in updates}
+    base.update((key, existing[key]) for key in base.keys() & existing.keys())
+    grants = await achievement_engine.evaluate(db, diff.changes)
+    return ImportPlan(list(fields), base, diff, grants, warnings)
+
+
+async def _check_import_plan(db: AsyncSession, preview: ImportPreview) -> ImportPlan:
+    """The preview's plan; 409 if the records or achievements it saw have changed."""
+    plan = preview.plan
+    stale = plan is None  # stored before plans were kept: preview again
+    if plan is not None:
+        current = await load_existing_records(db, plan.student_pks, plan.fields)
+        stale = any(current.get(key) != values for key, values in plan.base.items())
+        if not stale and plan.grants:
+            unearned = await achievement_engine.unearned(db, plan.grants)
+            stale = set(unearned) != set(plan.grants)
+    if stale:
+        raise HTTPException(
+            status_code=409, detail="預覽後資料已有變更，請重新上傳檔案預覽"
+        )
+    return plan
+
+
+async def _write_import_plan(db: AsyncSession, plan: ImportPlan) -> UpsertResult:
+    """Write a checked plan: records, achievement grants, options (not committed)."""
+    await write_record_diff(db, plan.diff, plan.fields)
+    await achievement_engine.grant(db, plan.grants)
+    await refresh_student_options(db, plan.student_pks)
+    return UpsertResult(
+        created=len(plan.diff.created),
+        updated=len(plan.diff.changed),
+        unchanged=plan.diff.unchanged,
+        field_changes=plan.diff.field_changes,
+        warnings=plan.warnings,
+        changes=plan.diff.changes,
+    )
 
 
 def _build_preview_html(
@@ -982,11 +1065,13 @@ def _build_preview_html(
     student_map: dict[str, int],
     import_type: str,
     award_preview: dict | None = None,
+    import_token: str | None = None,
 ) -> str:
     """Return an HTMX HTML fragment summarising the parse result.
 
     The actual "確認匯入" button is rendered by the page-level JavaScript
-    (`commit-area`), so this fragment only contains the parse summary.
+    (`commit-area`), so this fragment only contains the parse summary; the
+    page reads `data-import-token` from it and sends only that to commit.
 
     `award_preview` is an optional dict with shape::
 
@@ -1051,8 +1136,10 @@ def _build_preview_html(
           🎁 自動發放：本次無新增成就（皆已發放或無對應條件）
         </p>"""
 
+    token_attr = f' data-import-token="{import_token}"' if import_token else ""
+
     return f"""
-    <div class="rounded bg-[var(--rpg-bg-card)] border border-[var(--rpg-gold-dark)] p-4 mt-3">
+    <div class="rounded bg-[var(--rpg-bg-card)] border border-[var(--rpg-gold-dark)] p-4 mt-3"{token_attr}>
       <p class="font-tc text-xs font-bold text-[var(--rpg-gold)] mb-2">預覽摘要</p>
       <ul class="font-tc text-xs text-[var(--rpg-text-primary)] space-y-1">
         <li>比對到：<span class="text-[var(--rpg-gold-bright)] font-bold">{will_update}</span> 位學生</li>
@@ -1072,57 +1159,21 @@ async def _upsert_records(
     student_map: dict[str, int],
     unit_map: dict[str, int],
     update_fields: tuple[str, ...],
-) -> tuple[int, int, list[str]]:
+) -> UpsertResult:
     """Upsert learning records, updating only the specified fields.
 
-    Returns (created, updated, warnings).
+    Unknown student IDs / unit codes are skipped and reported in
+    ``result.warnings``; see ``app.services.record_import`` for the diff.
     """
-    created = 0
-    updated = 0
-    warnings: list[str] = []
-    now = datetime.now(timezone.utc)
-
-    for rec in records:
-        student_pk = student_map.get(rec.student_id)
-        if student_pk is None:
-            warnings.append(f"找不到學號 {rec.student_id}，已略過")
-            continue
+    updates, warnings = resolve_records(records, student_map, unit_map, update_fields)
+    result = await upsert_records(db, updates, update_fields)
+    result.warnings = warnings
+    return result
 
-        unit_pk = unit_map.get(rec.unit_code)
-        if unit_pk is None:
-            warnings.append(f"找不到單元 {rec.unit_code}，已略過")
-            continue
 
-        existing = (
-            await db.execute(
-                select(LearningRecord).where(
-                    LearningRecord.student_id == student_pk,
-                    LearningRecord.unit_id == unit_pk,
-                )
-            )
-        ).scalar_one_or_none()
-
-        if existing is None:
-            kwargs: dict = {"student_id": student_pk, "unit_id": unit_pk}
-            for f in update_fields:
-                v = getattr(rec, f)
-                if v is not None:
-                    kwargs[f] = v
-            lr = LearningRecord(**kwargs)
-            db.add(lr)
-            created += 1
-        else:
-            changed = False
-            for f in update_fields:
-                v = getattr(rec, f)
-                if v is not None:
-                    setattr(existing, f, v)
-                    changed = True
-            if changed:
-                existing.updated_at = now
-            updated += 1
-
-    return created, updated, warnings
+def _affected_student_pks(records: list[StudentRecord], student_map: dict[str, int]) -> set[int]:
+    """Student PKs touched by an import (rows with unknown student IDs are skipped)."""
+    return {student_map[r.student_id] for r in records if r.student_id in student_map}
 
 
 @router.post("/api/admin/import-excel/completion/preview", response_class=HTMLResponse)
@@ -1133,164 +1184,70 @@ async def api_excel_completion_preview(
     db: AsyncSession = Depends(get_db),
 ):
     """Parse completion Excel and return an HTMX preview fragment."""
-    _validate_excel_upload(file)
-    content = await file.read()
-    if len(content) > _MAX_EXCEL_SIZE:
-        raise HTTPException(status_code=400, detail="檔案超過 5MB 限制")
-
-    parse_result = parse_completion_excel(content)
+    token, parse_result = await _parse_excel_preview(file, "completion", parse_completion_excel)
 
     students = (await db.execute(select(Student))).scalars().all()
     student_map = {s.student_id: s.id for s in students}
 
-    return _build_preview_html(parse_result, student_map, "completion")
+    units = (await db.execute(select(Unit))).scalars().all()
+    unit_map = {u.code: u.id for u in units}
+
+    plan = await _plan_import(db, parse_result, student_map, unit_map, ("completion_rate",))
+    import_tokens.put(token, ImportPreview("completion", parse_result, plan))
+
+    return _build_preview_html(parse_result, student_map, "completion", import_token=token)
 
 
 @router.post("/api/admin/import-excel/completion/commit", response_class=HTMLResponse)
 async def api_excel_completion_commit(
     request: Request,
-    file: UploadFile = File(...),
+    token: str = Form(...),
     user: Student = Depends(require_teacher),
     db: AsyncSession = Depends(get_db),
 ):
-    """Re-parse and commit completion Excel data to the database."""
-    _validate_excel_upload(file)
-    content = await file.read()
-    if len(content) > _MAX_EXCEL_SIZE:
-        raise HTTPException(status_code=400, detail="檔案超過 5MB 限制")
-
-    parse_result = parse_completion_excel(content)
-
-    students = (await db.execute(select(Student))).scalars().all()
-    student_map = {s.student_id: s.id for s in students}
-
-    units = (await db.execute(select(Unit))).scalars().all()
-    unit_map = {u.code: u.id for u in units}
+    """Commit the completion data planned by the preview identified by *token*."""
+    preview = _claim_import_preview(token, "completion")
+    plan = await _check_import_plan(db, preview)
 
     try:
-        created, updated, warnings = await _upsert_records(
-            db, parse_result.records, student_map, unit_map,
-            update_fields=("completion_rate",),
-        )
+        result = await _write_import_plan(db, plan)
         await db.commit()
     except Exception as exc:
         await db.rollback()
+        import_tokens.put(token, preview)  # let the teacher retry the same preview
         logger.exception("Excel completion commit failed")
         raise HTTPException(status_code=500, detail=f"寫入資料庫失敗：{exc}") from exc
 
+    _record_committed_grants(plan.grants)
+
     warn_html = ""
-    if warnings:
-        items = "".join(f"<li>{w}</li>" for w in warnings[:20])
+    if result.warnings:
+        items = "".join(f"<li>{w}</li>" for w in result.warnings[:20])
         warn_html = f'<ul class="mt-2 text-[var(--rpg-danger)] text-[10px] list-disc list-inside">{items}</ul>'
 
     return f"""
     <div class="rounded bg-[var(--rpg-bg-card)] border border-[var(--rpg-gold)] p-4 mt-3">
       <p class="font-tc text-xs font-bold text-[var(--rpg-gold)] mb-2">✓ 匯入完成</p>
       <ul class="font-tc text-xs text-[var(--rpg-text-primary)] space-y-1">
-        <li>新增：<span class="text-[var(--rpg-gold-bright)] font-bold">{created}</span> 筆</li>
-        <li>更新：<span class="text-[var(--rpg-gold-bright)] font-bold">{updated}</span> 筆</li>
+        <li>新增：<span class="text-[var(--rpg-gold-bright)] font-bold">{result.created}</span> 筆</li>
+        <li>更新：<span class="text-[var(--rpg-gold-bright)] font-bold">{result.updated}</span> 筆</li>
+        <li>未變更：<span class="text-[var(--rpg-text-secondary)] font-bold">{result.unchanged}</span> 筆</li>
       </ul>
       {warn_html}
     </div>"""
 
 
-# ─── Score-list auto-award helpers ────────────────────────────────────
-
-# Map LearningRecord field → achievement-key suffix.
-_SCORE_FIELD_TO_KEY_SUFFIX: dict[str, str] = {
-    "pretest_score": "pretest",
-    "quiz_score": "complete",
-}
-
-# Chapters eligible for auto-award (unit_6 自主學習 has no pretest/post-test).
-_AUTO_AWARD_UNIT_CODES: tuple[str, ...] = (
-    "unit_1", "unit_2", "unit_3", "unit_4", "unit_5",
-)
-
-
-def _achievement_key_for(unit_code: str, field: str) -> str | None:
-    """Return achievement_key for (unit_code, field) or None if not eligible."""
-    if unit_code not in _AUTO_AWARD_UNIT_CODES:
-        return None
-    suffix = _SCORE_FIELD_TO_KEY_SUFFIX.get(field)
-    if suffix is None:
-        return None
-    chapter_num = unit_code.removeprefix("unit_")
-    return f"chapter_{chapter_num}_{suffix}"
-
-
-async def _compute_score_achievement_grants(
-    db: AsyncSession,
-    affected_student_pks: set[int],
-    overlay_records: list[StudentRecord] | None = None,
-    student_id_to_pk: dict[str, int] | None = None,
-) -> list[tuple[int, str]]:
-    """Return list of (student_pk, achievement_key) to grant.
-
-    Reads current LearningRecord state from DB for `affected_student_pks`,
-    then applies optional `overlay_records` (used by preview to simulate
-    the post-commit state without writing). Already-earned achievements
-    are filtered out via the StudentAchievement table.
-    """
-    if not affected_student_pks:
-        return []
-
-    # state[(student_pk, unit_code)] = (pretest_score, quiz_score)
-    state: dict[tuple[int, str], tuple[float | None, float | None]] = {}
+# ─── Record achievement helpers ───────────────────────────────────────
 
-    rows = (await db.execute(
-        select(
-            LearningRecord.student_id,
-            Unit.code,
-            LearningRecord.pretest_score,
-            LearningRecord.quiz_score,
-        )
-        .join(Unit, LearningRecord.unit_id == Unit.id)
-        .where(
-            LearningRecord.student_id.in_(affected_student_pks),
-            Unit.code.in_(_AUTO_AWARD_UNIT_CODES),
-        )
-    )).all()
-    for sid, code, pretest, quiz in rows:
-        state[(sid, code)] = (pretest, quiz)
-
-    if overlay_records:
-        sid_to_pk = student_id_to_pk or {}
-        for rec in overlay_records:
-            if rec.unit_code not in _AUTO_AWARD_UNIT_CODES:
-                continue
-            sid = sid_to_pk.get(rec.student_id)
-            if sid is None:
-                continue
-            existing_pretest, existing_quiz = state.get((sid, rec.unit_code), (None, None))
-            new_pretest = rec.pretest_score if rec.pretest_score is not None else existing_pretest
-            new_quiz = rec.quiz_score if rec.quiz_score is not None else existing_quiz
-            state[(sid, rec.unit_code)] = (new_pretest, new_quiz)
-
-    candidates: list[tuple[int, str]] = []
-    for (sid, code), (pretest, quiz) in state.items():
-        pretest_key = _achievement_key_for(code, "pretest_score")
-        complete_key = _achievement_key_for(code, "quiz_score")
-        if pretest is not None and pretest_key:
-            candidates.append((sid, pretest_key))
-        if quiz is not None and complete_key:
-            candidates.append((sid, complete_key))
-
-    if not candidates:
-        return []
+# Score-list columns; pretest / quiz scores earn the chapter achievements
+_SCORE_FIELDS: tuple[str, ...] = ("pretest_score", "quiz_score")
 
-    student_ids = {sid for sid, _ in candidates}
-    keys = {k for _, k in candidates}
-    already_rows = (await db.execute(
-        select(StudentAchievement.student_id, StudentAchievement.achievement_key)
-        .where(
-            StudentAchievement.student_id.in_(student_ids),
-            StudentAchievement.achievement_key.in_(keys),
-        )
-    )).all()
-    already = {(sid, key) for sid, key in already_rows}
 
-    return [(sid, key) for sid, key in candidates if (sid, key) not in already]
+def _record_committed_grants(grants: list[AchievementGrant]) -> None:
+    """After commit: remember the grants, drop the recipients' cached identity."""
+    achievement_engine.mark_earned(grants)
+    for sid in {sid for sid, _ in grants}:
+        identity_cache.invalidate(student_id=sid)
 
 
 def _summarize_grants(grants: list[tuple[int, str]]) -> dict:
@@ -1310,51 +1267,6 @@ def _summarize_grants(grants: list[tuple[int, str]]) -> dict:
     }
 
 
-async def _apply_score_achievement_grants(
-    db: AsyncSession,
-    grants: list[tuple[int, str]],
-) -> dict:
-    """Persist grants: bump student.tokens, write TokenTransaction +
-    StudentAchievement rows. Returns the same shape as `_summarize_grants`.
-    """
-    if not grants:
-        return _summarize_grants(grants)
-
-    now = datetime.now(timezone.utc)
-    student_ids = {sid for sid, _ in grants}
-    students = (await db.execute(
-        select(Student).where(Student.id.in_(student_ids))
-    )).scalars().all()
-    student_by_id = {s.id: s for s in students}
-
-    for sid, key in grants:
-        spec = ACHIEVEMENT_TYPES.get(key)
-        student = student_by_id.get(sid)
-        if spec is None or student is None:
-            continue
-        amount = int(spec.get("tokens", 0))
-        student.tokens = (student.tokens or 0) + amount
-        student.updated_at = now
-
-        tx = TokenTransaction(
-            student_id=sid,
-            amount=amount,
-            reason=spec.get("label"),
-            created_at=now,
-        )
-        db.add(tx)
-        await db.flush()  # populate tx.id
-
-        db.add(StudentAchievement(
-            student_id=sid,
-            achievement_key=key,
-            token_transaction_id=tx.id,
-            awarded_at=now,
-        ))
-
-    return _summarize_grants(grants)
-
-
 @router.post("/api/admin/import-excel/scores/preview", response_class=HTMLResponse)
 async def api_excel_scores_preview(
     request: Request,
@@ -1367,80 +1279,53 @@ async def api_excel_scores_preview(
     Also estimates the auto-award (achievements + tokens) that will be
     granted if commit runs, so the admin sees the impact upfront.
     """
-    _validate_excel_upload(file)
-    content = await file.read()
-    if len(content) > _MAX_EXCEL_SIZE:
-        raise HTTPException(status_code=400, detail="檔案超過 5MB 限制")
-
-    parse_result = parse_score_excel(content)
+    token, parse_result = await _parse_excel_preview(file, "scores", parse_score_excel)
 
     students = (await db.execute(select(Student))).scalars().all()
     student_map = {s.student_id: s.id for s in students}
 
-    affected_pks = {
-        student_map[r.student_id]
-        for r in parse_result.records
-        if r.student_id in student_map
-    }
-    grants = await _compute_score_achievement_grants(
-        db,
-        affected_student_pks=affected_pks,
-        overlay_records=parse_result.records,
-        student_id_to_pk=student_map,
-    )
-    award_preview = _summarize_grants(grants)
+    units = (await db.execute(select(Unit))).scalars().all()
+    unit_map = {u.code: u.id for u in units}
+
+    plan = await _plan_import(db, parse_result, student_map, unit_map, _SCORE_FIELDS)
+    award_preview = _summarize_grants(plan.grants)
+    import_tokens.put(token, ImportPreview("scores", parse_result, plan))
 
-    return _build_preview_html(parse_result, student_map, "scores", award_preview=award_preview)
+    return _build_preview_html(
+        parse_result, student_map, "scores", award_preview=award_preview, import_token=token
+    )
 
 
 @router.post("/api/admin/import-excel/scores/commit", response_class=HTMLResponse)
 async def api_excel_scores_commit(
     request: Request,
-    file: UploadFile = File(...),
+    token: str = Form(...),
     user: Student = Depends(require_teacher),
     db: AsyncSession = Depends(get_db),
 ):
-    """Re-parse and commit score-list Excel data to the database, then
-    auto-award chapter pretest / completion achievements (idempotent)."""
-    _validate_excel_upload(file)
-    content = await file.read()
-    if len(content) > _MAX_EXCEL_SIZE:
-        raise HTTPException(status_code=400, detail="檔案超過 5MB 限制")
-
-    parse_result = parse_score_excel(content)
-
-    students = (await db.execute(select(Student))).scalars().all()
-    student_map = {s.student_id: s.id for s in students}
-
-    units = (await db.execute(select(Unit))).scalars().all()
-    unit_map = {u.code: u.id for u in units}
+    """Commit the score-list data planned by the preview identified by *token*,
+    with the chapter pretest / completion achievements the preview showed
+    (see ``achievement_engine``). If any of them was granted since, or the
+    records changed, the commit is rejected (409) and nothing is written.
+    """
+    preview = _claim_import_preview(token, "scores")
+    plan = await _check_import_plan(db, preview)
 
     try:
-        created, updated, warnings = await _upsert_records(
-            db, parse_result.records, student_map, unit_map,
-            update_fields=("pretest_score", "quiz_score"),
-        )
-        await db.flush()  # make upserts visible to the auto-award query
-
-        affected_pks = {
-            student_map[r.student_id]
-            for r in parse_result.records
-            if r.student_id in student_map
-        }
-        grants = await _compute_score_achievement_grants(
-            db, affected_student_pks=affected_pks
-        )
-        award_summary = await _apply_score_achievement_grants(db, grants)
-
+        result = await _write_import_plan(db, plan)
+        award_summary = _summarize_grants(plan.grants)
         await db.commit()
     except Exception as exc:
         await db.rollback()
+        import_tokens.put(token, preview)  # let the teacher retry the same preview
         logger.exception("Excel scores commit failed")
         raise HTTPException(status_code=500, detail=f"寫入資料庫失敗：{exc}") from exc
 
+    _record_committed_grants(plan.grants)
+
     warn_html = ""
-    if warnings:
-        items = "".join(f"<li>{w}</li>" for w in warnings[:20])
+    if result.warnings:
+        items = "".join(f"<li>{w}</li>" for w in result.warnings[:20])
         warn_html = f'<ul class="mt-2 text-[var(--rpg-danger)] text-[10px] list-disc list-inside">{items}</ul>'
 
     ach_count = award_summary["achievements"]
@@ -1471,14 +1356,43 @@ async def api_excel_scores_commit(
     <div class="rounded bg-[var(--rpg-bg-card)] border border-[var(--rpg-gold)] p-4 mt-3">
       <p class="font-tc text-xs font-bold text-[var(--rpg-gold)] mb-2">✓ 匯入完成</p>
       <ul class="font-tc text-xs text-[var(--rpg-text-primary)] space-y-1">
-        <li>新增：<span class="text-[var(--rpg-gold-bright)] font-bold">{created}</span> 筆</li>
-        <li>更新：<span class="text-[var(--rpg-gold-bright)] font-bold">{updated}</span> 筆</li>
+        <li>新增：<span class="text-[var(--rpg-gold-bright)] font-bold">{result.created}</span> 筆</li>
+        <li>更新：<span class="text-[var(--rpg-gold-bright)] font-bold">{result.updated}</span> 筆</li>
+        <li>未變更：<span class="text-[var(--rpg-text-secondary)] font-bold">{result.unchanged}</span> 筆</li>
       </ul>
       {warn_html}
       {award_html}
     </div>"""
 
 
+@router.post("/api/admin/import-preview-rates/export", response_class=HTMLResponse)
+async def api_preview_rates_export(
+    request: Request,
+    user: Student = Depends(require_teacher),
+):
+    """Regenerate data/preview_rates.csv from the TronClass snapshots in data/.
+
+    Same as running ``scripts/export_preview_rates.py`` on the server; the
+    workbook parsing runs in the worker pool. The job parses its snapshots
+    sequentially (``workers=1``): a process pool of its own would escape the
+    ``PARSE_POOL_MAX_JOBS`` cap.
+    """
+    try:
+        output_path = await parse_pool.run(
+            partial(export_preview_rates.run, workers=1), settings.DATA_DIR
+        )
+    except export_preview_rates.PreviewRateError as exc:
+        raise HTTPException(status_code=400, detail=f"無法產生預習率：{exc}") from exc
+    except ParseTimeoutError as exc:
+        raise HTTPException(status_code=504, detail="預習率計算逾時，請稍後再試") from exc
+
+    return f"""
+    <div class="rounded bg-[var(--rpg-bg-card)] border border-[var(--rpg-gold)] p-4 mt-3">
+      <p class="font-tc text-xs font-bold text-[var(--rpg-gold)] mb-2">✓ 已重新產生 preview_rates.csv</p>
+      <p class="font-tc text-xs text-[var(--rpg-text-primary)]">輸出檔案：<span class="font-mono text-[var(--rpg-gold-bright)]">{output_path}</span></p>
+    </div>"""
+
+
 @router.post("/api/admin/import-preview-rates/preview", response_class=HTMLResponse)
 async def api_preview_rates_preview(
     request: Request,
@@ -1532,22 +1446,26 @@ async def api_preview_rates_commit(
     unit_map = {u.code: u.id for u in units}
 
     try:
-        created, updated, warnings = await _upsert_records(
+        result = await _upsert_records(
             db,
             records,
             student_map,
             unit_map,
             update_fields=("preview_score",),
         )
+        grants = await achievement_engine.process(db, result.changes)
+        await refresh_student_options(db, _affected_student_pks(records, student_map))
         await db.commit()
     except Exception as exc:
         await db.rollback()
         logger.exception("Preview-rate commit failed")
         raise HTTPException(status_code=500, detail=f"寫入資料庫失敗：{exc}") from exc
 
+    _record_committed_grants(grants)
+
     warn_html = ""
-    if warnings:
-        items = "".join(f"<li>{warning}</li>" for warning in warnings[:20])
+    if result.warnings:
+        items = "".join(f"<li>{warning}</li>" for warning in result.warnings[:20])
         warn_html = (
             f'<ul class="mt-2 text-[var(--rpg-danger)] text-[10px] list-disc list-inside">'
             f"{items}</ul>"
@@ -1558,8 +1476,9 @@ async def api_preview_rates_commit(
       <p class="font-tc text-xs font-bold text-[var(--rpg-gold)] mb-2">✓ 影片預習分數更新完成</p>
       <ul class="font-tc text-xs text-[var(--rpg-text-primary)] space-y-1">
         <li>來源檔案：<span class="font-mono text-[var(--rpg-gold-bright)]">{_preview_rates_path()}</span></li>
-        <li>新增：<span class="text-[var(--rpg-gold-bright)] font-bold">{created}</span> 筆</li>
-        <li>更新：<span class="text-[var(--rpg-gold-bright)] font-bold">{updated}</span> 筆</li>
+        <li>新增：<span class="text-[var(--rpg-gold-bright)] font-bold">{result.created}</span> 筆</li>
+        <li>更新：<span class="text-[var(--rpg-gold-bright)] font-bold">{result.updated}</span> 筆</li>
+        <li>未變更：<span class="text-[var(--rpg-text-secondary)] font-bold">{result.unchanged}</span> 筆</li>
       </ul>
       {warn_html}
     </div>"""
@@ -1867,6 +1786,11 @@ async def api_admin_update_rule(
     rule.updated_at = datetime.now(timezone.utc)
     await db.commit()
     await db.refresh(rule)
+    # This worker only; the others see the new version within
+    # RULE_SNAPSHOT_CHECK_SECONDS (see app.services.rule_snapshot)
+    await rule_snapshot.refresh(db)
+    await refresh_all_student_options(db)
+    await db.commit()
 
     return {
         "id": rule.id,
@@ -1920,6 +1844,9 @@ async def api_admin_create_rule(
     db.add(rule)
     await db.commit()
     await db.refresh(rule)
+    await rule_snapshot.refresh(db)
+    await refresh_all_student_options(db)
+    await db.commit()
 
     return {
         "id": rule.id,
@@ -1947,6 +1874,9 @@ async def api_admin_delete_rule(
 
     await db.delete(rule)
     await db.commit()
+    await rule_snapshot.refresh(db)
+    await refresh_all_student_options(db)
+    await db.commit()
     return {"status": "ok"}
 
 
@@ -1999,6 +1929,15 @@ async def api_admin_queue(
     }
 
 
+def _generation_history_query(status_filter: str):
+    return _apply_generation_history_filters(
+        select(Card, Student.student_id, Student.name)
+        .join(Student, Card.student_id == Student.id)
+        .order_by(Card.created_at.desc()),
+        status_filter,
+    )
+
+
 def _apply_generation_history_filters(query, status_filter: str):
     query = query.where(
         Card.job_id.isnot(None),
@@ -2031,14 +1970,7 @@ async def admin_generation_history(
     db: AsyncSession = Depends(get_db),
 ):
     """生圖歷史紀錄頁面。"""
-    query = _apply_generation_history_filters(
-        select(Card, Student.student_id, Student.name)
-        .join(Student, Card.student_id == Student.id)
-        .order_by(Card.created_at.desc()),
-        status_filter,
-    )
-
-    rows = (await db.execute(query)).all()
+    rows = (await db.execute(_generation_history_query(status_filter))).all()
 
     _TZ_TAIPEI = timezone(timedelta(hours=8))
 
@@ -2103,14 +2035,7 @@ async def admin_generation_history_export(
     db: AsyncSession = Depends(get_db),
 ):
     """Download generation history as CSV."""
-    query = _apply_generation_history_filters(
-        select(Card, Student.student_id, Student.name)
-        .join(Student, Card.student_id == Student.id)
-        .order_by(Card.created_at.desc()),
-        status_filter,
-    )
-
-    rows = (await db.execute(query)).all()
+    rows = (await db.execute(_generation_history_query(status_filter))).all()
 
     output = io.StringIO()
     writer = csv.writer(output)
@@ -2378,7 +2303,11 @@ async def api_admin_simulation_generate(
 ):
     """送出模擬生圖請求。"""
     from app.services.ai_worker import get_ai_worker_service
-    from app.services.scoring import determine_border_style, roll_rarity
+    from app.services.scoring import (
+        determine_border_style,
+        rarity_sampler,
+        simulation_rarity_sampler,
+    )
 
     body = await request.json()
     card_config: dict = body.get("card_config", {})
@@ -2417,7 +2346,16 @@ async def api_admin_simulation_generate(
         if requested_seed < 0:
             raise HTTPException(status_code=400, detail="Seed ??????????? -1 / ??????")
 
-    rarity = roll_rarity(level) if rarity_input == "auto" else rarity_input
+    if rarity_input == "auto":
+        # A fixed seed also reproduces the rarity roll
+        sampler = (
+            rarity_sampler.stream(requested_seed)
+            if requested_seed is not None
+            else simulation_rarity_sampler
+        )
+        rarity = sampler.roll(level)
+    else:
+        rarity = rarity_input
     border = determine_border_style(rarity)
     card_config["level"] = level
     card_config["rarity"] = rarity
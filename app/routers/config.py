@@ -12,6 +12,11 @@ from app.models.learning_record import LearningRecord
 from app.models.student import Student
 from app.models.unit import Unit
 from app.services.scoring import get_available_options
+from app.services.student_options import (
+    load_student_options,
+    load_student_unit_options,
+    refresh_student_options,
+)
 
 router = APIRouter(prefix="/api/config", tags=["config"])
 
@@ -29,6 +34,15 @@ class ConfigUpdateResponse(BaseModel):
     tokens_spent: int
 
 
+@router.get("/options")
+async def get_all_config_options(
+    user: Student = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Return available attribute options for every unit the user has scores for."""
+    return {"units": await load_student_options(db, user.id)}
+
+
 @router.get("/{unit_code}/options")
 async def get_config_options(
     unit_code: str,
@@ -54,6 +68,11 @@ async def get_config_options(
     if record is None:
         return {"unit_code": unit_code, "options": {}, "message": "No learning record found"}
 
+    # Scored units are materialized; anything else is computed below
+    options = await load_student_unit_options(db, user.id, unit_code)
+    if options is not None:
+        return {"unit_code": unit_code, "options": options}
+
     # Get character class for weapon affinity (unit_4)
     character_class = None
     if unit_code == "unit_4":
@@ -106,6 +125,8 @@ async def update_config(
     if existing:
         # Changing an attribute selection is free — tokens are spent at generation time
         existing.attribute_value = body.attribute_value
+        if body.attribute_type == "class":
+            await refresh_student_options(db, [user.id])  # unit_4 weapon affinity
         await db.commit()
         await db.refresh(existing)
 
@@ -125,6 +146,8 @@ async def update_config(
             attribute_value=body.attribute_value,
         )
         db.add(config)
+        if body.attribute_type == "class":
+            await refresh_student_options(db, [user.id])  # unit_4 weapon affinity
         await db.commit()
         await db.refresh(config)
 
@@ -23,6 +23,9 @@ from app.models.learning_record import LearningRecord
 from app.models.student import Student
 from app.models.token_transaction import TokenTransaction
 from app.models.unit import Unit
+from app import queries
+from app.services.identity_cache import identity_cache
+from app.services.token_ledger import charge_tokens, credit_tokens, current_balance
 from app.services.system_settings import get_system_setting
 from app.services import get_ai_worker_service
 
@@ -128,24 +131,14 @@ async def generate_card(
 
     # 0. Check if this is a regeneration (user already has non-failed cards)
     existing_result = await db.execute(
-        select(Card)
-        .where(
-            Card.student_id == user.id,
-            Card.status.in_(["pending", "generating", "completed"]),
-        )
-        .limit(1)
+        queries.first_card_in_status(user.id, queries.ACTIVE_CARD_STATUSES)
     )
     is_regen = existing_result.scalar_one_or_none() is not None
     token_cost = CARD_REGEN_COST if is_regen else 0
 
     # 409: block duplicate in-flight requests (pending/generating already exists)
     in_flight_result = await db.execute(
-        select(Card)
-        .where(
-            Card.student_id == user.id,
-            Card.status.in_(["pending", "generating"]),
-        )
-        .limit(1)
+        queries.first_card_in_status(user.id, queries.IN_FLIGHT_CARD_STATUSES)
     )
     if in_flight_result.scalar_one_or_none() is not None:
         raise HTTPException(
@@ -153,10 +146,12 @@ async def generate_card(
             detail="已有一張卡牌正在生成中，請稍候完成後再重試。",
         )
 
-    if is_regen and user.tokens < token_cost:
+    # Fail fast on the row's balance (the user object may be a cached copy);
+    # the charge itself is the conditional UPDATE in step 5
+    if is_regen and (balance := await current_balance(db, user)) < token_cost:
         raise HTTPException(
             status_code=400,
-            detail=f"代幣不足（重新生成需要 {token_cost} 代幣，目前餘額 {user.tokens}）",
+            detail=f"代幣不足（重新生成需要 {token_cost} 代幣，目前餘額 {balance}）",
         )
 
     # 1. Gather card configs for this student
@@ -246,11 +241,7 @@ async def generate_card(
 
     if image_backend == "cloud" and mode_raw == "keep":
         anchor_result = await db.execute(
-            select(Card).where(
-                Card.student_id == user.id,
-                Card.is_display == True,  # noqa: E712
-                Card.status == "completed",
-            )
+            queries.display_cards(user.id).where(Card.status == "completed")
         )
         anchor_card = anchor_result.scalar_one_or_none()
         if anchor_card is not None and anchor_card.image_url:
@@ -293,9 +284,7 @@ async def generate_card(
         prev_card.is_display = False
 
     # Also clear any other stale is_display flags (guards against legacy data)
-    stale_display_result = await db.execute(
-        select(Card).where(Card.student_id == user.id, Card.is_display == True)  # noqa: E712
-    )
+    stale_display_result = await db.execute(queries.display_cards(user.id))
     for stale_card in stale_display_result.scalars().all():
         stale_card.is_display = False
 
@@ -316,7 +305,13 @@ async def generate_card(
     db.add(new_card)
 
     if token_cost > 0:
-        user.tokens -= token_cost
+        if await charge_tokens(db, user, token_cost) is None:
+            # Spent elsewhere since the check above
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"代幣不足（重新生成需要 {token_cost} 代幣）",
+            )
         db.add(TokenTransaction(
             student_id=user.id,
             amount=-token_cost,
@@ -332,6 +327,8 @@ async def generate_card(
 
     await db.commit()
     await db.refresh(new_card)
+    if token_cost > 0:
+        identity_cache.invalidate(user.email, student_id=user.id)
 
     # 6. Submit to ai-worker
     ai_worker = get_ai_worker_service()
@@ -370,7 +367,7 @@ async def generate_card(
 
         # Refund tokens if the ai-worker submission failed
         if token_cost > 0:
-            user.tokens += token_cost
+            await credit_tokens(db, user, token_cost)
             refund_txn = TokenTransaction(
                 student_id=user.id,
                 amount=token_cost,
@@ -378,6 +375,8 @@ async def generate_card(
             )
             db.add(refund_txn)
         await db.commit()
+        if token_cost > 0:
+            identity_cache.invalidate(user.email, student_id=user.id)
         raise HTTPException(
             status_code=502,
             detail="無法連接 AI 生成服務，請稍後再試。",
@@ -412,11 +411,7 @@ async def generate_info(
     backend = await _read_image_backend(db)
 
     display_result = await db.execute(
-        select(Card).where(
-            Card.student_id == user.id,
-            Card.is_display == True,  # noqa: E712
-            Card.status == "completed",
-        )
+        queries.display_cards(user.id).where(Card.status == "completed")
     )
     display_card = display_result.scalar_one_or_none()
 
@@ -503,9 +498,7 @@ async def set_display_card(
         raise HTTPException(status_code=409, detail="只有生成完成的卡牌才能設為大廳展示。")
 
     # Clear is_display on all student's cards, then set this one
-    all_cards_result = await db.execute(
-        select(Card).where(Card.student_id == user.id, Card.is_display == True)  # noqa: E712
-    )
+    all_cards_result = await db.execute(queries.display_cards(user.id))
     for c in all_cards_result.scalars().all():
         c.is_display = False
 
@@ -13,9 +13,11 @@ from app.models.card import Card
 from app.models.card_config import CardConfig
 from app.models.learning_record import LearningRecord
 from app.models.student import Student
-from app.models.token_transaction import TokenTransaction
 from app.models.unit import Unit
-from app.services.scoring import get_available_options
+from app import queries
+from app.services.identity_cache import identity_cache
+from app.services.scoring import get_available_options, get_available_options_bulk
+from app.services.student_options import load_student_options
 from app.services.system_settings import get_system_setting
 from app.templating import templates
 
@@ -57,11 +59,7 @@ async def index(request: Request, db: AsyncSession = Depends(get_db)):
 
     if display_student_id is not None:
         # Fetch latest card
-        result = await db.execute(
-            select(Card)
-            .where(Card.student_id == display_student_id, Card.is_display == True)  # noqa: E712
-            .limit(1)
-        )
+        result = await db.execute(queries.display_cards(display_student_id).limit(1))
         latest_card = result.scalar_one_or_none()
 
         # Fetch learning records
@@ -98,11 +96,7 @@ async def cards_gallery(
 ):
     """My cards gallery page (guests see demo cards)."""
     if user:
-        result = await db.execute(
-            select(Card)
-            .where(Card.student_id == user.id, Card.is_hidden == False, Card.status != "failed")  # noqa: E712
-            .order_by(Card.created_at.desc())
-        )
+        result = await db.execute(queries.gallery_cards(user.id))
     else:
         # Guest: show all completed cards as demo
         result = await db.execute(
@@ -149,12 +143,7 @@ async def hall(request: Request, db: AsyncSession = Depends(get_db)):
     """Hall of heroes - all students' latest cards."""
     user = request.state.user
 
-    result = await db.execute(
-        select(Card)
-        .where(Card.is_display == True, Card.is_hidden == False)  # noqa: E712
-        .options(selectinload(Card.student))
-        .order_by(Card.level_number.desc())
-    )
+    result = await db.execute(queries.hall_cards().options(selectinload(Card.student)))
     hero_cards = result.scalars().all()
 
     return templates.TemplateResponse(
@@ -216,11 +205,23 @@ async def progress(
         for cc in card_configs:
             configs_by_unit.setdefault(cc.unit_id, []).append(cc)
 
-    # Character class is needed for unit_4 weapon affinity filtering
-    character_class = next(
-        (cc.attribute_value for cc in card_configs if cc.attribute_type == "class"),
-        None,
+    # Materialized options for every scored unit (one indexed read)
+    available_by_unit = (
+        await load_student_options(db, display_student_id)
+        if display_student_id is not None
+        else {}
     )
+    # Scored units without a row yet: compute live for this view only (the
+    # writers and the startup refresh own the table; a GET never writes)
+    missing = {
+        lr.unit.code: lr
+        for lr in records_by_unit.values()
+        if lr.quiz_score is not None and lr.unit.code not in available_by_unit
+    }
+    if missing:
+        available_by_unit.update(
+            await get_available_options_bulk(missing, card_configs, db=db)
+        )
 
     # Build enriched unit data with scoring info
     unit_data = []
@@ -249,17 +250,7 @@ async def progress(
         # Build chosen attributes display
         chosen_attrs = {c.attribute_type: c.attribute_value for c in configs}
 
-        # Get available options from scoring engine
-        available = {}
-        if record and record.quiz_score is not None:
-            available = await get_available_options(
-                u.code,
-                preview_score=record.preview_score,
-                completion_rate=record.completion_rate,
-                quiz_score=record.quiz_score,
-                character_class=character_class if u.code == "unit_4" else None,
-                db=db,
-            )
+        available = available_by_unit.get(u.code, {})
 
         unit_data.append({
             "unit": u,
@@ -278,12 +269,7 @@ async def progress(
     has_configs = False
     if user:
         card_check = await db.execute(
-            select(Card)
-            .where(
-                Card.student_id == user.id,
-                Card.status.in_(["pending", "generating", "completed"]),
-            )
-            .limit(1)
+            queries.first_card_in_status(user.id, queries.ACTIVE_CARD_STATUSES)
         )
         has_cards = card_check.scalar_one_or_none() is not None
 
@@ -454,11 +440,7 @@ async def tokens_history(
             {"user": None, "transactions": [], "guest_mode": settings.GUEST_MODE},
         )
 
-    result = await db.execute(
-        select(TokenTransaction)
-        .where(TokenTransaction.student_id == user.id)
-        .order_by(TokenTransaction.created_at.desc())
-    )
+    result = await db.execute(queries.token_history(user.id))
     transactions = result.scalars().all()
 
     return templates.TemplateResponse(
@@ -537,6 +519,7 @@ async def profile_update(
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    identity_cache.invalidate(user.email, student_id=user.id)
 
     return templates.TemplateResponse(
         request, "profile.html",
@@ -2,13 +2,15 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.dependencies import get_current_user
 from app.models.student import Student
 from app.models.token_transaction import TokenTransaction
+from app import queries
+from app.services.identity_cache import identity_cache
+from app.services.token_ledger import charge_tokens, current_balance
 
 router = APIRouter(prefix="/api/tokens", tags=["tokens"])
 
@@ -40,14 +42,14 @@ async def spend_tokens(
     """Deduct tokens from the user's balance."""
     if body.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
-    if user.tokens < body.amount:
+    # Charged against the row, not the (possibly cached) user object
+    if await charge_tokens(db, user, body.amount) is None:
+        balance = await current_balance(db, user)
         raise HTTPException(
             status_code=400,
-            detail=f"代幣不足（需要 {body.amount}，餘額 {user.tokens}）",
+            detail=f"代幣不足（需要 {body.amount}，餘額 {balance}）",
         )
 
-    user.tokens -= body.amount
-
     txn = TokenTransaction(
         student_id=user.id,
         amount=-body.amount,
@@ -56,6 +58,7 @@ async def spend_tokens(
     db.add(txn)
     await db.commit()
     await db.refresh(txn)
+    identity_cache.invalidate(user.email, student_id=user.id)
 
     return SpendResponse(
         ok=True,
@@ -70,11 +73,7 @@ async def token_history(
     db: AsyncSession = Depends(get_db),
 ):
     """Return user's token transaction history."""
-    result = await db.execute(
-        select(TokenTransaction)
-        .where(TokenTransaction.student_id == user.id)
-        .order_by(TokenTransaction.created_at.desc())
-    )
+    result = await db.execute(queries.token_history(user.id))
     txns = result.scalars().all()
 
     return [
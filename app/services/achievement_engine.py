@@ -0,0 +1,236 @@
+"""Incremental achievement evaluation driven by learning-record changes.
+
+The chapter achievements in ``ACHIEVEMENT_TYPES`` follow from learning
+records: ``chapter_<n>_pretest`` is earned once ``unit_<n>`` has a pretest
+score, ``chapter_<n>_complete`` once it has a quiz score. Those rules are
+derived from the keys at import time (``build_rules``); the other types
+(early bird, surveys) have no record rule and stay manual grants.
+
+Every learning-record writer (CSV import, Excel imports, the admin record
+editor) passes the ``RecordChange`` list of its write to
+``achievement_engine.process`` before committing. The engine only looks at
+those (student, unit, field) tuples, so an import that touched ten scores
+evaluates ten rules, not every record of every affected student.
+
+"Already earned" is answered from an in-memory bitset per student (one bit
+per achievement type, in ``ACHIEVEMENT_TYPES`` order). Grants made by
+another worker only leave bits missing, so the candidates the bitset lets
+through are confirmed with one query, which also loads those students' bits.
+Callers call ``mark_earned`` after their commit; bits are never set for
+grants that might still be rolled back.
+
+A bit that is set but no longer true would suppress an achievement. That
+happens when a grant is revoked, or when a deleted student's primary key is
+reused. So the bits belong to a generation of the ``students`` and
+``student_achievements`` tables: row count, max id and newest timestamp,
+read with one small query at most every ``ACHIEVEMENT_CACHE_CHECK_SECONDS``.
+When the generation moves (deletes, reused ids, or grants from anywhere),
+every bitset is dropped and reloaded by the confirm query as needed.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.achievement import ACHIEVEMENT_TYPES, StudentAchievement
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services.record_import import RecordChange
+from app.services.token_ledger import Grant, apply_grants
+
+logger = logging.getLogger(__name__)
+
+# achievement key pattern -> learning record field that earns it
+_RULE_PATTERNS: dict[re.Pattern[str], str] = {
+    re.compile(r"chapter_(\d+)_pretest"): "pretest_score",
+    re.compile(r"chapter_(\d+)_complete"): "quiz_score",
+}
+
+AchievementGrant = tuple[int, str]  # (student pk, achievement key)
+
+
+@dataclass(frozen=True)
+class AchievementRule:
+    """Earn ``key`` when ``field`` of the student's ``unit_code`` record is set."""
+
+    key: str
+    unit_code: str
+    field: str
+    tokens: int
+    label: str
+
+    def matches(self, value: float | None) -> bool:
+        return value is not None
+
+
+def build_rules(types: Mapping[str, dict] = ACHIEVEMENT_TYPES) -> list[AchievementRule]:
+    """Record rules for the achievement types whose key names a chapter field."""
+    rules = []
+    for key, spec in types.items():
+        for pattern, field in _RULE_PATTERNS.items():
+            match = pattern.fullmatch(key)
+            if match:
+                rules.append(AchievementRule(
+                    key=key,
+                    unit_code=f"unit_{match.group(1)}",
+                    field=field,
+                    tokens=int(spec.get("tokens", 0)),
+                    label=spec.get("label", key),
+                ))
+    return rules
+
+
+def _table_generation(id_column, time_column) -> list:
+    return [
+        select(func.count(id_column)).scalar_subquery(),
+        select(func.max(id_column)).scalar_subquery(),
+        select(func.max(time_column)).scalar_subquery(),
+    ]
+
+
+async def _generation(db: AsyncSession) -> tuple:
+    result = await db.execute(select(
+        *_table_generation(Student.id, Student.created_at),
+        *_table_generation(StudentAchievement.id, StudentAchievement.awarded_at),
+    ))
+    return tuple(result.one())
+
+
+class AchievementEngine:
+    """Evaluates record changes against the rules; tracks earned achievements."""
+
+    def __init__(
+        self,
+        types: Mapping[str, dict] = ACHIEVEMENT_TYPES,
+        *,
+        check_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rules = build_rules(types)
+        self._rules_by_target: dict[tuple[str, str], list[AchievementRule]] = {}
+        for rule in self.rules:
+            self._rules_by_target.setdefault((rule.unit_code, rule.field), []).append(rule)
+        self._rules_by_key = {rule.key: rule for rule in self.rules}
+        self._fields = {rule.field for rule in self.rules}
+        self._bits = {key: 1 << i for i, key in enumerate(types)}
+        self._earned: dict[int, int] = {}  # student pk -> bitset of known-earned keys
+        self._unit_codes: dict[int, str] = {}  # unit pk -> code
+        self.check_interval = check_interval
+        self._clock = clock
+        self._generation: tuple | None = None  # of the tables _earned was read from
+        self._checked_at: float | None = None
+
+    def clear(self) -> None:
+        self._earned.clear()
+        self._unit_codes.clear()
+        self._generation = None
+        self._checked_at = None
+
+    def has_earned(self, student_pk: int, key: str) -> bool:
+        """True if *key* is known to be earned (False may be stale)."""
+        return bool(self._earned.get(student_pk, 0) & self._bits.get(key, 0))
+
+    def mark_earned(self, grants: Iterable[AchievementGrant]) -> None:
+        """Record committed grants."""
+        if self._set_bits(grants):
+            # Our own insert moved the tables past the recorded generation; a
+            # later revoke could move them back to it unnoticed
+            self._generation = None
+
+    def _set_bits(self, grants: Iterable[AchievementGrant]) -> bool:
+        found = False
+        for student_pk, key in grants:
+            self._earned[student_pk] = self._earned.get(student_pk, 0) | self._bits.get(key, 0)
+            found = True
+        return found
+
+    async def candidates(
+        self, db: AsyncSession, changes: Iterable[RecordChange]
+    ) -> list[AchievementGrant]:
+        """Achievements the changes satisfy, in change order (earned or not)."""
+        relevant = [c for c in changes if c.field in self._fields]
+        if not relevant:
+            return []
+        unit_codes = await self._load_unit_codes(db, {c.unit_pk for c in relevant})
+
+        found: dict[AchievementGrant, None] = {}
+        for change in relevant:
+            unit_code = unit_codes.get(change.unit_pk)
+            for rule in self._rules_by_target.get((unit_code, change.field), ()):
+                if rule.matches(change.value):
+                    found[(change.student_pk, rule.key)] = None
+        return list(found)
+
+    async def unearned(
+        self, db: AsyncSession, candidates: Iterable[AchievementGrant]
+    ) -> list[AchievementGrant]:
+        """Drop (student, key) pairs the student already has."""
+        candidates = list(dict.fromkeys(candidates))
+        if not candidates:
+            return []
+        await self._check_generation(db)
+        pending = [(sid, key) for sid, key in candidates if not self.has_earned(sid, key)]
+        if not pending:
+            return []
+        rows = await db.execute(
+            select(StudentAchievement.student_id, StudentAchievement.achievement_key).where(
+                StudentAchievement.student_id.in_({sid for sid, _ in pending})
+            )
+        )
+        self._set_bits(rows.all())
+        return [(sid, key) for sid, key in pending if not self.has_earned(sid, key)]
+
+    async def evaluate(
+        self, db: AsyncSession, changes: Iterable[RecordChange]
+    ) -> list[AchievementGrant]:
+        """Achievements the changes would newly earn (nothing is written)."""
+        return await self.unearned(db, await self.candidates(db, changes))
+
+    async def process(
+        self, db: AsyncSession, changes: Sequence[RecordChange]
+    ) -> list[AchievementGrant]:
+        """Grant what *changes* newly earn (not committed); returns the grants.
+
+        After committing, pass the result to ``mark_earned``.
+        """
+        grants = await self.evaluate(db, changes)
+        await self.grant(db, grants)
+        return grants
+
+    async def grant(self, db: AsyncSession, grants: Sequence[AchievementGrant]) -> None:
+        """Write already-evaluated grants (not committed), e.g. a stored preview."""
+        await apply_grants(db, [
+            Grant(sid, self._rules_by_key[key].tokens, self._rules_by_key[key].label, key)
+            for sid, key in grants
+        ])
+        if grants:
+            logger.info("Granted %d record achievements", len(grants))
+
+    async def _check_generation(self, db: AsyncSession) -> None:
+        """Drop every bitset if the tables changed since (once per interval)."""
+        now = self._clock()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        generation = await _generation(db)
+        if generation != self._generation:
+            if self._earned:
+                logger.debug("students / student_achievements changed; dropping bitsets")
+            self._earned.clear()
+            self._generation = generation
+
+    async def _load_unit_codes(self, db: AsyncSession, unit_pks: set[int]) -> dict[int, str]:
+        if not unit_pks <= self._unit_codes.keys():
+            self._unit_codes = dict((await db.execute(select(Unit.id, Unit.code))).all())
+        return self._unit_codes
+
+
+achievement_engine = AchievementEngine(check_interval=settings.ACHIEVEMENT_CACHE_CHECK_SECONDS)
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.models.student import Student
 from app.models.token_transaction import TokenTransaction
+from app.services.identity_cache import identity_cache
 
 TAIPEI_TZ = ZoneInfo("Asia/Taipei")
 
@@ -52,9 +53,16 @@ async def bind_student_email(
     student.nickname = nickname
     await db.commit()
     await db.refresh(student)
+    identity_cache.invalidate(email, student_id=student.id)
     return student
 
 
+def is_daily_login_tracked(student: Student) -> bool:
+    """Return True when today's (Asia/Taipei) login is already recorded."""
+    today = datetime.now(TAIPEI_TZ).date()
+    return student.last_login_date == today and student.last_login_at is not None
+
+
 async def track_daily_login(db: AsyncSession, student: Student) -> bool:
     """Record the first login of each calendar day (Asia/Taipei) for any role.
 
@@ -64,13 +72,11 @@ async def track_daily_login(db: AsyncSession, student: Student) -> bool:
     Returns True if this call triggered a first-of-day daily bonus for a
     student, False otherwise (already tracked today, or non-student role).
     """
-    today = datetime.now(TAIPEI_TZ).date()
-    fully_tracked = (
-        student.last_login_date == today and student.last_login_at is not None
-    )
-    if fully_tracked:
+    if is_daily_login_tracked(student):
         return False
 
+    today = datetime.now(TAIPEI_TZ).date()
+
     is_first_login_today = student.last_login_date != today
 
     student.last_login_date = today
@@ -84,6 +90,7 @@ async def track_daily_login(db: AsyncSession, student: Student) -> bool:
 
     await db.commit()
     await db.refresh(student)
+    identity_cache.put(student)
     return awarded
 
 
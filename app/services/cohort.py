@@ -0,0 +1,191 @@
+"""Vectorized scoring for a whole cohort of students.
+
+``scoring._learning_exp`` / ``_tier`` / ``calculate_card_level`` work on one
+(student, unit) pair at a time, which is fine for a single card but turns
+admin views and exports into nested Python loops. ``CohortScores`` loads the
+``learning_records`` matrix once — students on axis 0, units (in
+``sort_order``) on axis 1 — and computes EXP, tiers, total EXP and level for
+everyone with NumPy array operations.
+
+The formulas are the same as the scalar ones, evaluated in the same order,
+so every value matches them bit for bit:
+
+* unit EXP = preview * 0.2 + completion * 0.4 + quiz * 0.4 (missing = 0),
+  except unit_6 whose EXP is its completion rate;
+* total EXP sums the units left to right; level = round-half-up(total / 6),
+  clamped to 1–100 like ``calculate_card_level``.
+
+Admin views show unit EXP rounded to one decimal (unit_6 as is), and tiers
+are classified from that displayed value, not from the raw EXP, so an
+89.96 that shows as "90" is coloured as S.
+
+Cells without a learning record (and unit_6 cells without a completion rate)
+are NaN in ``exp`` and ``None`` in ``display_exp``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.learning_record import LearningRecord
+from app.models.unit import Unit
+from app.services.scoring import TIER_ORDER
+
+# Lower bounds of S, A, B, C (anything below is D), matching scoring._tier
+_TIER_FLOORS = np.array([90.0, 80.0, 60.0, 40.0])
+_TIER_LABELS = np.array(TIER_ORDER + [""])  # "" = no EXP for that cell
+
+# (student_id, unit_id, preview_score, completion_rate, quiz_score)
+RecordRow = tuple[int, int, float | None, float | None, float | None]
+
+
+class CohortScores:
+    """Score matrices for a list of students across all units."""
+
+    def __init__(
+        self,
+        student_ids: Sequence[int],
+        unit_codes: Sequence[str],
+        preview: np.ndarray,
+        completion: np.ndarray,
+        quiz: np.ndarray,
+        has_record: np.ndarray,
+    ) -> None:
+        self.student_ids = list(student_ids)
+        self.unit_codes = list(unit_codes)
+        self.preview = preview
+        self.completion = completion
+        self.quiz = quiz
+        self.has_record = has_record
+        self._row = {sid: i for i, sid in enumerate(self.student_ids)}
+
+        weighted = (
+            np.nan_to_num(preview) * 0.2
+            + np.nan_to_num(completion) * 0.4
+            + np.nan_to_num(quiz) * 0.4
+        )
+        exp = np.where(has_record, weighted, np.nan)
+        unit_6 = [j for j, code in enumerate(self.unit_codes) if code == "unit_6"]
+        if unit_6:
+            exp[:, unit_6] = np.where(has_record[:, unit_6], completion[:, unit_6], np.nan)
+        self.exp = exp
+        self._unit_6 = unit_6
+
+        # Column by column so the float sum follows the scalar (per-unit) order
+        total = np.zeros(len(self.student_ids))
+        for j in range(len(self.unit_codes)):
+            total += np.nan_to_num(exp[:, j])
+        self.total_exp = total
+
+        clamped = np.clip(total, 0.0, 600.0)
+        self.levels = np.maximum(1, np.floor(clamped / 6 + 0.5)).astype(np.int64)
+
+    @classmethod
+    def from_rows(
+        cls,
+        student_ids: Sequence[int],
+        units: Sequence[Unit],
+        rows: Iterable[RecordRow],
+    ) -> CohortScores:
+        shape = (len(student_ids), len(units))
+        preview = np.full(shape, np.nan)
+        completion = np.full(shape, np.nan)
+        quiz = np.full(shape, np.nan)
+        has_record = np.zeros(shape, dtype=bool)
+
+        data = np.array(list(rows), dtype=float).reshape(-1, 5)  # None -> NaN
+        i, found_i = _positions(student_ids, data[:, 0])
+        j, found_j = _positions([u.id for u in units], data[:, 1])
+        keep = found_i & found_j
+        i, j, data = i[keep], j[keep], data[keep]
+
+        has_record[i, j] = True
+        preview[i, j] = data[:, 2]
+        completion[i, j] = data[:, 3]
+        quiz[i, j] = data[:, 4]
+        return cls(student_ids, [u.code for u in units], preview, completion, quiz, has_record)
+
+    @property
+    def tiers(self) -> np.ndarray:
+        """Tier letter of the displayed EXP per cell ("" where there is no EXP)."""
+        exp = self._displayed_near_floors()
+        index = np.searchsorted(-_TIER_FLOORS, -np.nan_to_num(exp, nan=-1.0), side="left")
+        return np.where(np.isnan(exp), _TIER_LABELS[-1], _TIER_LABELS[index])
+
+    def _displayed_near_floors(self) -> np.ndarray:
+        """``exp``, with the cells whose display rounds up onto a tier floor rounded.
+
+        The floors are whole numbers, so only values less than 0.05 below one
+        can cross it. Those few are rounded with ``round`` as ``display_exp``
+        does (``np.round`` differs from it on some halfway values).
+        """
+        exp = self.exp.copy()
+        ceil = np.ceil(exp)
+        near = np.isin(ceil, _TIER_FLOORS) & (ceil - exp <= 0.05)
+        near[:, self._unit_6] = False
+        for i, j in zip(*np.nonzero(near)):
+            exp[i, j] = round(float(exp[i, j]), 1)
+        return exp
+
+    def row(self, student_id: int) -> int | None:
+        return self._row.get(student_id)
+
+    def display_exp(self, student_id: int) -> list[float | None]:
+        """Per-unit EXP as shown in admin views: 1 decimal, unit_6 unrounded."""
+        i = self._row.get(student_id)
+        if i is None:
+            return [None] * len(self.unit_codes)
+        values: list[float | None] = []
+        for j, code in enumerate(self.unit_codes):
+            value = self.exp[i, j]
+            if np.isnan(value):
+                values.append(None)
+            elif code == "unit_6":
+                values.append(float(value))
+            else:
+                values.append(round(float(value), 1))
+        return values
+
+
+def _positions(keys: Sequence[int], values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Index of each value in *keys*, plus a mask of the values that were found."""
+    keys_arr = np.asarray(keys, dtype=np.int64)
+    if keys_arr.size == 0:
+        return np.zeros(values.shape, dtype=np.int64), np.zeros(values.shape, dtype=bool)
+    order = np.argsort(keys_arr, kind="stable")
+    sorted_keys = keys_arr[order]
+    values = values.astype(np.int64)
+    pos = np.minimum(np.searchsorted(sorted_keys, values), sorted_keys.size - 1)
+    return order[pos], sorted_keys[pos] == values
+
+
+def cohort_records_query(student_ids: Sequence[int] | None = None) -> Select:
+    """``RecordRow`` columns for *student_ids* (None: every record)."""
+    query = select(
+        LearningRecord.student_id,
+        LearningRecord.unit_id,
+        LearningRecord.preview_score,
+        LearningRecord.completion_rate,
+        LearningRecord.quiz_score,
+    )
+    if student_ids is not None:
+        query = query.where(LearningRecord.student_id.in_(student_ids))
+    return query
+
+
+async def load_cohort(
+    db: AsyncSession,
+    units: Sequence[Unit],
+    student_ids: Sequence[int] | None = None,
+) -> CohortScores:
+    """Load learning records for *student_ids* (default: everyone with a record)."""
+    if student_ids is not None and not student_ids:
+        return CohortScores.from_rows([], units, [])
+    rows = (await db.execute(cohort_records_query(student_ids))).all()
+    if student_ids is None:
+        student_ids = sorted({row[0] for row in rows})
+    return CohortScores.from_rows(student_ids, units, rows)
@@ -3,12 +3,20 @@
 Two report types are supported:
 - Completion report (完成度_xxx.xlsx): completion_rate only
 - Score list report (score_list.xlsx): pretest_score + quiz_score
+
+Workbooks are opened with openpyxl's ``read_only=True`` mode and consumed as
+a single row stream: header rows are taken off the front of the stream one at
+a time, then data rows are parsed as they are read. Only the parsed records
+are kept, so memory follows the number of students x units rather than the
+size of the sheet, and a whole department's report can be imported.
 """
 
 from __future__ import annotations
 
+import io
 import logging
 import re
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from typing import IO
 
@@ -56,6 +64,30 @@ class ExcelParseResult:
     parse_errors: list[str] = field(default_factory=list)
 
 
+class _RecordAccumulator:
+    """Builds ``result.records`` with a (student_id, unit_code) index.
+
+    Records keep first-seen order, same as the old linear ``_find_record``
+    scan, but each cell is an O(1) lookup instead of O(records).
+    """
+
+    def __init__(self, records: list[StudentRecord]) -> None:
+        self._records = records
+        self._index: dict[tuple[str, str], StudentRecord] = {
+            (r.student_id, r.unit_code): r for r in records
+        }
+
+    def get(self, student_id: str, unit_code: str) -> StudentRecord:
+        """Return the record for the pair, creating and appending it if new."""
+        key = (student_id, unit_code)
+        record = self._index.get(key)
+        if record is None:
+            record = StudentRecord(student_id=student_id, unit_code=unit_code)
+            self._index[key] = record
+            self._records.append(record)
+        return record
+
+
 # ─── Value Parsers ────────────────────────────────────────────────────
 
 
@@ -115,10 +147,36 @@ def _chapter_unit_code(header: str) -> str | None:
     return None
 
 
+# ─── Workbook Streaming ───────────────────────────────────────────────
+
+
+def _open_workbook(source: bytes | str | IO[bytes]) -> openpyxl.Workbook:
+    """Open *source* (bytes, path or file) in read-only mode; the caller must close it."""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return openpyxl.load_workbook(filename=source, read_only=True, data_only=True)
+
+
+def _iter_rows(wb: openpyxl.Workbook, result: ExcelParseResult) -> Iterator[tuple]:
+    """Stream the active sheet's rows as value tuples.
+
+    Read-only sheets are parsed lazily, so a damaged file can fail mid-way;
+    that is reported in ``result.parse_errors`` and ends the stream.
+    """
+    ws = wb.active
+    # Don't trust the stored sheet dimension (exporters often get it wrong);
+    # rows then end at their last cell instead of being padded.
+    ws.reset_dimensions()
+    try:
+        yield from ws.iter_rows(values_only=True)
+    except Exception as exc:
+        result.parse_errors.append(f"讀取 Excel 檔案時發生錯誤：{exc}")
+
+
 # ─── Public API ───────────────────────────────────────────────────────
 
 
-def parse_completion_excel(file_bytes: bytes) -> ExcelParseResult:
+def parse_completion_excel(source: bytes | str | IO[bytes]) -> ExcelParseResult:
     """Parse a TronClass completion-rate Excel report.
 
     Expected layout:
@@ -129,15 +187,21 @@ def parse_completion_excel(file_bytes: bytes) -> ExcelParseResult:
     result = ExcelParseResult()
 
     try:
-        wb = openpyxl.load_workbook(filename=__import__("io").BytesIO(file_bytes), data_only=True)
+        wb = _open_workbook(source)
     except Exception as exc:
         result.parse_errors.append(f"無法讀取 Excel 檔案：{exc}")
         return result
 
-    ws = wb.active
+    try:
+        _parse_completion_rows(_iter_rows(wb, result), result)
+    finally:
+        wb.close()
+    return result
 
+
+def _parse_completion_rows(rows: Iterator[tuple], result: ExcelParseResult) -> None:
     # Read header row (row 1)
-    headers = [cell.value for cell in ws[1]]
+    headers = next(rows, ())
 
     # Column mappings: list of (col_idx, unit_code, field_name)
     col_mappings: list[tuple[int, str, str]] = []
@@ -167,7 +231,8 @@ def parse_completion_excel(file_bytes: bytes) -> ExcelParseResult:
         result.unrecognized_headers.append(h)
 
     # Process data rows starting at row 2
-    for row in ws.iter_rows(min_row=2, values_only=True):
+    accumulator = _RecordAccumulator(result.records)
+    for row in rows:
         # Skip fully empty rows
         if all(v is None for v in row):
             continue
@@ -183,16 +248,10 @@ def parse_completion_excel(file_bytes: bytes) -> ExcelParseResult:
             if parsed is None:
                 continue
 
-            existing = _find_record(result.records, student_id, unit_code)
-            if existing is None:
-                existing = StudentRecord(student_id=student_id, unit_code=unit_code)
-                result.records.append(existing)
-            existing.completion_rate = parsed
+            accumulator.get(student_id, unit_code).completion_rate = parsed
 
-    return result
 
-
-def parse_score_excel(file_bytes: bytes) -> ExcelParseResult:
+def parse_score_excel(source: bytes | str | IO[bytes]) -> ExcelParseResult:
     """Parse a TronClass score-list Excel report.
 
     Expected layout:
@@ -204,16 +263,22 @@ def parse_score_excel(file_bytes: bytes) -> ExcelParseResult:
     result = ExcelParseResult()
 
     try:
-        wb = openpyxl.load_workbook(filename=__import__("io").BytesIO(file_bytes), data_only=True)
+        wb = _open_workbook(source)
     except Exception as exc:
         result.parse_errors.append(f"無法讀取 Excel 檔案：{exc}")
         return result
 
-    ws = wb.active
+    try:
+        _parse_score_rows(_iter_rows(wb, result), result)
+    finally:
+        wb.close()
+    return result
 
-    # Read header row 2 (index 1)
-    header_row = ws[2]
-    headers = [cell.value for cell in header_row]
+
+def _parse_score_rows(rows: Iterator[tuple], result: ExcelParseResult) -> None:
+    # Skip the group header (row 1), then read header row 2
+    next(rows, None)
+    headers = next(rows, ())
 
     col_mappings: list[tuple[int, str, str]] = []
 
@@ -244,7 +309,8 @@ def parse_score_excel(file_bytes: bytes) -> ExcelParseResult:
         result.unrecognized_headers.append(h)
 
     # Process data rows starting at row 3
-    for row in ws.iter_rows(min_row=3, values_only=True):
+    accumulator = _RecordAccumulator(result.records)
+    for row in rows:
         # Skip fully empty rows
         if all(v is None for v in row):
             continue
@@ -268,26 +334,8 @@ def parse_score_excel(file_bytes: bytes) -> ExcelParseResult:
             if parsed is None:
                 continue
 
-            existing = _find_record(result.records, student_id_str, unit_code)
-            if existing is None:
-                existing = StudentRecord(student_id=student_id_str, unit_code=unit_code)
-                result.records.append(existing)
-
+            existing = accumulator.get(student_id_str, unit_code)
             if field_name == "pretest_score":
                 existing.pretest_score = parsed
             else:
                 existing.quiz_score = parsed
-
-    return result
-
-
-# ─── Internal Helpers ─────────────────────────────────────────────────
-
-
-def _find_record(
-    records: list[StudentRecord], student_id: str, unit_code: str
-) -> StudentRecord | None:
-    for r in records:
-        if r.student_id == student_id and r.unit_code == unit_code:
-            return r
-    return None
@@ -0,0 +1,131 @@
+"""In-process identity cache — email → Student snapshot with LRU + TTL.
+
+Shared by ``AuthMiddleware`` and ``app.dependencies`` so that the per-request
+email lookup only reaches SQLite on a cache miss.
+
+Entries are stored as plain column snapshots, never as live ORM objects.
+``get`` hands every caller its own *detached* ``Student`` built from the
+snapshot, so concurrent requests can attach / mutate their copy in their own
+session without stepping on each other.
+
+Any code path that mutates a ``students`` row must call ``invalidate`` (or
+``put`` with the refreshed row) after committing; the TTL only bounds
+staleness for writes made outside this process (scripts, other workers).
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import settings
+from app.models.student import Student
+
+
+class IdentityCache:
+    """Bounded LRU cache of Student snapshots keyed by email, with TTL."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 30.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        # email -> (expires_at, column snapshot)
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        # student pk -> email, so admin paths can invalidate by primary key
+        self._email_by_pk: dict[int, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, email: str) -> Student | None:
+        """Return a fresh detached Student for *email*, or None on miss/expiry."""
+        if self.maxsize <= 0:
+            return None
+        entry = self._entries.get(email)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, snapshot = entry
+        if expires_at <= self._clock():
+            self._drop(email)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(email)
+        self.hits += 1
+        return _student_from_snapshot(snapshot)
+
+    def put(self, student: Student) -> None:
+        """Store a snapshot of a loaded Student (call after commit/refresh)."""
+        if self.maxsize <= 0 or student.id is None or not student.email:
+            return
+        # An email change (bind / unbind) must not leave the old key behind.
+        old_email = self._email_by_pk.get(student.id)
+        if old_email is not None and old_email != student.email:
+            self._drop(old_email)
+
+        self._entries[student.email] = (self._clock() + self.ttl, _snapshot(student))
+        self._entries.move_to_end(student.email)
+        self._email_by_pk[student.id] = student.email
+
+        while len(self._entries) > self.maxsize:
+            evicted_email, (_, evicted) = self._entries.popitem(last=False)
+            if self._email_by_pk.get(evicted["id"]) == evicted_email:
+                del self._email_by_pk[evicted["id"]]
+
+    def invalidate(
+        self, email: str | None = None, *, student_id: int | None = None
+    ) -> None:
+        """Drop the entry for an email and/or a student primary key."""
+        if email is not None:
+            self._drop(email)
+        if student_id is not None:
+            cached_email = self._email_by_pk.get(student_id)
+            if cached_email is not None:
+                self._drop(cached_email)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._email_by_pk.clear()
+
+    def _drop(self, email: str) -> None:
+        entry = self._entries.pop(email, None)
+        if entry is None:
+            return
+        pk = entry[1]["id"]
+        if self._email_by_pk.get(pk) == email:
+            del self._email_by_pk[pk]
+
+
+def _snapshot(student: Student) -> dict[str, Any]:
+    return {
+        attr.key: getattr(student, attr.key)
+        for attr in sa_inspect(Student).column_attrs
+    }
+
+
+def _student_from_snapshot(snapshot: dict[str, Any]) -> Student:
+    student = Student(**snapshot)
+    # Give the copy an identity key and a clean history, as if just loaded,
+    # so ``session.merge(..., load=False)`` / ``session.add`` treat it as an
+    # existing row rather than a pending INSERT.
+    make_transient_to_detached(student)
+    return student
+
+
+identity_cache = IdentityCache(
+    maxsize=settings.IDENTITY_CACHE_SIZE,
+    ttl=settings.IDENTITY_CACHE_TTL_SECONDS,
+)
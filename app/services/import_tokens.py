@@ -0,0 +1,255 @@
+"""Parse-once tokens for the Excel preview → commit flow.
+
+``/preview`` parses the uploaded workbook and stores the parse result under a
+token derived from the file's SHA-256; ``/commit`` then only sends the token
+back. The workbook is uploaded and parsed once.
+
+With the parse result the preview stores its ``ImportPlan``: the record diff
+and achievement grants it showed the teacher, plus the values the touched
+records had at preview time. The commit writes exactly that plan; if any of
+those records (or the planned achievements) changed in between, it is
+rejected and the teacher previews again, so a commit never applies something
+other than what was shown.
+
+Storage is an in-process LRU with a TTL, written through to
+``DATA_DIR/import_tokens/<token>.json`` so a commit landing on another
+uvicorn worker (or after the LRU evicted the entry) still finds it. A token
+is consumed by ``pop``: removing its file is the cross-process "claim", so
+the same preview can never be committed twice. Expired files are swept on
+every ``put``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, astuple, dataclass, field
+from pathlib import Path
+
+from app.config import settings
+from app.services.excel_import import ExcelParseResult, StudentRecord
+from app.services.record_import import RecordChange, RecordDiff, RecordKey
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[0-9a-f]{64}")
+
+
+RecordValues = dict[str, float | None]
+
+
+@dataclass
+class ImportPlan:
+    """The writes a preview showed, and the record values they were based on."""
+
+    fields: list[str]
+    # values of every touched record at preview time (None: no record yet)
+    base: dict[RecordKey, RecordValues | None]
+    diff: RecordDiff
+    grants: list[tuple[int, str]]  # (student pk, achievement key)
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def student_pks(self) -> set[int]:
+        return {sid for sid, _ in self.base}
+
+    def to_dict(self) -> dict:
+        return {
+            "fields": self.fields,
+            "base": [[sid, uid, values] for (sid, uid), values in self.base.items()],
+            "created": [[sid, uid, v] for (sid, uid), v in self.diff.created.items()],
+            "changed": [[sid, uid, v] for (sid, uid), v in self.diff.changed.items()],
+            "unchanged": self.diff.unchanged,
+            "field_changes": self.diff.field_changes,
+            "changes": [astuple(c) for c in self.diff.changes],
+            "grants": self.grants,
+            "warnings": self.warnings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ImportPlan:
+        return cls(
+            fields=data["fields"],
+            base={(sid, uid): values for sid, uid, values in data["base"]},
+            diff=RecordDiff(
+                created={(sid, uid): v for sid, uid, v in data["created"]},
+                changed={(sid, uid): v for sid, uid, v in data["changed"]},
+                unchanged=data["unchanged"],
+                field_changes=data["field_changes"],
+                changes=[RecordChange(*c) for c in data["changes"]],
+            ),
+            grants=[(sid, key) for sid, key in data["grants"]],
+            warnings=data["warnings"],
+        )
+
+
+@dataclass
+class ImportPreview:
+    """What a preview parsed and planned, as needed by the commit."""
+
+    import_type: str
+    parse_result: ExcelParseResult
+    plan: ImportPlan | None = None
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "import_type": self.import_type,
+                "parse_result": asdict(self.parse_result),
+                "plan": self.plan.to_dict() if self.plan is not None else None,
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> ImportPreview:
+        data = json.loads(text)
+        parsed = data["parse_result"]
+        plan = data.get("plan")
+        return cls(
+            import_type=data["import_type"],
+            parse_result=ExcelParseResult(
+                records=[StudentRecord(**r) for r in parsed["records"]],
+                unrecognized_headers=parsed["unrecognized_headers"],
+                parse_errors=parsed["parse_errors"],
+            ),
+            plan=ImportPlan.from_dict(plan) if plan is not None else None,
+        )
+
+
+class ImportTokenStore:
+    """Bounded LRU of ``ImportPreview`` with TTL and a write-through disk copy."""
+
+    def __init__(
+        self,
+        directory: Path | None,
+        maxsize: int = 16,
+        ttl: float = 1800.0,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = directory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock  # wall clock: expiry is shared with other processes
+        # token -> (expires_at, preview, written to disk)
+        self._entries: OrderedDict[str, tuple[float, ImportPreview, bool]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def token_for(import_type: str, digest: str) -> str:
+        """Token for an upload: same file and import type → same token."""
+        return hashlib.sha256(f"{import_type}:{digest}".encode()).hexdigest()
+
+    def put(self, token: str, preview: ImportPreview) -> None:
+        expires_at = self._clock() + self.ttl
+        on_disk = self._write(token, preview)
+        self._remember(token, (expires_at, preview, on_disk))
+        self._sweep()
+
+    def get(self, token: str, import_type: str) -> ImportPreview | None:
+        """The stored preview, or None if unknown, expired or of another type."""
+        found = self._lookup(token)
+        if found is None or found[1].import_type != import_type:
+            return None
+        return found[1]
+
+    def pop(self, token: str, import_type: str) -> ImportPreview | None:
+        """Claim a preview for commit; a token can be popped only once."""
+        found = self._lookup(token)
+        if found is None or found[1].import_type != import_type:
+            return None
+        self._entries.pop(token, None)
+        _, preview, on_disk = found
+        if on_disk:
+            try:
+                self._path(token).unlink()
+            except FileNotFoundError:
+                return None  # already committed by another worker
+        return preview
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _lookup(self, token: str) -> tuple[float, ImportPreview, bool] | None:
+        if not _TOKEN_RE.fullmatch(token or ""):
+            return None
+        entry = self._entries.get(token)
+        if entry is None:
+            entry = self._read(token)
+            if entry is None:
+                return None
+        if entry[0] <= self._clock():
+            self._drop(token)
+            return None
+        self._remember(token, entry)
+        return entry
+
+    def _remember(self, token: str, entry: tuple[float, ImportPreview, bool]) -> None:
+        self._entries[token] = entry
+        self._entries.move_to_end(token)
+        while len(self._entries) > max(self.maxsize, 0):
+            self._entries.popitem(last=False)  # still on disk until it expires
+
+    def _drop(self, token: str) -> None:
+        self._entries.pop(token, None)
+        if self.directory is not None:
+            self._path(token).unlink(missing_ok=True)
+
+    def _path(self, token: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{token}.json"
+
+    def _write(self, token: str, preview: ImportPreview) -> bool:
+        if self.directory is None:
+            return False
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(token).with_suffix(".tmp")
+            tmp.write_text(preview.to_json(), encoding="utf-8")
+            os.replace(tmp, self._path(token))
+        except OSError as exc:
+            logger.warning("Could not write import token %s: %s", token[:12], exc)
+            return False
+        return True
+
+    def _read(self, token: str) -> tuple[float, ImportPreview, bool] | None:
+        if self.directory is None:
+            return None
+        path = self._path(token)
+        try:
+            expires_at = path.stat().st_mtime + self.ttl
+            preview = ImportPreview.from_json(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("Discarding unreadable import token %s: %s", token[:12], exc)
+            path.unlink(missing_ok=True)
+            return None
+        return expires_at, preview, True
+
+    def _sweep(self) -> None:
+        if self.directory is None:
+            return
+        cutoff = self._clock() - self.ttl
+        try:
+            for path in self.directory.glob("*.json"):
+                if path.stat().st_mtime <= cutoff:
+                    path.unlink(missing_ok=True)
+        except OSError as exc:
+            logger.warning("Import token sweep failed: %s", exc)
+
+
+import_tokens = ImportTokenStore(
+    settings.DATA_DIR / "import_tokens",
+    maxsize=settings.IMPORT_TOKEN_CACHE_SIZE,
+    ttl=settings.IMPORT_TOKEN_TTL_SECONDS,
+)
@@ -0,0 +1,194 @@
+"""Write-behind daily login tracker.
+
+``AuthMiddleware`` calls ``login_tracker.observe(student)`` on every request.
+The first sighting of a user each day (Asia/Taipei) is remembered in memory
+and queued; a background task started from the app lifespan flushes the queue
+every ``LOGIN_FLUSH_INTERVAL_SECONDS`` in a single transaction, writing
+``last_login_date`` / ``last_login_at`` and the 1-token daily bonus.
+
+Crash safety: nothing is considered "done" until the flush commits. Rows are
+updated with a conditional ``UPDATE ... WHERE last_login_date < today``, so
+the bonus is decided by the database, not by memory — a re-queued entry, a
+second worker or a restart can never award it twice. If the process dies
+before flushing, the row still says "not logged in today", so the next
+request re-observes the user and the login is recorded then.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+
+from sqlalchemy import DateTime, bindparam, case, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import async_session
+from app.models.student import Student
+from app.models.token_transaction import TokenTransaction
+from app.services.auth import TAIPEI_TZ, is_daily_login_tracked
+from app.services.identity_cache import identity_cache
+
+logger = logging.getLogger(__name__)
+
+DAILY_LOGIN_REASON = "每日登入獎勵"
+
+
+@dataclass(frozen=True)
+class PendingLogin:
+    student_id: int
+    day: date
+    seen_at: datetime
+
+
+class LoginTracker:
+    """In-memory "seen today" set plus a queue of logins awaiting a flush."""
+
+    def __init__(self, flush_interval: float = 5.0) -> None:
+        self.flush_interval = flush_interval
+        self._seen_day: date | None = None
+        self._seen: set[int] = set()
+        self._pending: dict[int, PendingLogin] = {}
+        self._task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def observe(self, student: Student) -> bool:
+        """Note that *student* made a request. Returns True if newly queued."""
+        if student.id is None or is_daily_login_tracked(student):
+            return False
+        today = datetime.now(TAIPEI_TZ).date()
+        if self._seen_day != today:
+            self._seen_day = today
+            self._seen.clear()
+        if student.id in self._seen:
+            return False
+        self._seen.add(student.id)
+        self._pending[student.id] = PendingLogin(
+            student_id=student.id, day=today, seen_at=datetime.now(timezone.utc)
+        )
+        return True
+
+    async def flush(
+        self, session_factory: async_sessionmaker[AsyncSession] | None = None
+    ) -> int:
+        """Write all queued logins in one transaction. Returns bonuses awarded.
+
+        On failure the batch is put back on the queue and the error re-raised.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                async with (session_factory or async_session)() as db:
+                    awarded = await _write_batch(db, list(batch.values()))
+                    await db.commit()
+            except Exception:
+                # Keep anything observed meanwhile; re-queued entries are safe
+                # to retry because the UPDATE is conditional.
+                for student_id, entry in batch.items():
+                    self._pending.setdefault(student_id, entry)
+                raise
+
+        for student_id in batch:
+            identity_cache.invalidate(student_id=student_id)
+        return awarded
+
+    def start(self) -> None:
+        """Start the periodic flush task (called from the app lifespan)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic task and flush whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def reset(self) -> None:
+        """Forget seen/pending state (tests)."""
+        self._seen_day = None
+        self._seen.clear()
+        self._pending.clear()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to flush %d daily logins: %s", self.pending_count, e)
+
+
+_students = Student.__table__
+_transactions = TokenTransaction.__table__
+
+
+def _not_logged_in_on(day):
+    return or_(_students.c.last_login_date.is_(None), _students.c.last_login_date < day)
+
+
+# Bonus ledger row, only if the login UPDATE below is about to grant it
+_INSERT_BONUS = insert(_transactions).from_select(
+    ["student_id", "amount", "reason", "created_at"],
+    select(
+        _students.c.id,
+        literal(1),
+        literal(DAILY_LOGIN_REASON),
+        bindparam("seen_at", type_=DateTime),
+    ).where(
+        _students.c.id == bindparam("pk"),
+        _students.c.role == "student",
+        _not_logged_in_on(bindparam("day")),
+    ),
+)
+
+# First login of the day: record it; students also get the 1-token bonus
+_RECORD_LOGIN = (
+    update(_students)
+    .where(_students.c.id == bindparam("pk"), _not_logged_in_on(bindparam("day")))
+    .values(
+        last_login_date=bindparam("day"),
+        last_login_at=bindparam("seen_at"),
+        tokens=_students.c.tokens + case((_students.c.role == "student", 1), else_=0),
+    )
+)
+
+# Rows whose date was set today without a timestamp (older code paths):
+# fill it in, without a bonus, or they are re-observed on every request
+_BACKFILL_LOGIN_AT = (
+    update(_students)
+    .where(_students.c.id == bindparam("pk"), _students.c.last_login_at.is_(None))
+    .values(last_login_at=bindparam("seen_at"))
+)
+
+
+async def _write_batch(db: AsyncSession, entries: list[PendingLogin]) -> int:
+    """Apply *entries* inside the caller's transaction; return bonuses awarded.
+
+    Three executemany statements per batch, whatever its size. The bonus
+    ledger INSERT runs first and takes the write lock, so it and the UPDATE
+    after it see the same rows: a ledger row is written exactly when the
+    UPDATE grants the token. Deleted students match nothing.
+    """
+    params = [
+        {"pk": e.student_id, "day": e.day, "seen_at": e.seen_at} for e in entries
+    ]
+    awarded = (await db.execute(_INSERT_BONUS, params)).rowcount
+    await db.execute(_RECORD_LOGIN, params)
+    await db.execute(_BACKFILL_LOGIN_AT, params)
+    return awarded
+
+
+login_tracker = LoginTracker(flush_interval=settings.LOGIN_FLUSH_INTERVAL_SECONDS)
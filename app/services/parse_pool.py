@@ -0,0 +1,141 @@
+"""Process pool for CPU-bound workbook parsing.
+
+openpyxl parsing is pure Python: a large TronClass report keeps the CPU busy
+for seconds, and run inline in an ``async def`` handler it stalls every
+other request on that worker (students' status polls included). Excel
+imports and the preview-rate export therefore run their parsing through
+``parse_pool``:
+
+* a shared ``ProcessPoolExecutor`` (``spawn`` start method, so children never
+  inherit the event loop or open SQLite connections), started and shut down
+  by the app lifespan;
+* at most ``PARSE_POOL_MAX_JOBS`` jobs are submitted at once; later ones wait
+  for a slot;
+* each job (waiting for a slot included) is bounded by
+  ``PARSE_POOL_TIMEOUT_SECONDS`` and raises ``ParseTimeoutError`` past it. A
+  worker process cannot be interrupted, so a timed-out job keeps its slot
+  until it actually finishes — the cap stays honest.
+
+Before ``start()`` (tests use ASGITransport, which skips the lifespan) or
+with ``PARSE_POOL_WORKERS=0``, jobs run on a small thread pool instead:
+still off the event loop, with the same cap and timeout.
+
+Uploads cannot be pickled, so ``parse_upload`` copies the spooled upload to
+a temporary file and hands the worker its path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import IO, Any, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ParseTimeoutError(TimeoutError):
+    """A pooled job did not finish within the configured timeout."""
+
+
+class ParsePool:
+    """Lifespan-managed process pool with a concurrency cap and a timeout."""
+
+    def __init__(self, workers: int = 2, max_jobs: int = 2, timeout: float = 120.0) -> None:
+        self.workers = workers
+        self.max_jobs = max(1, max_jobs)
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._threads: ThreadPoolExecutor | None = None
+        self._slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Create the worker processes (no-op when ``workers`` is 0)."""
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def stop(self) -> None:
+        """Shut the pool down, dropping jobs that have not started yet."""
+        for executor in (self._executor, self._threads):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._threads = None
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run ``func(*args)`` in the pool; *func* and *args* must be picklable."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots[0] is not loop:
+            self._slots = (loop, asyncio.Semaphore(self.max_jobs))
+        slots = self._slots[1]
+
+        def release(_: Future) -> None:
+            # Runs in a worker thread; the loop may be gone by then (shutdown)
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass
+
+        try:
+            async with asyncio.timeout(self.timeout):
+                await slots.acquire()
+                try:
+                    job = self._executor_for_jobs().submit(func, *args)
+                except BaseException:
+                    slots.release()
+                    raise
+                # The slot is freed when the job really ends, not when we stop
+                # waiting; cancelling a job that has not started frees it too
+                job.add_done_callback(release)
+                return await asyncio.wrap_future(job)
+        except TimeoutError as exc:
+            name = getattr(func, "__name__", repr(func))
+            logger.warning("Pooled job %s timed out after %.0fs", name, self.timeout)
+            raise ParseTimeoutError(f"{name} did not finish in {self.timeout:.0f}s") from exc
+
+    def _executor_for_jobs(self) -> Executor:
+        if self._executor is not None:
+            return self._executor
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.max_jobs, thread_name_prefix="parse-pool"
+            )
+        return self._threads
+
+    async def parse_upload(self, func: Callable[[str], T], upload: IO[bytes]) -> T:
+        """Run ``func(path)`` on a temporary copy of an uploaded file."""
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        try:
+            await asyncio.to_thread(_copy_to, upload, fd)
+            return await self.run(func, path)
+        finally:
+            os.unlink(path)
+
+
+def _copy_to(upload: IO[bytes], fd: int) -> None:
+    with os.fdopen(fd, "wb") as out:
+        upload.seek(0)
+        shutil.copyfileobj(upload, out)
+
+
+parse_pool = ParsePool(
+    workers=settings.PARSE_POOL_WORKERS,
+    max_jobs=settings.PARSE_POOL_MAX_JOBS,
+    timeout=settings.PARSE_POOL_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,170 @@
+"""Rarity lab — what a ``RARITY_TABLE`` does to the whole cohort.
+
+``roll_rarity`` draws one card at a time, so the only way to see the effect
+of a table edit used to be generating real cards. The lab takes the current
+cohort's levels (``app.services.cohort``, same ``calculate_card_level``
+formula), and for every level draws ``draws_per_student`` cards per student
+at once with a multinomial sample — statistically the same as that many
+``roll_rarity`` calls, without a Python loop per card. Results are grouped
+by the table's level bands next to the exact expected counts and the real
+``Card.rarity`` histogram (one ``GROUP BY``).
+
+Used by ``POST /api/admin/rarity-lab`` and ``scripts/rarity_lab.py``; both
+accept a candidate table so teachers can tune it before editing
+``scoring.RARITY_TABLE``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.card import Card
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services.cohort import load_cohort
+from app.services.scoring import RARITY_DEFAULT_WEIGHTS, RARITY_TABLE
+
+RARITIES = ("N", "R", "SR", "SSR", "UR")
+MAX_DRAWS_PER_STUDENT = 1_000_000
+OTHER_BAND = "other"  # levels not covered by any band (roll_rarity's default weights)
+
+RarityTable = list[tuple[int, int, dict]]
+
+
+def parse_table(raw: Any) -> RarityTable:
+    """Validate a table given as ``[[lo, hi, {rarity: weight}], ...]``.
+
+    Raises ValueError with a message suitable for the admin UI.
+    """
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("稀有度表必須是非空陣列")
+    table: RarityTable = []
+    for entry in raw:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 3:
+            raise ValueError("每個區間必須是 [最低等級, 最高等級, 權重]")
+        lo, hi, weights = entry
+        if not isinstance(lo, int) or not isinstance(hi, int) or not 1 <= lo <= hi <= 100:
+            raise ValueError(f"等級區間錯誤：{lo}–{hi}")
+        if not isinstance(weights, dict) or set(weights) - set(RARITIES):
+            raise ValueError(f"LV {lo}–{hi} 的權重只能包含 {'/'.join(RARITIES)}")
+        if any(not isinstance(w, (int, float)) or w < 0 for w in weights.values()):
+            raise ValueError(f"LV {lo}–{hi} 的權重必須是非負數")
+        if sum(weights.values()) <= 0:
+            raise ValueError(f"LV {lo}–{hi} 的權重總和必須大於 0")
+        table.append((lo, hi, {r: weights.get(r, 0) for r in RARITIES}))
+    return table
+
+
+def probability_matrix(table: RarityTable) -> np.ndarray:
+    """Row *level* (1–100) = rarity probabilities ``roll_rarity`` would use."""
+    matrix = np.zeros((101, len(RARITIES)))
+    matrix[:] = [RARITY_DEFAULT_WEIGHTS.get(r, 0) for r in RARITIES]
+    # roll_rarity takes the first matching band, so fill from the last one
+    for lo, hi, weights in reversed(table):
+        matrix[lo : hi + 1] = [weights.get(r, 0) for r in RARITIES]
+    return matrix / matrix.sum(axis=1, keepdims=True)
+
+
+def band_labels(table: RarityTable) -> np.ndarray:
+    """Band label for each level 0–100 (first matching band, like roll_rarity)."""
+    labels = np.full(101, OTHER_BAND, dtype=object)
+    for lo, hi, _ in reversed(table):
+        labels[lo : hi + 1] = f"{lo}-{hi}"
+    return labels
+
+
+def _band_order(table: RarityTable) -> list[str]:
+    return [f"{lo}-{hi}" for lo, hi, _ in table] + [OTHER_BAND]
+
+
+def _empty_bands(table: RarityTable) -> dict[str, dict[str, Any]]:
+    return {
+        band: {
+            "band": band,
+            "students": 0,
+            "expected": dict.fromkeys(RARITIES, 0.0),
+            "simulated": dict.fromkeys(RARITIES, 0),
+            "actual": dict.fromkeys(RARITIES, 0),
+        }
+        for band in _band_order(table)
+    }
+
+
+def simulate(
+    levels: Sequence[int] | np.ndarray,
+    table: RarityTable | None = None,
+    *,
+    draws_per_student: int = 1000,
+    seed: int | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Expected and sampled rarity counts per band for ``draws_per_student`` cards each."""
+    table = RARITY_TABLE if table is None else table
+    probs = probability_matrix(table)
+    labels = band_labels(table)
+    rng = np.random.default_rng(seed)
+
+    levels = np.clip(np.asarray(levels, dtype=np.int64), 1, 100)
+    unique, students = np.unique(levels, return_counts=True)
+    draws = students * draws_per_student
+    sampled = rng.multinomial(draws, probs[unique]) if unique.size else np.zeros((0, 5))
+    expected = draws[:, None] * probs[unique]
+
+    bands = _empty_bands(table)
+    for k, level in enumerate(unique):
+        band = bands[labels[level]]
+        band["students"] += int(students[k])
+        for r, rarity in enumerate(RARITIES):
+            band["expected"][rarity] += float(expected[k, r])
+            band["simulated"][rarity] += int(sampled[k, r])
+    for band in bands.values():
+        band["expected"] = {r: round(v, 2) for r, v in band["expected"].items()}
+    return bands
+
+
+async def actual_histogram(db: AsyncSession) -> list[tuple[int | None, str | None, int]]:
+    """(level, rarity, count) of completed cards, in one GROUP BY."""
+    result = await db.execute(
+        select(Card.level_number, Card.rarity, func.count(Card.id))
+        .where(Card.status == "completed")
+        .group_by(Card.level_number, Card.rarity)
+    )
+    return [(row[0], row[1], row[2]) for row in result.all()]
+
+
+async def run_rarity_lab(
+    db: AsyncSession,
+    table: RarityTable | None = None,
+    *,
+    draws_per_student: int = 1000,
+    seed: int | None = None,
+) -> dict[str, Any]:
+    """Simulate *table* (default: the live RARITY_TABLE) over the current cohort."""
+    if not 1 <= draws_per_student <= MAX_DRAWS_PER_STUDENT:
+        raise ValueError(f"每位學生抽卡次數必須介於 1 到 {MAX_DRAWS_PER_STUDENT:,}")
+    table = RARITY_TABLE if table is None else table
+
+    units = (await db.execute(select(Unit).order_by(Unit.sort_order))).scalars().all()
+    student_ids = (
+        await db.execute(select(Student.id).where(Student.role == "student"))
+    ).scalars().all()
+    cohort = await load_cohort(db, units, student_ids)
+
+    bands = simulate(cohort.levels, table, draws_per_student=draws_per_student, seed=seed)
+    labels = band_labels(table)
+    for level, rarity, count in await actual_histogram(db):
+        band = labels[max(1, min(100, level))] if level is not None else OTHER_BAND
+        rarity = rarity if rarity in RARITIES else "N"  # pre-rarity cards were backfilled as N
+        bands[band]["actual"][rarity] += count
+
+    return {
+        "students": len(cohort.student_ids),
+        "draws_per_student": draws_per_student,
+        "total_draws": len(cohort.student_ids) * draws_per_student,
+        "table": [[lo, hi, weights] for lo, hi, weights in table],
+        "bands": [band for band in bands.values() if band["students"] or any(band["actual"].values())],
+    }
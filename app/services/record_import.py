@@ -0,0 +1,207 @@
+"""Bulk, diff-based upsert of ``learning_records`` for the import flows.
+
+The CSV, Excel and preview-rate imports used to look every row's record up
+with its own ``SELECT`` and then mutate ORM objects one at a time. Here an
+import is applied in three steps:
+
+1. one query loads the existing (student, unit) rows of every affected
+   student;
+2. the incoming values are merged over them in memory, in input order (a
+   later row for the same pair wins; ``None`` never overwrites), giving a
+   diff of created, changed and unchanged records plus per-field counts;
+3. only created / changed rows are written, with SQLite's
+   ``INSERT ... ON CONFLICT (student_id, unit_id) DO UPDATE`` in chunked
+   executemany batches.
+
+The diff also lists every (student, unit, field) whose value was set or
+changed as a ``RecordChange``; writers hand those to the achievement engine
+(``app.services.achievement_engine``), which only looks at what changed.
+Unchanged records are not written at all, so their ``updated_at`` stays put.
+The statements go through the caller's session and are not committed, so
+the import still lands in the caller's transaction.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.learning_record import LearningRecord
+from app.services.excel_import import StudentRecord
+
+WRITE_BATCH_SIZE = 500
+
+RecordKey = tuple[int, int]  # (student pk, unit pk)
+
+
+@dataclass
+class RecordUpdate:
+    """Incoming values for one (student, unit); ``None`` leaves a field as is."""
+
+    student_pk: int
+    unit_pk: int
+    values: dict[str, float | None]
+
+
+@dataclass(frozen=True)
+class RecordChange:
+    """One field of one learning record set or changed by a write."""
+
+    student_pk: int
+    unit_pk: int
+    field: str
+    value: float | None
+
+
+@dataclass
+class UpsertResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # field -> number of records whose value for it was set or changed
+    field_changes: dict[str, int] = field(default_factory=dict)
+    warnings: list[str] = field(default_factory=list)
+    changes: list[RecordChange] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.created + self.updated + self.unchanged
+
+
+@dataclass
+class RecordDiff:
+    created: dict[RecordKey, dict[str, float | None]] = field(default_factory=dict)
+    changed: dict[RecordKey, dict[str, float | None]] = field(default_factory=dict)
+    unchanged: int = 0
+    field_changes: dict[str, int] = field(default_factory=dict)
+    changes: list[RecordChange] = field(default_factory=list)
+
+
+def resolve_records(
+    records: Iterable[StudentRecord],
+    student_map: dict[str, int],
+    unit_map: dict[str, int],
+    fields: Sequence[str],
+) -> tuple[list[RecordUpdate], list[str]]:
+    """Map parsed Excel/CSV records to primary keys; unknown IDs become warnings."""
+    updates: list[RecordUpdate] = []
+    warnings: list[str] = []
+    for rec in records:
+        student_pk = student_map.get(rec.student_id)
+        if student_pk is None:
+            warnings.append(f"找不到學號 {rec.student_id}，已略過")
+            continue
+        unit_pk = unit_map.get(rec.unit_code)
+        if unit_pk is None:
+            warnings.append(f"找不到單元 {rec.unit_code}，已略過")
+            continue
+        updates.append(
+            RecordUpdate(student_pk, unit_pk, {f: getattr(rec, f) for f in fields})
+        )
+    return updates, warnings
+
+
+def diff_records(
+    existing: dict[RecordKey, dict[str, float | None]],
+    updates: Iterable[RecordUpdate],
+    fields: Sequence[str],
+) -> RecordDiff:
+    """Merge *updates* over *existing* and classify every touched record."""
+    merged: dict[RecordKey, dict[str, float | None]] = {}
+    for update in updates:
+        key = (update.student_pk, update.unit_pk)
+        row = merged.get(key)
+        if row is None:
+            base = existing.get(key)
+            row = merged[key] = dict(base) if base is not None else dict.fromkeys(fields)
+        for f in fields:
+            value = update.values.get(f)
+            if value is not None:
+                row[f] = value
+
+    diff = RecordDiff(field_changes=dict.fromkeys(fields, 0))
+    for key, row in merged.items():
+        before = existing.get(key)
+        if before is None:
+            diff.created[key] = row
+            changed_fields = [f for f in fields if row[f] is not None]
+        else:
+            changed_fields = [f for f in fields if row[f] != before.get(f)]
+            if changed_fields:
+                diff.changed[key] = row
+            else:
+                diff.unchanged += 1
+        for f in changed_fields:
+            diff.field_changes[f] += 1
+            diff.changes.append(RecordChange(key[0], key[1], f, row[f]))
+    return diff
+
+
+async def load_existing_records(
+    db: AsyncSession, student_pks: Iterable[int], fields: Sequence[str]
+) -> dict[RecordKey, dict[str, float | None]]:
+    """Current values of *fields* for every record of the given students (one query)."""
+    pks = sorted(set(student_pks))
+    if not pks:
+        return {}
+    columns = [getattr(LearningRecord, f) for f in fields]
+    result = await db.execute(
+        select(LearningRecord.student_id, LearningRecord.unit_id, *columns).where(
+            LearningRecord.student_id.in_(pks)
+        )
+    )
+    return {
+        (row[0], row[1]): dict(zip(fields, row[2:], strict=True))
+        for row in result.all()
+    }
+
+
+async def write_record_diff(
+    db: AsyncSession,
+    diff: RecordDiff,
+    fields: Sequence[str],
+    *,
+    batch_size: int = WRITE_BATCH_SIZE,
+) -> None:
+    """Upsert the created and changed rows of *diff* (not committed)."""
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"student_id": sid, "unit_id": uid, **values, "imported_at": now, "updated_at": now}
+        for (sid, uid), values in (*diff.created.items(), *diff.changed.items())
+    ]
+    if not rows:
+        return
+    table = LearningRecord.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.student_id, table.c.unit_id],
+        set_={
+            **{f: getattr(stmt.excluded, f) for f in fields},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    for start in range(0, len(rows), batch_size):
+        await db.execute(stmt, rows[start : start + batch_size])
+
+
+async def upsert_records(
+    db: AsyncSession,
+    updates: Sequence[RecordUpdate],
+    fields: Sequence[str],
+) -> UpsertResult:
+    """Apply *updates* to ``learning_records``, writing only what changed."""
+    existing = await load_existing_records(db, (u.student_pk for u in updates), fields)
+    diff = diff_records(existing, updates, fields)
+    await write_record_diff(db, diff, fields)
+    return UpsertResult(
+        created=len(diff.created),
+        updated=len(diff.changed),
+        unchanged=diff.unchanged,
+        field_changes=diff.field_changes,
+        changes=diff.changes,
+    )
@@ -0,0 +1,140 @@
+"""Set-based roster (修課名單) import.
+
+``/api/admin/roster`` used to ``SELECT`` each CSV line's student and add ORM
+objects one at a time, so a 1,000-student roster meant 1,000 round-trips in
+one long write transaction. ``import_roster`` instead consumes the CSV rows
+as a stream, in chunks of ``ROSTER_CHUNK_SIZE``:
+
+* one ``student_id IN (...)`` query per chunk fetches the existing names of
+  the IDs not seen yet;
+* new students and renamed ones are written with one chunked
+  ``INSERT ... ON CONFLICT (student_id) DO UPDATE SET name`` batch; students
+  whose name did not change are not written at all.
+
+With ``dry_run=True`` the same reads run and nothing is written, so the diff
+an admin previews costs the same as the import itself. Repeated IDs in one
+file are merged, the last name wins (as before).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.student import Student
+
+ROSTER_CHUNK_SIZE = 500
+
+
+@dataclass
+class _RosterEntry:
+    original: str | None  # name before the import; None = new student
+    name: str  # name after the rows read so far
+    written: str | None  # name currently in the database (or what a dry run would have written)
+
+
+@dataclass
+class RosterImportResult:
+    created: list[tuple[str, str]] = field(default_factory=list)  # (student_id, name)
+    renamed: list[tuple[str, str, str]] = field(default_factory=list)  # (student_id, old, new)
+    unchanged: int = 0
+    errors: list[str] = field(default_factory=list)
+    dry_run: bool = False
+
+    @property
+    def total(self) -> int:
+        return len(self.created) + len(self.renamed) + self.unchanged
+
+
+async def _apply_chunk(
+    db: AsyncSession,
+    chunk: list[tuple[str, str]],
+    seen: dict[str, _RosterEntry],
+    *,
+    dry_run: bool,
+) -> None:
+    unknown = {sid for sid, _ in chunk if sid not in seen}
+    if unknown:
+        existing = dict(
+            (
+                await db.execute(
+                    select(Student.student_id, Student.name).where(
+                        Student.student_id.in_(unknown)
+                    )
+                )
+            ).all()
+        )
+        for sid in unknown:
+            name = existing.get(sid)
+            seen[sid] = _RosterEntry(original=name, name=name or "", written=name)
+
+    touched: dict[str, _RosterEntry] = {}
+    for sid, name in chunk:
+        entry = seen[sid]
+        entry.name = name
+        touched[sid] = entry
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "student_id": sid,
+            "name": entry.name,
+            "email": f"__unbound__{sid}@placeholder",
+            "role": "student",
+            "tokens": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for sid, entry in touched.items()
+        if entry.name != entry.written
+    ]
+    if rows and not dry_run:
+        table = Student.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.student_id],
+            set_={"name": stmt.excluded.name, "updated_at": stmt.excluded.updated_at},
+        )
+        await db.execute(stmt, rows)
+    for row in rows:
+        touched[row["student_id"]].written = row["name"]
+
+
+async def import_roster(
+    db: AsyncSession,
+    rows: Iterable[Mapping[str, str | None]],
+    *,
+    dry_run: bool = False,
+    chunk_size: int = ROSTER_CHUNK_SIZE,
+) -> RosterImportResult:
+    """Create / rename roster students from ``id``, ``name`` CSV rows (not committed)."""
+    result = RosterImportResult(dry_run=dry_run)
+    seen: dict[str, _RosterEntry] = {}
+    chunk: list[tuple[str, str]] = []
+
+    for row_num, row in enumerate(rows, start=2):  # row 1 = header
+        sid = (row.get("id") or "").strip()
+        name = (row.get("name") or "").strip()
+        if not sid or not name:
+            result.errors.append(f"Row {row_num}: missing id or name")
+            continue
+        chunk.append((sid, name))
+        if len(chunk) >= chunk_size:
+            await _apply_chunk(db, chunk, seen, dry_run=dry_run)
+            chunk = []
+    if chunk:
+        await _apply_chunk(db, chunk, seen, dry_run=dry_run)
+
+    for sid, entry in seen.items():
+        if entry.original is None:
+            result.created.append((sid, entry.name))
+        elif entry.name != entry.original:
+            result.renamed.append((sid, entry.original, entry.name))
+        else:
+            result.unchanged += 1
+    return result
@@ -0,0 +1,216 @@
+"""Compiled in-memory snapshot of the ``attribute_rules`` table.
+
+``scoring.get_available_options`` used to re-query ``attribute_rules``,
+re-parse the JSON ``options`` / ``labels`` and re-merge tiers on every call
+(six times per ``/progress`` render). Instead, the whole table is read once
+per process and compiled into a dict keyed by ``(unit_code, tier)`` whose
+values are the already-merged inclusive-tier payloads, so a lookup is a
+dictionary read.
+
+The admin rule endpoints call ``rule_snapshot.refresh(db)`` after they
+commit; the new snapshot is built off to the side and swapped in with a
+single assignment, so concurrent readers see either the old or the new table,
+never a half-built one.
+
+Each uvicorn worker holds its own snapshot, and ``refresh`` only runs in the
+worker that served the edit. So every snapshot records the table's version
+(row count, max id, max ``updated_at``): one aggregate over a few dozen
+rows, which changes on every insert, delete and admin edit. ``get`` re-reads
+it at most every ``RULE_SNAPSHOT_CHECK_SECONDS`` and rebuilds when it moved,
+so other workers catch up within that interval. Rules changed in place
+outside the app without touching ``updated_at`` (``scripts/seed_*``) are
+picked up on restart.
+
+Returned payloads are shared between callers — treat them as read-only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.attribute_rule import AttributeRule
+from app.services.scoring import (
+    CLASS_WEAPON_AFFINITY,
+    TIER_ORDER,
+    _inclusive_tiers,
+)
+
+logger = logging.getLogger(__name__)
+
+OptionsPayload = dict[str, dict[str, Any]]
+
+
+def _tier_rank(tier: str) -> int:
+    return TIER_ORDER.index(tier) if tier in TIER_ORDER else len(TIER_ORDER)
+
+
+class _ParsedRule:
+    __slots__ = ("attribute_type", "tier", "sort_order", "options", "labels")
+
+    def __init__(self, rule: AttributeRule, options: list, labels: dict) -> None:
+        self.attribute_type = rule.attribute_type
+        self.tier = rule.tier
+        self.sort_order = rule.sort_order or 0
+        self.options = options
+        self.labels = labels
+
+
+def _parse(rule: AttributeRule) -> _ParsedRule | None:
+    try:
+        options = json.loads(rule.options)
+        labels = json.loads(rule.labels)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("Invalid JSON in attribute_rule id=%s", rule.id)
+        return None
+    return _ParsedRule(rule, options, labels)
+
+
+def _compile_tier(rules: list[_ParsedRule]) -> OptionsPayload:
+    """Merge the rules visible at one tier (same result as the old per-call path)."""
+    # Group by attribute_type, higher-tier rows before lower-tier rows
+    rule_map: dict[str, list[_ParsedRule]] = {}
+    for rule in rules:
+        rule_map.setdefault(rule.attribute_type, []).append(rule)
+    for attr_rules in rule_map.values():
+        attr_rules.sort(key=lambda r: _tier_rank(r.tier))
+
+    output: OptionsPayload = {}
+    attr_types = sorted(rule_map, key=lambda a: min(r.sort_order for r in rule_map[a]))
+    for attr_type in attr_types:
+        merged_options: list[str] = []
+        merged_labels: dict[str, str] = {}
+        seen: set[str] = set()
+        for rule in rule_map[attr_type]:
+            for option in rule.options:
+                if option in seen:
+                    continue
+                seen.add(option)
+                merged_options.append(option)
+                if option in rule.labels:
+                    merged_labels[option] = rule.labels[option]
+        if merged_options:
+            output[attr_type] = {"options": merged_options, "labels": merged_labels}
+    return output
+
+
+class CompiledRules:
+    """Immutable ``(unit_code, tier) -> merged options payload`` table."""
+
+    def __init__(self, table: dict[tuple[str, str], OptionsPayload], rule_count: int) -> None:
+        self._table = table
+        self.rule_count = rule_count
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[AttributeRule]) -> CompiledRules:
+        """Compile rule rows, which must be ordered by (sort_order, id)."""
+        by_unit: dict[str, list[_ParsedRule]] = {}
+        count = 0
+        for rule in rules:
+            count += 1
+            parsed = _parse(rule)
+            if parsed is not None:
+                by_unit.setdefault(rule.unit_code, []).append(parsed)
+
+        table: dict[tuple[str, str], OptionsPayload] = {}
+        for unit_code, unit_rules in by_unit.items():
+            for tier in TIER_ORDER:
+                visible = set(_inclusive_tiers(tier))
+                compiled = _compile_tier([r for r in unit_rules if r.tier in visible])
+                if compiled:
+                    table[(unit_code, tier)] = compiled
+        return cls(table, count)
+
+    def options_for(
+        self, unit_code: str, tier: str, *, character_class: str | None = None
+    ) -> OptionsPayload:
+        """Merged options for a unit at a tier, or {} when no rules apply."""
+        compiled = self._table.get((unit_code, tier))
+        if not compiled:
+            return {}
+
+        # Weapon class affinity depends on the student, so it is applied here
+        weapon = compiled.get("weapon_type") if unit_code == "unit_4" else None
+        if weapon and character_class in CLASS_WEAPON_AFFINITY:
+            affinity = CLASS_WEAPON_AFFINITY[character_class]
+            filtered = [w for w in weapon["options"] if w in affinity]
+            if filtered:
+                return {
+                    **compiled,
+                    "weapon_type": {
+                        "options": filtered,
+                        "labels": {k: v for k, v in weapon["labels"].items() if k in filtered},
+                    },
+                }
+        return compiled
+
+
+async def _rules_version(db: AsyncSession) -> tuple:
+    result = await db.execute(
+        select(func.count(), func.max(AttributeRule.id), func.max(AttributeRule.updated_at))
+    )
+    return tuple(result.one())
+
+
+class RuleSnapshotStore:
+    """Holds the current ``CompiledRules``; built lazily, swapped atomically."""
+
+    def __init__(
+        self,
+        check_interval: float = 2.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.check_interval = check_interval
+        self._clock = clock
+        self._snapshot: CompiledRules | None = None
+        self._version: tuple | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, db: AsyncSession) -> CompiledRules:
+        snapshot = self._snapshot
+        if snapshot is not None and not await self._changed(db):
+            return snapshot
+        async with self._lock:
+            if self._snapshot is snapshot:  # not rebuilt while we waited
+                await self.refresh(db)
+            return self._snapshot
+
+    async def refresh(self, db: AsyncSession) -> CompiledRules:
+        """Rebuild from the database (call after committing rule changes)."""
+        version = await _rules_version(db)
+        result = await db.execute(
+            select(AttributeRule).order_by(AttributeRule.sort_order, AttributeRule.id)
+        )
+        snapshot = CompiledRules.from_rules(result.scalars().all())
+        self._version = version
+        self._checked_at = self._clock()
+        self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next lookup rebuilds it."""
+        self._snapshot = None
+
+    async def _changed(self, db: AsyncSession) -> bool:
+        """True if another process changed the rules (checked once per interval)."""
+        now = self._clock()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        if await _rules_version(db) == self._version:
+            return False
+        logger.info("attribute_rules changed in another process; rebuilding snapshot")
+        return True
+
+
+rule_snapshot = RuleSnapshotStore(settings.RULE_SNAPSHOT_CHECK_SECONDS)
@@ -5,11 +5,11 @@ Implements the score-to-attribute conversion rules from system-spec.md section 4
 
 from __future__ import annotations
 
-import json
 import logging
 import math
+from collections.abc import Iterable, Mapping
+from typing import Any
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -64,31 +64,6 @@ def _inclusive_tiers(tier: str) -> list[str]:
     return TIER_ORDER[start:]
 
 
-def _merge_tier_rule_payloads(rule_rows: list) -> tuple[list[str], dict[str, str]]:
-    """Merge tier rule rows in priority order and keep unique options only."""
-    merged_options: list[str] = []
-    merged_labels: dict[str, str] = {}
-    seen: set[str] = set()
-
-    for rule in rule_rows:
-        try:
-            options = json.loads(rule.options)
-            labels = json.loads(rule.labels)
-        except (json.JSONDecodeError, TypeError):
-            logger.warning("Invalid JSON in attribute_rule id=%s", getattr(rule, "id", None))
-            continue
-
-        for option in options:
-            if option in seen:
-                continue
-            seen.add(option)
-            merged_options.append(option)
-            if option in labels:
-                merged_labels[option] = labels[option]
-
-    return merged_options, merged_labels
-
-
 # ---------------------------------------------------------------------------
 # Unit 1 — Race & Gender
 # ---------------------------------------------------------------------------
@@ -312,8 +287,8 @@ async def get_available_options(
     All three raw scores are combined into a single *learning_exp* value
     which drives the tier lookup for every attribute.
 
-    When *db* is provided, reads options from the attribute_rules table.
-    Falls back to hardcoded constants if DB has no matching rules.
+    When *db* is provided, reads options from the compiled attribute_rules
+    snapshot. Falls back to hardcoded constants if there are no matching rules.
 
     Parameters
     ----------
@@ -329,7 +304,8 @@ async def get_available_options(
         The student's chosen class (e.g. "mage"), used by unit_4 to
         filter weapon types by class affinity.
     db : AsyncSession | None
-        If provided, query attribute_rules table. Otherwise use hardcoded.
+        If provided, use the attribute_rules snapshot (loaded through *db* on
+        first use). Otherwise use hardcoded.
     """
     exp = _learning_exp(preview_score, completion_rate, quiz_score)
 
@@ -347,60 +323,75 @@ async def get_available_options(
     )
 
 
-async def _get_available_options_from_db(
-    db: AsyncSession,
-    unit_code: str,
-    learning_exp: float,
-    *,
-    character_class: str | None = None,
-) -> dict:
-    """Query attribute_rules table and return options dict, or {} if no rules found."""
-    from app.models.attribute_rule import AttributeRule
-
-    tier = _tier(learning_exp)
-
-    result = await db.execute(
-        select(AttributeRule).where(
-            AttributeRule.unit_code == unit_code,
-            AttributeRule.tier.in_(_inclusive_tiers(tier)),
-        ).order_by(AttributeRule.sort_order)
+def character_class_from_configs(configs: Iterable[Any]) -> str | None:
+    """Return the student's chosen class from their CardConfig rows, if any."""
+    return next(
+        (cc.attribute_value for cc in configs if cc.attribute_type == "class"),
+        None,
     )
-    rules = result.scalars().all()
 
-    if not rules:
-        return {}
 
-    # Group rules by attribute_type, preserving higher-tier rows before lower-tier rows.
-    rule_map: dict[str, list[AttributeRule]] = {}
-    for rule in rules:
-        rule_map.setdefault(rule.attribute_type, []).append(rule)
-    for attr_rules in rule_map.values():
-        attr_rules.sort(key=lambda r: TIER_ORDER.index(r.tier) if r.tier in TIER_ORDER else len(TIER_ORDER))
+async def get_available_options_bulk(
+    records: Mapping[str, Any],
+    configs: Iterable[Any],
+    *,
+    db: AsyncSession | None = None,
+) -> dict[str, dict]:
+    """Return options for every unit the student has a quiz score for.
+
+    Same result as calling ``get_available_options`` once per unit, but the
+    character class is taken from *configs* (no extra query for unit_4) and
+    the rule snapshot is looked up once for the whole batch.
 
-    output: dict = {}
+    Parameters
+    ----------
+    records : Mapping[str, LearningRecord]
+        The student's learning records keyed by unit code.
+    configs : Iterable[CardConfig]
+        All of the student's card configs (any unit).
+    db : AsyncSession | None
+        As for ``get_available_options``.
+    """
+    character_class = character_class_from_configs(configs)
+    compiled = None
+    if db is not None:
+        from app.services.rule_snapshot import rule_snapshot
 
-    attr_types = sorted(rule_map.keys(), key=lambda a: min(r.sort_order for r in rule_map[a]))
+        compiled = await rule_snapshot.get(db)
 
-    for attr_type in attr_types:
-        options, labels = _merge_tier_rule_payloads(rule_map[attr_type])
-        if not options:
+    options: dict[str, dict] = {}
+    for unit_code, record in records.items():
+        if record is None or record.quiz_score is None:
             continue
+        exp = _learning_exp(record.preview_score, record.completion_rate, record.quiz_score)
+        unit_class = character_class if unit_code == "unit_4" else None
+        result = {}
+        if compiled is not None:
+            result = compiled.options_for(unit_code, _tier(exp), character_class=unit_class)
+        options[unit_code] = result or _get_available_options_hardcoded(
+            unit_code, exp, character_class=unit_class
+        )
+    return options
 
-        # Apply weapon class affinity filter for weapon_type
-        if unit_code == "unit_4" and attr_type == "weapon_type" and character_class:
-            if character_class in CLASS_WEAPON_AFFINITY:
-                affinity = CLASS_WEAPON_AFFINITY[character_class]
-                filtered = [w for w in options if w in affinity]
-                if filtered:
-                    options = filtered
-                    labels = {k: v for k, v in labels.items() if k in options}
 
-        output[attr_type] = {
-            "options": options,
-            "labels": labels,
-        }
+async def _get_available_options_from_db(
+    db: AsyncSession,
+    unit_code: str,
+    learning_exp: float,
+    *,
+    character_class: str | None = None,
+) -> dict:
+    """Look up options in the compiled attribute_rules snapshot, or {} if no rules.
+
+    The snapshot (``app.services.rule_snapshot``) is read from *db* once per
+    process and refreshed by the admin rule endpoints.
+    """
+    from app.services.rule_snapshot import rule_snapshot
 
-    return output
+    compiled = await rule_snapshot.get(db)
+    return compiled.options_for(
+        unit_code, _tier(learning_exp), character_class=character_class
+    )
 
 
 def _get_available_options_hardcoded(
@@ -430,6 +421,8 @@ def _get_available_options_hardcoded(
 
 
 import random as _random
+from bisect import bisect_right as _bisect
+from itertools import accumulate as _accumulate
 
 # ---------------------------------------------------------------------------
 # 稀有度抽選（依 LV 機率骰選 N/R/SR/SSR/UR）
@@ -457,17 +450,79 @@ RARITY_TABLE: list[tuple[int, int, dict]] = [
 ]
 
 
+# LV 不落在 RARITY_TABLE 任何區間時使用
+RARITY_DEFAULT_WEIGHTS: dict[str, int] = {"N": 70, "R": 25, "SR": 5, "SSR": 0, "UR": 0}
+
+
+class RaritySampler:
+    """依 LV 骰選稀有度的預先計算抽選器。
+
+    建立時就把 LV 1–100 各自的累積權重表算好，每次抽選只需一次
+    ``random()`` 與二分搜尋（與 ``random.choices`` 的演算法相同，同一個
+    seed 會得到相同結果）。每個 sampler 有自己的 ``random.Random``，不會
+    與 ``MockAIWorkerService`` 等共用全域亂數狀態；``stream(seed)`` 可從
+    同一份表格開出獨立、可重現的亂數流（模擬頁、測試）。
+    """
+
+    def __init__(
+        self,
+        table: list[tuple[int, int, dict]] | None = None,
+        *,
+        seed: int | None = None,
+        _levels: list[tuple[tuple[str, ...], list[float], float]] | None = None,
+    ) -> None:
+        self._levels = _levels if _levels is not None else self._build(
+            RARITY_TABLE if table is None else table
+        )
+        self._rng = _random.Random(seed)
+
+    @staticmethod
+    def _build(table: list[tuple[int, int, dict]]) -> list[tuple[tuple[str, ...], list[float], float]]:
+        levels = []
+        for level in range(101):  # index 0 unused; LV 1–100
+            weights: dict = RARITY_DEFAULT_WEIGHTS
+            for lo, hi, w in table:
+                if lo <= level <= hi:
+                    weights = w
+                    break
+            rarities = tuple(r for r, w in weights.items() if w > 0)
+            cum_weights = list(_accumulate(weights[r] for r in rarities))
+            levels.append((rarities, cum_weights, cum_weights[-1] + 0.0))
+        return levels
+
+    def stream(self, seed: int | None = None) -> RaritySampler:
+        """同一份機率表、獨立亂數流的新 sampler。"""
+        return RaritySampler(seed=seed, _levels=self._levels)
+
+    def seed(self, seed: int | None) -> None:
+        self._rng.seed(seed)
+
+    def roll(self, level: int) -> str:
+        rarities, cum_weights, total = self._levels[max(1, min(100, level))]
+        index = _bisect(cum_weights, self._rng.random() * total, 0, len(rarities) - 1)
+        return rarities[index]
+
+    def roll_many(self, levels: Iterable[int]) -> list[str]:
+        """一次骰多張卡（全班批次生成用），結果與逐張 ``roll`` 相同。"""
+        tables = self._levels
+        draw = self._rng.random
+        result = []
+        for level in levels:
+            rarities, cum_weights, total = tables[max(1, min(100, level))]
+            result.append(rarities[_bisect(cum_weights, draw() * total, 0, len(rarities) - 1)])
+        return result
+
+
+# 正式生成用的預設抽選器（模組載入時即建好表格）
+rarity_sampler = RaritySampler()
+# 管理員模擬頁用的獨立亂數流，不影響正式生成的抽選序列
+simulation_rarity_sampler = rarity_sampler.stream()
+
+
 def roll_rarity(level: int) -> str:
     """依 LV 骰選稀有度。LV 越高，高稀有度機率越大。"""
-    level = max(1, min(100, level))
-    weights: dict = {"N": 70, "R": 25, "SR": 5, "SSR": 0, "UR": 0}  # default
-    for lo, hi, w in RARITY_TABLE:
-        if lo <= level <= hi:
-            weights = w
-            break
-    rarities = [r for r, w in weights.items() if w > 0]
-    probs = [weights[r] for r in rarities]
-    return _random.choices(rarities, weights=probs, k=1)[0]
+    return rarity_sampler.roll(level)
+
 
 def calculate_card_level(total_exp_sum: float) -> int:
     """Map total EXP sum across 6 units (0–600) to level 1–100.
@@ -0,0 +1,223 @@
+"""Materialized per-student attribute options (``student_unit_options``).
+
+Available options only change when a student's learning records, their
+chosen class (unit_4 weapon affinity) or the attribute rules change, while
+``/progress`` and the config API read them on every view. The output of
+``get_available_options_bulk`` is therefore stored per (student, unit) and
+read back with one indexed query.
+
+Writers keep it current:
+
+* record imports / edits and class changes call ``refresh_student_options``
+  for the affected students, before their own commit, so the new records and
+  their options land in the same transaction;
+* rule edits call ``refresh_all_student_options`` after refreshing the rule
+  snapshot;
+* ``rebuild_student_options`` runs at startup to pick up changes made
+  outside the app (seed scripts, manual SQL). Every full rebuild stamps a
+  fingerprint of the rules and the schema in ``system_settings``, and startup
+  skips the rebuild (one small read) when that stamp still matches and the
+  table has rows. Otherwise each worker process would delete and reinsert the
+  whole table on every boot. Records are covered by their ``updated_at``
+  instead: students with a scored record newer than its row, or without a
+  row, are refreshed on their own.
+
+Only units with a quiz score get a row (same rule as the progress page);
+callers that need options for other units compute them live. Readers never
+write: a row still missing when ``/progress`` renders is computed in memory
+for that request only.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections.abc import Iterable
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.migrations import schema_fingerprint
+from app.models.attribute_rule import AttributeRule
+from app.models.card_config import CardConfig
+from app.models.learning_record import LearningRecord
+from app.models.student_unit_options import StudentUnitOptions
+from app.models.system_setting import SystemSetting
+from app.models.unit import Unit
+from app.services.scoring import get_available_options_bulk
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored options change shape or scoring computes them differently
+OPTIONS_VERSION = 1
+FINGERPRINT_KEY = "student_options_fingerprint"
+
+
+def _options_row(student_id: int, unit_code: str, options: dict) -> dict:
+    return {
+        "student_id": student_id,
+        "unit_code": unit_code,
+        "options": json.dumps(options, ensure_ascii=False),
+    }
+
+
+async def _refresh(db: AsyncSession, student_ids: list[int] | None) -> int:
+    records_query = select(LearningRecord.student_id, Unit.code, LearningRecord).join(
+        Unit, LearningRecord.unit_id == Unit.id
+    )
+    configs_query = select(CardConfig).where(CardConfig.attribute_type == "class")
+    delete_query = delete(StudentUnitOptions)
+    if student_ids is not None:
+        records_query = records_query.where(LearningRecord.student_id.in_(student_ids))
+        configs_query = configs_query.where(CardConfig.student_id.in_(student_ids))
+        delete_query = delete_query.where(StudentUnitOptions.student_id.in_(student_ids))
+
+    records: dict[int, dict[str, LearningRecord]] = {}
+    for student_id, unit_code, record in (await db.execute(records_query)).all():
+        records.setdefault(student_id, {})[unit_code] = record
+    configs: dict[int, list[CardConfig]] = {}
+    for config in (await db.execute(configs_query)).scalars().all():
+        configs.setdefault(config.student_id, []).append(config)
+
+    rows = []
+    for student_id, student_records in records.items():
+        options = await get_available_options_bulk(
+            student_records, configs.get(student_id, []), db=db
+        )
+        rows.extend(
+            _options_row(student_id, unit_code, unit_options)
+            for unit_code, unit_options in options.items()
+        )
+
+    await db.execute(delete_query)
+    if rows:
+        await db.execute(insert(StudentUnitOptions), rows)
+    return len(rows)
+
+
+async def refresh_student_options(db: AsyncSession, student_ids: Iterable[int]) -> int:
+    """Recompute the rows of *student_ids* (not committed). Returns rows written."""
+    ids = sorted(set(student_ids))
+    if not ids:
+        return 0
+    return await _refresh(db, ids)
+
+
+async def options_fingerprint(db: AsyncSession) -> str:
+    """Hash of everything a full rebuild depends on besides per-student data."""
+    digest = hashlib.sha256(f"{OPTIONS_VERSION}:{schema_fingerprint()}".encode())
+    rules = await db.execute(
+        select(
+            AttributeRule.id,
+            AttributeRule.unit_code,
+            AttributeRule.attribute_type,
+            AttributeRule.tier,
+            AttributeRule.options,
+            AttributeRule.labels,
+            AttributeRule.sort_order,
+        ).order_by(AttributeRule.id)
+    )
+    for row in rules.all():
+        digest.update(repr(tuple(row)).encode())
+    return digest.hexdigest()
+
+
+async def refresh_all_student_options(db: AsyncSession) -> int:
+    """Recompute every student's rows (not committed), e.g. after a rule edit."""
+    count = await _refresh(db, None)
+    stmt = sqlite_insert(SystemSetting).values(
+        key=FINGERPRINT_KEY, value=await options_fingerprint(db)
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SystemSetting.key],
+            set_={"value": stmt.excluded.value, "updated_at": datetime.now(timezone.utc)},
+        )
+    )
+    logger.info("Rebuilt student_unit_options: %d rows", count)
+    return count
+
+
+async def refresh_stale_student_options(db: AsyncSession) -> bool:
+    """Full rebuild (not committed) unless the stored fingerprint is current.
+
+    With a current fingerprint, only students whose records changed since
+    their rows were written are refreshed. Returns False when nothing needed
+    rebuilding.
+    """
+    stored = (
+        await db.execute(select(SystemSetting.value).where(SystemSetting.key == FINGERPRINT_KEY))
+    ).scalar_one_or_none()
+    has_rows = (
+        await db.execute(select(StudentUnitOptions.id).limit(1))
+    ).scalar_one_or_none() is not None
+    if not has_rows or stored != await options_fingerprint(db):
+        await refresh_all_student_options(db)
+        return True
+    student_ids = await _students_with_stale_rows(db)
+    if not student_ids:
+        logger.debug("student_unit_options is current; skipping rebuild")
+        return False
+    count = await refresh_student_options(db, student_ids)
+    logger.info(
+        "Refreshed student_unit_options of %d students with newer records: %d rows",
+        len(student_ids), count,
+    )
+    return True
+
+
+async def _students_with_stale_rows(db: AsyncSession) -> list[int]:
+    """Students with a scored record that has no row, or one older than the record."""
+    current_row = select(StudentUnitOptions.id).where(
+        StudentUnitOptions.student_id == LearningRecord.student_id,
+        StudentUnitOptions.unit_code == Unit.code,
+        or_(
+            LearningRecord.updated_at.is_(None),
+            StudentUnitOptions.updated_at >= LearningRecord.updated_at,
+        ),
+    )
+    result = await db.execute(
+        select(LearningRecord.student_id)
+        .distinct()
+        .join(Unit, LearningRecord.unit_id == Unit.id)
+        .where(LearningRecord.quiz_score.is_not(None), ~current_row.exists())
+    )
+    return list(result.scalars())
+
+
+async def rebuild_student_options() -> bool:
+    """``refresh_stale_student_options`` in its own session (app startup)."""
+    from app.database import async_session
+
+    async with async_session() as db:
+        rebuilt = await refresh_stale_student_options(db)
+        await db.commit()
+    return rebuilt
+
+
+async def load_student_options(db: AsyncSession, student_id: int) -> dict[str, dict]:
+    """{unit_code: options} for every scored unit of a student."""
+    result = await db.execute(
+        select(StudentUnitOptions.unit_code, StudentUnitOptions.options).where(
+            StudentUnitOptions.student_id == student_id
+        )
+    )
+    return {unit_code: json.loads(options) for unit_code, options in result.all()}
+
+
+async def load_student_unit_options(
+    db: AsyncSession, student_id: int, unit_code: str
+) -> dict | None:
+    """Options for one unit, or None when the unit has no materialized row."""
+    options = (
+        await db.execute(
+            select(StudentUnitOptions.options).where(
+                StudentUnitOptions.student_id == student_id,
+                StudentUnitOptions.unit_code == unit_code,
+            )
+        )
+    ).scalar_one_or_none()
+    return json.loads(options) if options is not None else None
@@ -0,0 +1,139 @@
+"""Bulk token grants: ledger rows, achievements and balances in a few statements.
+
+A grant writes a ``TokenTransaction``, optionally a ``StudentAchievement``
+pointing at it, and bumps ``students.tokens``. Done per student through the
+ORM, the achievement's foreign key forced a ``flush()`` per grant just to
+learn ``TokenTransaction.id``, so a class-wide grant cost hundreds of
+round-trips. ``apply_grants`` instead runs:
+
+1. one multi-row ``INSERT INTO token_transactions VALUES (...), (...)
+   RETURNING id`` (SQLAlchemy splits very large grants into pages); the new
+   ids map back to the grants by position;
+2. one bulk ``INSERT`` of the achievements, linked to those ids;
+3. ``UPDATE students SET tokens = tokens + :amount WHERE id IN (...)`` once
+   per distinct per-student total — a single statement when every recipient
+   gets the same amount, as in the batch grant.
+
+Statements go through the caller's session and are not committed. The
+balance update is an ORM-enabled UPDATE, so ``Student`` objects already
+loaded in the session see their new balance.
+
+``charge_tokens`` / ``credit_tokens`` change one student's balance the same
+way, relative to the row (``tokens = tokens - :n``, guarded by
+``tokens >= :n`` for charges). Routes get their ``Student`` from the
+identity cache, which may be seconds old, so they must never write the
+balance as an absolute value: that would overwrite the daily login bonus
+and grants made by other workers, and let a user overspend.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.achievement import StudentAchievement
+from app.models.student import Student
+from app.models.token_transaction import TokenTransaction
+
+
+@dataclass(frozen=True)
+class Grant:
+    student_pk: int
+    amount: int
+    reason: str | None
+    achievement_key: str | None = None
+
+
+async def apply_grants(
+    db: AsyncSession, grants: Sequence[Grant], *, now: datetime | None = None
+) -> list[int]:
+    """Write *grants* (not committed); returns the new transaction ids in order."""
+    if not grants:
+        return []
+    now = now or datetime.now(timezone.utc)
+
+    rows = [
+        {"student_id": g.student_pk, "amount": g.amount, "reason": g.reason, "created_at": now}
+        for g in grants
+    ]
+    table = TokenTransaction.__table__
+    # executemany + RETURNING is sent as multi-row INSERTs ("insertmanyvalues").
+    # RETURNING order is unspecified, but each statement assigns rowids in
+    # ascending VALUES order and the batches run in order, so the sorted ids
+    # line up with *grants*.
+    result = await db.execute(insert(table).returning(table.c.id), rows)
+    tx_ids = sorted(result.scalars())
+
+    achievements = [
+        {
+            "student_id": g.student_pk,
+            "achievement_key": g.achievement_key,
+            "token_transaction_id": tx_id,
+            "awarded_at": now,
+        }
+        for g, tx_id in zip(grants, tx_ids, strict=True)
+        if g.achievement_key
+    ]
+    if achievements:
+        await db.execute(insert(StudentAchievement), achievements)
+
+    totals: dict[int, int] = {}
+    for g in grants:
+        totals[g.student_pk] = totals.get(g.student_pk, 0) + g.amount
+    by_amount: dict[int, list[int]] = {}
+    for student_pk, amount in totals.items():
+        by_amount.setdefault(amount, []).append(student_pk)
+    for amount, student_pks in by_amount.items():
+        await db.execute(
+            update(Student)
+            .where(Student.id.in_(student_pks))
+            .values(tokens=Student.tokens + amount, updated_at=now)
+        )
+    return tx_ids
+
+
+async def current_balance(db: AsyncSession, student: Student) -> int:
+    """Read *student*'s balance from the row and refresh the object with it."""
+    tokens = (
+        await db.execute(select(Student.tokens).where(Student.id == student.id))
+    ).scalar_one()
+    set_committed_value(student, "tokens", tokens)
+    return tokens
+
+
+async def _adjust_balance(
+    db: AsyncSession, student: Student, delta: int, *, require_funds: bool
+) -> int | None:
+    stmt = update(Student).where(Student.id == student.id)
+    if require_funds:
+        stmt = stmt.where(Student.tokens >= -delta)
+    result = await db.execute(
+        stmt.values(tokens=Student.tokens + delta)
+        .returning(Student.tokens)
+        .execution_options(synchronize_session=False)
+    )
+    tokens = result.scalar_one_or_none()
+    if tokens is not None:
+        # Committed state, so the flush never writes the balance back
+        set_committed_value(student, "tokens", tokens)
+    return tokens
+
+
+async def charge_tokens(db: AsyncSession, student: Student, amount: int) -> int | None:
+    """Take *amount* if the balance covers it (not committed).
+
+    Returns the new balance, or None (nothing changed) when funds are short.
+    """
+    return await _adjust_balance(db, student, -amount, require_funds=True)
+
+
+async def credit_tokens(db: AsyncSession, student: Student, amount: int) -> int:
+    """Add *amount* to the balance (not committed); returns the new balance."""
+    tokens = await _adjust_balance(db, student, amount, require_funds=False)
+    assert tokens is not None
+    return tokens
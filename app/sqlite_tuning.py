@@ -0,0 +1,188 @@
+"""SQLite performance profile — connection pragmas and WAL checkpointing.
+
+Every new DBAPI connection gets the pragmas from ``settings`` (WAL journal,
+``synchronous=NORMAL``, busy timeout, page cache, mmap, temp store) so hall
+page reads no longer block generation-callback writes.
+
+In WAL mode SQLite checkpoints automatically once the log reaches ~1000
+pages, but only when a write happens to trigger it and only if no reader is
+holding an old snapshot. ``WalCheckpointScheduler`` runs a PASSIVE checkpoint
+periodically from the app lifespan (and a TRUNCATE on shutdown) so the
+``-wal`` file does not keep growing during long read-heavy sessions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+TEMP_STORE_MODES = {"DEFAULT", "FILE", "MEMORY"}
+CHECKPOINT_MODES = {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}
+
+# Reported on the admin dashboard, in this order
+STATUS_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "busy_timeout",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "page_size",
+    "wal_autocheckpoint",
+)
+
+
+def _choice(name: str, value: str, allowed: set[str]) -> str:
+    value = value.upper()
+    if value not in allowed:
+        raise ValueError(f"Invalid {name}: {value!r} (expected one of {sorted(allowed)})")
+    return value
+
+
+def configured_pragmas() -> dict[str, str | int]:
+    """Pragmas to apply on connect, validated (values are interpolated into SQL)."""
+    return {
+        "journal_mode": _choice("SQLITE_JOURNAL_MODE", settings.SQLITE_JOURNAL_MODE, JOURNAL_MODES),
+        "synchronous": _choice("SQLITE_SYNCHRONOUS", settings.SQLITE_SYNCHRONOUS, SYNCHRONOUS_MODES),
+        "busy_timeout": int(settings.SQLITE_BUSY_TIMEOUT_MS),
+        "cache_size": int(settings.SQLITE_CACHE_SIZE),
+        "mmap_size": int(settings.SQLITE_MMAP_SIZE),
+        "temp_store": _choice("SQLITE_TEMP_STORE", settings.SQLITE_TEMP_STORE, TEMP_STORE_MODES),
+    }
+
+
+def apply_pragmas(dbapi_connection, pragmas: dict[str, str | int]) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install_sqlite_pragmas(
+    engine: AsyncEngine, pragmas: dict[str, str | int] | None = None
+) -> None:
+    """Apply *pragmas* (default: from settings) to every new connection."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = configured_pragmas() if pragmas is None else dict(pragmas)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        apply_pragmas(dbapi_connection, pragmas)
+
+
+def _database_path(url) -> Path | None:
+    database = make_url(str(url)).database
+    if not database or database == ":memory:" or database.startswith("file:"):
+        return None
+    return Path(database)
+
+
+def _file_size(path: Path) -> int | None:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+async def read_sqlite_status(
+    db: AsyncSession, scheduler: WalCheckpointScheduler | None = None
+) -> dict | None:
+    """Current pragma values and file sizes, or None for non-SQLite backends."""
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite":
+        return None
+    pragmas = {}
+    for name in STATUS_PRAGMAS:
+        pragmas[name] = (await db.execute(text(f"PRAGMA {name}"))).scalar()
+
+    path = _database_path(bind.url)
+    return {
+        "pragmas": pragmas,
+        "db_path": str(path) if path else None,
+        "db_size_bytes": _file_size(path) if path else None,
+        "wal_size_bytes": _file_size(Path(f"{path}-wal")) if path else None,
+        "checkpoint": scheduler.status() if scheduler else None,
+    }
+
+
+class WalCheckpointScheduler:
+    """Periodic ``PRAGMA wal_checkpoint`` on a background task."""
+
+    def __init__(self, engine: AsyncEngine, interval: float = 300.0) -> None:
+        self.engine = engine
+        self.interval = interval
+        self.last_run_at: float | None = None
+        self.last_result: dict | None = None
+        self.failures = 0
+        self._task: asyncio.Task | None = None
+
+    async def checkpoint(self, mode: str = "PASSIVE") -> dict:
+        """Run one checkpoint. Returns SQLite's (busy, log, checkpointed) frames."""
+        mode = _choice("checkpoint mode", mode, CHECKPOINT_MODES)
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(text(f"PRAGMA wal_checkpoint({mode})"))).one()
+        self.last_run_at = time.time()
+        self.last_result = {
+            "mode": mode,
+            "busy": row[0],
+            "log_frames": row[1],
+            "checkpointed_frames": row[2],
+        }
+        return self.last_result
+
+    def status(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "last_run_at": self.last_run_at,
+            "last_result": self.last_result,
+            "failures": self.failures,
+        }
+
+    def start(self) -> None:
+        """Start the periodic task (no-op unless SQLite with interval > 0)."""
+        if self.engine.dialect.name != "sqlite" or self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the task and truncate the WAL so a clean shutdown leaves no -wal file."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.checkpoint("TRUNCATE")
+        except Exception as e:
+            logger.error("Final WAL checkpoint failed: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.checkpoint("PASSIVE")
+            except Exception as e:
+                self.failures += 1
+                logger.error("WAL checkpoint failed: %s", e)
+
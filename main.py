@@ -6,8 +6,11 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
-from app.database import init_db
+from app.database import init_db, wal_checkpointer
 from app.middleware import AuthMiddleware
+from app.services.login_tracker import login_tracker
+from app.services.parse_pool import parse_pool
+from app.services.student_options import rebuild_student_options
 from app.routers import admin, announcements, config, generation, pages, tokens
 from app.routers.internal import image_proxy_router, router as internal_router
 
@@ -19,7 +22,18 @@ async def lifespan(app: FastAPI):
     settings.DATA_DIR.mkdir(parents=True, exist_ok=True)
     # Initialize database tables
     await init_db()
+    # Materialized per-student options: full rebuild only if rules or schema
+    # changed, otherwise just the students with newer learning records
+    await rebuild_student_options()
+    # Batched daily-login writes; stop() flushes whatever is still queued
+    login_tracker.start()
+    wal_checkpointer.start()
+    # Worker processes for Excel parsing, off the event loop
+    parse_pool.start()
     yield
+    parse_pool.stop()
+    await login_tracker.stop()
+    await wal_checkpointer.stop()
 
 
 app = FastAPI(title="Scholaverse", version="0.1.0", lifespan=lifespan)
@@ -10,19 +10,34 @@ The script reads files from the same directory as this script:
 
 It writes:
     - preview_rates.csv
+
+Old snapshots never change, so each parsed snapshot is cached under
+``.snapshot_cache/`` next to the inputs, keyed by file name, size and mtime:
+only new or modified workbooks are parsed again (in a process pool when
+there are several). The cache keeps just the account and video-progress
+cells, serialized with ``marshal``; delete the directory to force a full
+re-parse.
 """
 
 from __future__ import annotations
 
 import csv
+import marshal
+import multiprocessing
+import os
 import re
 import sys
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, replace
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal, ROUND_HALF_UP
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 from openpyxl import load_workbook
 
 
@@ -33,7 +48,15 @@ CHECKPOINT_FILENAME = "checkpoint.xlsx"
 OUTPUT_FILENAME = "preview_rates.csv"
 ACCOUNT_HEADERS = ("帳號", "學號")
 PASSING_PROGRESS = 0.8
+# Cell types that can serve as their own parse-cache keys (no cross-type equality)
+TEXT_CELL_TYPES = frozenset({str, type(None)})
 DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+SNAPSHOT_CACHE_DIRNAME = ".snapshot_cache"
+SNAPSHOT_CACHE_VERSION = 1
+# Below this many uncached snapshots, spawning worker processes costs more
+# than it saves
+PARALLEL_MIN_SNAPSHOTS = 4
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
 HELP_TEXT = """\
 影片預習率匯出腳本
 
@@ -58,6 +81,8 @@ HELP_TEXT = """\
   - checkpoint.xlsx 必須包含 video 與 time 欄位。
   - 完成度快照檔名必須是 12 碼時間戳，例如 202603190700.xlsx。
   - 結果會輸出到 /var/www/app.scholaverse.cc/intro-ai/data/preview_rates.csv
+  - 解析過的快照會快取在 data/.snapshot_cache/，之後只重新解析新增或修改過的快照；
+    刪除該目錄即可強制全部重新解析。
 """
 
 
@@ -253,11 +278,6 @@ def pick_account_header(header_index: dict[str, int], path: Path) -> str:
 
     for header in ACCOUNT_HEADERS:
         if header in header_index:
-            if header != ACCOUNT_HEADERS[0]:
-                print(
-                    f"[warn] {path.name} uses {header!r} instead of "
-                    f"{ACCOUNT_HEADERS[0]!r}; treating it as student_id."
-                )
             return header
 
     raise PreviewRateError(
@@ -265,14 +285,29 @@ def pick_account_header(header_index: dict[str, int], path: Path) -> str:
     )
 
 
-def load_completion_snapshot(path: Path) -> CompletionSnapshot:
-    """Load a completion snapshot workbook."""
+def warn_legacy_account_header(snapshot: CompletionSnapshot) -> None:
+    """Point out snapshots read through the fallback account column."""
+
+    if snapshot.account_header != ACCOUNT_HEADERS[0]:
+        print(
+            f"[warn] {snapshot.path.name} uses {snapshot.account_header!r} instead of "
+            f"{ACCOUNT_HEADERS[0]!r}; treating it as student_id."
+        )
+
+
+def snapshot_time(path: Path) -> datetime:
+    """Return the timestamp encoded in a snapshot filename."""
 
     match = SNAPSHOT_FILENAME_RE.match(path.name)
     if not match:
         raise PreviewRateError(f"Invalid snapshot filename: {path.name}")
+    return datetime.strptime(match.group("timestamp"), "%Y%m%d%H%M")
 
-    snapshot_at = datetime.strptime(match.group("timestamp"), "%Y%m%d%H%M")
+
+def load_completion_snapshot(path: Path) -> CompletionSnapshot:
+    """Load a completion snapshot workbook."""
+
+    snapshot_at = snapshot_time(path)
     rows = read_first_sheet_rows(path)
     if not rows:
         raise PreviewRateError(f"{path.name} is empty.")
@@ -313,6 +348,127 @@ def load_completion_snapshot(path: Path) -> CompletionSnapshot:
     )
 
 
+def _compact_cell(value: Any) -> Any:
+    """Keep a progress cell in a marshal-friendly form (parse_progress reads str())."""
+
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def snapshot_to_payload(snapshot: CompletionSnapshot) -> tuple:
+    """Reduce a snapshot to its account header and video-progress cells."""
+
+    codes = sorted(snapshot.video_columns)
+    columns = [snapshot.video_columns[code] for code in codes]
+    rows = {
+        student_id: [_compact_cell(row[column]) if column < len(row) else None for column in columns]
+        for student_id, row in snapshot.student_rows.items()
+    }
+    return snapshot.account_header, codes, rows
+
+
+def snapshot_from_payload(path: Path, payload: tuple) -> CompletionSnapshot:
+    """Rebuild a snapshot from ``snapshot_to_payload`` output."""
+
+    account_header, codes, rows = payload
+    return CompletionSnapshot(
+        path=path,
+        snapshot_at=snapshot_time(path),
+        account_header=account_header,
+        video_columns={code: column for column, code in enumerate(codes)},
+        student_rows=rows,
+    )
+
+
+def parse_snapshot_payload(path: Path) -> tuple:
+    """Parse one snapshot workbook into its cache payload (process-pool worker)."""
+
+    return snapshot_to_payload(load_completion_snapshot(path))
+
+
+def snapshot_cache_key(path: Path) -> tuple[str, int, int]:
+    """Identify a snapshot file version by name, size and modification time."""
+
+    stat = path.stat()
+    return path.name, stat.st_size, stat.st_mtime_ns
+
+
+def read_snapshot_cache(cache_dir: Path, path: Path) -> tuple | None:
+    """Return the cached payload for *path*, or None if missing or stale."""
+
+    try:
+        data = (cache_dir / f"{path.name}.bin").read_bytes()
+        version, key, payload = marshal.loads(data)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != SNAPSHOT_CACHE_VERSION or tuple(key) != snapshot_cache_key(path):
+        return None
+    return payload
+
+
+def write_snapshot_cache(cache_dir: Path, path: Path, payload: tuple) -> None:
+    """Store the payload for *path*; a failed write only costs a re-parse later."""
+
+    target = cache_dir / f"{path.name}.bin"
+    tmp_path = target.with_suffix(".tmp")
+    try:
+        cache_dir.mkdir(exist_ok=True)
+        tmp_path.write_bytes(
+            marshal.dumps((SNAPSHOT_CACHE_VERSION, snapshot_cache_key(path), payload))
+        )
+        os.replace(tmp_path, target)
+    except OSError as exc:
+        print(f"[warn] could not cache {path.name}: {exc}")
+
+
+def prune_snapshot_cache(cache_dir: Path, snapshot_paths: list[Path]) -> None:
+    """Drop cache entries whose snapshot workbook is gone."""
+
+    if not cache_dir.is_dir():
+        return
+    keep = {f"{path.name}.bin" for path in snapshot_paths}
+    for entry in cache_dir.iterdir():
+        if entry.name not in keep:
+            entry.unlink(missing_ok=True)
+
+
+def load_completion_snapshots(
+    snapshot_paths: list[Path], cache_dir: Path, workers: int = DEFAULT_WORKERS
+) -> tuple[list[CompletionSnapshot], int]:
+    """Load snapshots from the cache, parsing only new or modified workbooks.
+
+    Returns the snapshots (in *snapshot_paths* order) and how many were parsed.
+    """
+
+    payloads: dict[Path, tuple] = {}
+    misses: list[Path] = []
+    for path in snapshot_paths:
+        payload = read_snapshot_cache(cache_dir, path)
+        if payload is None:
+            misses.append(path)
+        else:
+            payloads[path] = payload
+
+    if workers > 1 and len(misses) >= PARALLEL_MIN_SNAPSHOTS:
+        # spawn: the exporter also runs inside the web app's worker processes
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(misses)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            parsed = list(executor.map(parse_snapshot_payload, misses))
+    else:
+        parsed = [parse_snapshot_payload(path) for path in misses]
+
+    for path, payload in zip(misses, parsed):
+        write_snapshot_cache(cache_dir, path, payload)
+        payloads[path] = payload
+    prune_snapshot_cache(cache_dir, snapshot_paths)
+
+    snapshots = [snapshot_from_payload(path, payloads[path]) for path in snapshot_paths]
+    return snapshots, len(misses)
+
+
 def canonicalize_student_id(student_id: str) -> str:
     """Return a comparable student key."""
 
@@ -335,14 +491,16 @@ def align_student_sets(snapshots: list[CompletionSnapshot]) -> tuple[list[Comple
     for snapshot in snapshots:
         remapped_rows: dict[str, list[Any]] = {}
         for raw_student_id, row in snapshot.student_rows.items():
-            canonical_id = canonicalize_student_id(raw_student_id)
+            canonical_id = raw_to_canonical.get(raw_student_id)
+            if canonical_id is None:
+                canonical_id = canonicalize_student_id(raw_student_id)
+                raw_to_canonical[raw_student_id] = canonical_id
             if canonical_id in remapped_rows:
                 raise PreviewRateError(
                     f"{snapshot.path.name} maps multiple rows to the same canonical student id "
                     f"{canonical_id!r}."
                 )
             remapped_rows[canonical_id] = row
-            raw_to_canonical[raw_student_id] = canonical_id
 
             preferred_output = canonical_to_output.get(canonical_id)
             if preferred_output is None or len(raw_student_id) > len(preferred_output):
@@ -365,22 +523,80 @@ def align_student_sets(snapshots: list[CompletionSnapshot]) -> tuple[list[Comple
     return aligned_snapshots, ordered_student_ids
 
 
+# video code -> (snapshot times ascending, snapshots containing the video)
+SnapshotIndex = dict[str, tuple[list[datetime], list[CompletionSnapshot]]]
+
+
+def build_snapshot_index(snapshots: list[CompletionSnapshot]) -> SnapshotIndex:
+    """Index snapshots by video code, sorted by snapshot time."""
+
+    index: SnapshotIndex = {}
+    for snapshot in sorted(snapshots, key=lambda item: item.snapshot_at):
+        for video_code in snapshot.video_columns:
+            times, items = index.setdefault(video_code, ([], []))
+            times.append(snapshot.snapshot_at)
+            items.append(snapshot)
+    return index
+
+
 def select_snapshot_for_checkpoint(
-    video_code: str, checkpoint_at: datetime, snapshots: list[CompletionSnapshot]
+    video_code: str, checkpoint_at: datetime, index: SnapshotIndex
 ) -> CompletionSnapshot:
     """Select the latest snapshot at or before the checkpoint that contains the video."""
 
-    candidates = [
-        snapshot
-        for snapshot in snapshots
-        if snapshot.snapshot_at <= checkpoint_at and video_code in snapshot.video_columns
-    ]
-    if not candidates:
+    times, items = index.get(video_code, ([], []))
+    position = bisect_right(times, checkpoint_at)
+    if position == 0:
         raise PreviewRateError(
             f"No snapshot found for video {video_code} at or before "
             f"{checkpoint_at.strftime(DATETIME_FORMAT)}."
         )
-    return max(candidates, key=lambda snapshot: snapshot.snapshot_at)
+    return items[position - 1]
+
+
+def progress_matrix(
+    snapshot: CompletionSnapshot,
+    student_keys: list[str],
+    video_codes: list[str],
+    parsed_cells: dict[Any, float],
+) -> np.ndarray:
+    """Completion ratios of one snapshot as a students x videos float matrix.
+
+    The selected cells are gathered with ``itemgetter`` and only the
+    distinct ones go through ``parse_progress`` (once across snapshots via
+    *parsed_cells*); the matrix is then filled in one ``np.fromiter`` pass,
+    so no Python code runs per cell. Text and empty cells are their own
+    cache keys; once another type shows up, every cell is keyed by
+    ``(type, value)``, since ``True``, ``1`` and ``1.0`` hash alike but
+    parse differently.
+    """
+
+    columns = [snapshot.video_columns[video_code] for video_code in video_codes]
+    if not columns:
+        return np.empty((len(student_keys), 0))
+    width = max(columns) + 1
+    rows = [
+        row if len(row) >= width else row + [None] * (width - len(row))
+        for row in map(snapshot.student_rows.__getitem__, student_keys)
+    ]
+    gather = itemgetter(*columns)
+    cells = (
+        list(chain.from_iterable(map(gather, rows)))
+        if len(columns) > 1
+        else list(map(gather, rows))
+    )
+
+    if TEXT_CELL_TYPES.issuperset(map(type, cells)):
+        keys: list[Any] = cells
+        for value in set(cells).difference(parsed_cells):
+            parsed_cells[value] = parse_progress(value)
+    else:
+        keys = list(zip(map(type, cells), cells))
+        for key in set(keys).difference(parsed_cells):
+            parsed_cells[key] = parse_progress(key[1])
+    return np.fromiter(
+        map(parsed_cells.__getitem__, keys), dtype=float, count=len(keys)
+    ).reshape(len(student_keys), len(columns))
 
 
 def round_score(value: float) -> str:
@@ -401,13 +617,20 @@ def build_student_unit_rows(
     checkpoint_videos: dict[str, CheckpointVideo],
     snapshots: list[CompletionSnapshot],
 ) -> list[PreviewRateRow]:
-    """Build output rows grouped by student and unit."""
+    """Build output rows grouped by student and unit.
+
+    The videos are laid out unit by unit as the columns of one students x
+    videos progress matrix, filled from each video's selected snapshot.
+    Previewed counts per (student, unit) are then grouped sums of the
+    ``>= PASSING_PROGRESS`` mask.
+    """
 
     aligned_snapshots, student_ids = align_student_sets(snapshots)
+    snapshot_index = build_snapshot_index(aligned_snapshots)
     selected_snapshots: dict[str, CompletionSnapshot] = {}
     for video_code, checkpoint in checkpoint_videos.items():
         selected_snapshots[video_code] = select_snapshot_for_checkpoint(
-            video_code, checkpoint.checkpoint_at, aligned_snapshots
+            video_code, checkpoint.checkpoint_at, snapshot_index
         )
 
     unit_to_videos: dict[str, list[CheckpointVideo]] = {}
@@ -423,39 +646,61 @@ def build_student_unit_rows(
             joined = ", ".join(sorted(snapshot_times))
             print(f"[info] {unit_code} uses multiple source snapshots: {joined}")
 
+    unit_codes = sorted(unit_to_videos)
+    if not unit_codes:
+        return []
+    video_order: list[str] = []
+    unit_starts: list[int] = []
+    for unit_code in unit_codes:
+        unit_starts.append(len(video_order))
+        video_order.extend(sorted(video.code for video in unit_to_videos[unit_code]))
+    video_position = {video_code: position for position, video_code in enumerate(video_order)}
+
+    student_keys = [canonicalize_student_id(student_id) for student_id in student_ids]
+    codes_by_snapshot: dict[Path, list[str]] = {}
+    for video_code in video_order:
+        codes_by_snapshot.setdefault(selected_snapshots[video_code].path, []).append(video_code)
+    snapshot_by_path = {snapshot.path: snapshot for snapshot in aligned_snapshots}
+
+    progress = np.empty((len(student_keys), len(video_order)))
+    parsed_cells: dict[Any, float] = {}
+    for path, video_codes in codes_by_snapshot.items():
+        positions = [video_position[video_code] for video_code in video_codes]
+        progress[:, positions] = progress_matrix(
+            snapshot_by_path[path], student_keys, video_codes, parsed_cells
+        )
+    previewed_counts = np.add.reduceat(
+        progress >= PASSING_PROGRESS, unit_starts, axis=1, dtype=np.int64
+    ).tolist()
+
+    unit_columns: list[tuple[str, int, str, str]] = []
+    for unit_code in unit_codes:
+        videos = unit_to_videos[unit_code]
+        unit_columns.append((
+            unit_code,
+            len(videos),
+            format_dt(max(video.checkpoint_at for video in videos)),
+            format_dt(max(selected_snapshots[video.code].snapshot_at for video in videos)),
+        ))
+
+    scores: dict[tuple[int, int], str] = {}
     output_rows: list[PreviewRateRow] = []
-    for student_id in student_ids:
-        canonical_student_id = canonicalize_student_id(student_id)
-        for unit_code in sorted(unit_to_videos):
-            videos = sorted(unit_to_videos[unit_code], key=lambda item: item.code)
-            if not videos:
-                continue
-
-            latest_checkpoint_at = max(video.checkpoint_at for video in videos)
-            source_snapshot_at = max(
-                selected_snapshots[video.code].snapshot_at for video in videos
-            )
-            previewed_count = 0
-            for video in videos:
-                snapshot = selected_snapshots[video.code]
-                row = snapshot.student_rows[canonical_student_id]
-                column_index = snapshot.video_columns[video.code]
-                raw_value = row[column_index] if column_index < len(row) else None
-                if parse_progress(raw_value) >= PASSING_PROGRESS:
-                    previewed_count += 1
-
-            eligible_count = len(videos)
-            preview_score = (previewed_count / eligible_count) * 100 if eligible_count else 0.0
-
+    for student_id, counts in zip(student_ids, previewed_counts):
+        for unit_column, previewed_count in zip(unit_columns, counts):
+            unit_code, eligible_count, latest_checkpoint_at, source_snapshot_at = unit_column
+            score = scores.get((previewed_count, eligible_count))
+            if score is None:
+                preview_score = (previewed_count / eligible_count) * 100 if eligible_count else 0.0
+                score = scores[(previewed_count, eligible_count)] = round_score(preview_score)
             output_rows.append(
                 PreviewRateRow(
                     student_id=student_id,
                     unit_code=unit_code,
-                    preview_score=round_score(preview_score),
+                    preview_score=score,
                     eligible_video_count=eligible_count,
                     previewed_video_count=previewed_count,
-                    latest_checkpoint_at=format_dt(latest_checkpoint_at),
-                    source_snapshot_at=format_dt(source_snapshot_at),
+                    latest_checkpoint_at=latest_checkpoint_at,
+                    source_snapshot_at=source_snapshot_at,
                 )
             )
 
@@ -509,7 +754,7 @@ def collect_snapshot_paths(workspace_dir: Path) -> list[Path]:
     return snapshot_paths
 
 
-def run(workspace_dir: Path | None = None) -> Path:
+def run(workspace_dir: Path | None = None, *, workers: int = DEFAULT_WORKERS) -> Path:
     """Run the export workflow and return the output CSV path."""
 
     workspace = workspace_dir or get_workspace_dir()
@@ -522,7 +767,11 @@ def run(workspace_dir: Path | None = None) -> Path:
     if not checkpoint_videos:
         raise PreviewRateError("checkpoint.xlsx does not contain any active checkpoint rows.")
 
-    snapshots = [load_completion_snapshot(path) for path in snapshot_paths]
+    snapshots, parsed_count = load_completion_snapshots(
+        snapshot_paths, workspace / SNAPSHOT_CACHE_DIRNAME, workers
+    )
+    for snapshot in snapshots:
+        warn_legacy_account_header(snapshot)
     checkpoint_codes = sorted(checkpoint_videos)
     available_codes = {code for snapshot in snapshots for code in snapshot.video_columns}
     missing_codes = [code for code in checkpoint_codes if code not in available_codes]
@@ -539,7 +788,10 @@ def run(workspace_dir: Path | None = None) -> Path:
     for video in checkpoint_videos.values():
         unit_counts[video.unit_code] = unit_counts.get(video.unit_code, 0) + 1
 
-    print(f"[ok] snapshots loaded: {len(snapshots)}")
+    print(
+        f"[ok] snapshots loaded: {len(snapshots)} "
+        f"(parsed: {parsed_count}, cached: {len(snapshots) - parsed_count})"
+    )
     print(f"[ok] active checkpoint videos: {len(checkpoint_videos)}")
     print(f"[ok] output rows: {len(rows)}")
     for unit_code in sorted(unit_counts):
@@ -0,0 +1,41 @@
+"""Apply pending schema migrations (the app also does this at startup).
+
+Replaces the old one-off ``migrate_add_*.py`` / ``migration_00x_*.py``
+scripts; their steps now live in ``app/migrations.py``.
+
+Run with:
+    uv run python scripts/migrate.py            # upgrade
+    uv run python scripts/migrate.py --status   # show version only
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import engine
+from app.migrations import schema_status, upgrade
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(status_only: bool) -> None:
+    try:
+        if not status_only:
+            applied = await upgrade(engine)
+            if applied is None:
+                logger.info("Schema is current — nothing to do.")
+        logger.info("Schema status: %s", await schema_status(engine))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="only print the schema version")
+    args = parser.parse_args()
+    asyncio.run(main(args.status))
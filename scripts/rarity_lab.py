@@ -0,0 +1,60 @@
+"""Simulate RARITY_TABLE over the current cohort and compare with real cards.
+
+Same report as ``POST /api/admin/rarity-lab``, printed as a table.
+
+Run with:
+    uv run python scripts/rarity_lab.py
+    uv run python scripts/rarity_lab.py --draws 10000 --seed 1
+    uv run python scripts/rarity_lab.py --table candidate.json   # [[lo, hi, {"N": 80, ...}], ...]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import async_session, engine
+from app.services.rarity_lab import RARITIES, parse_table, run_rarity_lab
+
+
+def _share(counts: dict, rarity: str) -> str:
+    total = sum(counts.values())
+    return f"{counts[rarity] / total * 100:5.1f}%" if total else "    —"
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['students']} students × {report['draws_per_student']:,} draws "
+        f"= {report['total_draws']:,} simulated cards",
+        "",
+        f"{'LV':>8} {'students':>8}  {'':9}" + "".join(f"{r:>8}" for r in RARITIES),
+    ]
+    for band in report["bands"]:
+        for i, key in enumerate(("expected", "simulated", "actual")):
+            head = f"{band['band']:>8} {band['students']:>8}" if i == 0 else " " * 17
+            cells = "".join(f"{_share(band[key], r):>8}" for r in RARITIES)
+            total = sum(band[key].values())
+            lines.append(f"{head}  {key:9}{cells}   n={total:,.0f}")
+    return "\n".join(lines)
+
+
+async def main(table_path: str | None, draws: int, seed: int | None) -> None:
+    table = parse_table(json.loads(Path(table_path).read_text())) if table_path else None
+    try:
+        async with async_session() as db:
+            report = await run_rarity_lab(db, table, draws_per_student=draws, seed=seed)
+    finally:
+        await engine.dispose()
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--table", help="JSON file with a candidate table (default: RARITY_TABLE)")
+    parser.add_argument("--draws", type=int, default=1000, help="simulated cards per student")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.table, args.draws, args.seed))
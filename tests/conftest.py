@@ -1,13 +1,20 @@
 """Shared pytest fixtures for the Scholaverse test suite."""
 
 import asyncio
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 
 import httpx
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.database import Base, get_db
+from app.query_stats import QueryStats, track_queries
+from app.services.achievement_engine import achievement_engine
+from app.services.identity_cache import identity_cache
+from app.services.import_tokens import import_tokens
+from app.services.login_tracker import login_tracker
+from app.services.rule_snapshot import rule_snapshot
 from main import app
 
 # ---------------------------------------------------------------------------
@@ -43,6 +50,8 @@ async def db_session(async_engine) -> AsyncGenerator[AsyncSession, None]:
     session_factory = async_sessionmaker(
         async_engine, class_=AsyncSession, expire_on_commit=False
     )
+    # Earned-achievement bits and unit ids belong to the previous test's DB
+    achievement_engine.clear()
     async with session_factory() as session:
         yield session
         await session.rollback()
@@ -50,7 +59,7 @@ async def db_session(async_engine) -> AsyncGenerator[AsyncSession, None]:
 
 @pytest.fixture()
 async def client(
-    async_engine, db_session: AsyncSession
+    async_engine, db_session: AsyncSession, tmp_path
 ) -> AsyncGenerator[httpx.AsyncClient, None]:
     """HTTPX async client wired to the FastAPI app with test DB override."""
 
@@ -64,6 +73,14 @@ async def client(
         async_engine, class_=AsyncSession, expire_on_commit=False
     )
     app.state.session_factory = test_session_factory
+    # Each test gets a fresh in-memory DB, so cached identities must not leak
+    identity_cache.clear()
+    login_tracker.reset()
+    rule_snapshot.invalidate()
+    # Excel preview tokens spill to disk; keep them out of the real data/
+    token_dir = import_tokens.directory
+    import_tokens.directory = tmp_path / "import_tokens"
+    import_tokens.clear()
 
     async with httpx.AsyncClient(
         transport=httpx.ASGITransport(app=app),
@@ -73,6 +90,11 @@ async def client(
 
     app.dependency_overrides.clear()
     app.state.session_factory = None
+    identity_cache.clear()
+    login_tracker.reset()
+    rule_snapshot.invalidate()
+    import_tokens.directory = token_dir
+    import_tokens.clear()
 
 
 # ---------------------------------------------------------------------------
@@ -94,3 +116,32 @@ def sample_student_data() -> dict:
         "name": "測試同學",
         "email": "test@example.com",
     }
+
+
+# ---------------------------------------------------------------------------
+# Query budgets
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture()
+def assert_max_queries() -> Callable[[int], AbstractContextManager[QueryStats]]:
+    """Fail if the block runs more than *n* SQL statements.
+
+    Usage::
+
+        with assert_max_queries(6):
+            await client.get("/hall", headers=auth_headers)
+    """
+
+    @contextmanager
+    def _assert_max_queries(n: int) -> Iterator[QueryStats]:
+        with track_queries() as stats:
+            yield stats
+        if stats.count > n:
+            listing = "\n".join(
+                f"  {times}x {' '.join(sql.split())[:160]}"
+                for sql, times in stats.statements.most_common()
+            )
+            pytest.fail(f"Expected at most {n} queries, got {stats.count}:\n{listing}")
+
+    return _assert_max_queries
@@ -0,0 +1,47 @@
+"""Shared helpers for the micro-benchmarks under ``tests/test_benchmarks``.
+
+Benchmarks are kept small so they run with the normal suite; the printed
+numbers are informational (run ``pytest -m benchmark -s`` to see them) and
+the assertions only check deterministic properties such as query counts.
+Tests that compare wall-clock times take the ``wall_clock`` fixture, which
+skips them unless benchmarks were selected with ``-m benchmark``.
+"""
+
+from collections.abc import Iterator
+
+import pytest
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Count SQL statements executed on an engine while active."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.count += 1
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+@pytest.fixture()
+def query_counter(async_engine) -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture()
+def wall_clock(request) -> None:
+    markexpr = request.config.getoption("markexpr") or ""
+    if "benchmark" not in markexpr or "not benchmark" in markexpr:
+        pytest.skip("wall-clock comparison; run with -m benchmark")
+
+
+def report(label: str, requests: int, elapsed: float) -> float:
+    rate = requests / elapsed if elapsed else float("inf")
+    print(f"\n[benchmark] {label}: {requests} req in {elapsed:.3f}s = {rate:,.0f} req/s")
+    return rate
@@ -0,0 +1,112 @@
+"""Benchmark: pure-ASGI AuthMiddleware vs. the previous BaseHTTPMiddleware
+implementation, under concurrent load with a warm identity cache.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import settings
+from app.middleware import AuthMiddleware
+from app.models.student import Student
+from app.services.auth import TAIPEI_TZ
+from app.services.identity_cache import identity_cache
+
+from tests.test_benchmarks.conftest import report
+
+pytestmark = pytest.mark.benchmark
+
+CONCURRENCY = 20
+ROUNDS = 10
+HEADERS = {"cf-access-authenticated-user-email": "bench@example.com"}
+
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    """The pre-ASGI shape: same cache-hit work, wrapped in BaseHTTPMiddleware."""
+
+    async def dispatch(self, request, call_next):
+        email = request.headers.get(settings.CF_AUTH_HEADER)
+        request.state.user_email = email
+        request.state.user = identity_cache.get(email) if email else None
+        return await call_next(request)
+
+
+def _build_app(async_engine, middleware_class) -> FastAPI:
+    bench_app = FastAPI()
+    bench_app.add_middleware(middleware_class)
+    bench_app.state.session_factory = async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    @bench_app.get("/whoami")
+    async def whoami(request: Request):
+        return {"email": request.state.user.email}
+
+    @bench_app.get("/stream")
+    async def stream(request: Request):
+        email = request.state.user_email
+
+        async def rows():
+            for i in range(3):
+                yield f"{i},{email}\n"
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return bench_app
+
+
+async def _concurrent_load(bench_app: FastAPI) -> float:
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=bench_app), base_url="http://testserver"
+    ) as ac:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            responses = await asyncio.gather(
+                *(ac.get("/whoami", headers=HEADERS) for _ in range(CONCURRENCY))
+            )
+            assert all(r.json() == {"email": "bench@example.com"} for r in responses)
+        return time.perf_counter() - start
+
+
+@pytest.fixture()
+async def tracked_student(db_session):
+    student = Student(
+        email="bench@example.com",
+        student_id="411999999",
+        name="Bench",
+        role="student",
+        last_login_date=datetime.now(TAIPEI_TZ).date(),
+        last_login_at=datetime.now(timezone.utc),
+    )
+    db_session.add(student)
+    await db_session.commit()
+    await db_session.refresh(student)
+    identity_cache.put(student)
+    yield student
+    identity_cache.clear()
+
+
+async def test_asgi_middleware_streams_with_state(async_engine, tracked_student):
+    bench_app = _build_app(async_engine, AuthMiddleware)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=bench_app), base_url="http://testserver"
+    ) as ac:
+        resp = await ac.get("/stream", headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.text.splitlines() == [f"{i},bench@example.com" for i in range(3)]
+
+
+async def test_asgi_vs_base_http_middleware(async_engine, tracked_student):
+    legacy = await _concurrent_load(_build_app(async_engine, LegacyAuthMiddleware))
+    asgi = await _concurrent_load(_build_app(async_engine, AuthMiddleware))
+
+    total = CONCURRENCY * ROUNDS
+    report("BaseHTTPMiddleware", total, legacy)
+    report("pure ASGI", total, asgi)
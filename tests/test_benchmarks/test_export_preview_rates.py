@@ -0,0 +1,83 @@
+"""Benchmark: preview-rate export over 50 completion snapshots, cold vs. a
+re-run after one new snapshot lands (the other 50 come from the cache).
+
+Only the cache counts and byte-identical CSVs are asserted; the timings are
+printed, not compared.
+"""
+
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+from scripts.export_preview_rates import OUTPUT_FILENAME, SNAPSHOT_CACHE_DIRNAME, run
+
+pytestmark = pytest.mark.benchmark
+
+SNAPSHOTS = 50
+STUDENTS = 60
+VIDEOS = [f"{chapter}-1-{video:02d} Video" for chapter in range(1, 6) for video in range(1, 5)]
+START = datetime(2026, 3, 1, 7, 0)
+
+
+def _write(path: Path, rows: list[list[object]]) -> None:
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def _snapshot(path: Path, index: int) -> None:
+    rows: list[list[object]] = [["帳號", "姓名", *VIDEOS]]
+    for student in range(STUDENTS):
+        progress = [
+            "已完成" if (student + video + index) % 3 else f"完成{(student * 7 + index) % 100}.0%"
+            for video in range(len(VIDEOS))
+        ]
+        rows.append([f"41357{student:04d}", f"學生{student}", *progress])
+    _write(path, rows)
+
+
+def test_export_reuses_snapshot_cache(tmp_path, capsys):
+    _write(tmp_path / "checkpoint.xlsx", [
+        ["video", "time"],
+        *[[title, START + timedelta(days=i)] for i, title in enumerate(VIDEOS)],
+    ])
+    for index in range(SNAPSHOTS):
+        _snapshot(tmp_path / f"{START + timedelta(hours=12 * index):%Y%m%d%H%M}.xlsx", index)
+
+    start = time.perf_counter()
+    run(tmp_path, workers=1)
+    cold_sequential = time.perf_counter() - start
+    cold_output = (tmp_path / OUTPUT_FILENAME).read_bytes()
+    shutil.rmtree(tmp_path / SNAPSHOT_CACHE_DIRNAME)
+
+    start = time.perf_counter()
+    run(tmp_path, workers=4)
+    cold_parallel = time.perf_counter() - start
+    assert (tmp_path / OUTPUT_FILENAME).read_bytes() == cold_output
+
+    _snapshot(tmp_path / f"{START + timedelta(hours=12 * SNAPSHOTS):%Y%m%d%H%M}.xlsx", SNAPSHOTS)
+    capsys.readouterr()
+    start = time.perf_counter()
+    run(tmp_path)
+    warm = time.perf_counter() - start
+    assert f"(parsed: 1, cached: {SNAPSHOTS})" in capsys.readouterr().out
+
+    shutil.rmtree(tmp_path / SNAPSHOT_CACHE_DIRNAME)
+    warm_output = (tmp_path / OUTPUT_FILENAME).read_bytes()
+    run(tmp_path, workers=1)
+    assert (tmp_path / OUTPUT_FILENAME).read_bytes() == warm_output
+
+    with capsys.disabled():
+        print(
+            f"\n[benchmark] preview-rate export, {SNAPSHOTS} snapshots: "
+            f"cold sequential {cold_sequential * 1000:.0f} ms, "
+            f"cold 4 workers {cold_parallel * 1000:.0f} ms, "
+            f"+1 snapshot cached {warm * 1000:.0f} ms "
+            f"({cold_sequential / warm:.1f}x)"
+        )
@@ -0,0 +1,123 @@
+"""Benchmark: preview-rate rows from the columnar progress matrix vs. the
+per-(student, unit, video) loop ``build_student_unit_rows`` used to run.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from scripts.export_preview_rates import (
+    PASSING_PROGRESS,
+    CheckpointVideo,
+    CompletionSnapshot,
+    PreviewRateRow,
+    align_student_sets,
+    build_student_unit_rows,
+    canonicalize_student_id,
+    format_dt,
+    parse_progress,
+    round_score,
+    write_csv,
+)
+
+pytestmark = pytest.mark.benchmark
+
+START = datetime(2026, 3, 1, 7, 0)
+CELLS = ["已完成", "未完成", "—", None, "完成79.9%", "完成80.0%", "100.0%", "完成12.5%"]
+
+
+def _scalar(checkpoint_videos, snapshots):
+    aligned, student_ids = align_student_sets(snapshots)
+    selected = {}
+    for code, checkpoint in checkpoint_videos.items():
+        candidates = [
+            s for s in aligned if s.snapshot_at <= checkpoint.checkpoint_at and code in s.video_columns
+        ]
+        selected[code] = max(candidates, key=lambda s: s.snapshot_at)
+    unit_to_videos = {}
+    for checkpoint in checkpoint_videos.values():
+        unit_to_videos.setdefault(checkpoint.unit_code, []).append(checkpoint)
+
+    rows = []
+    for student_id in student_ids:
+        key = canonicalize_student_id(student_id)
+        for unit_code in sorted(unit_to_videos):
+            videos = sorted(unit_to_videos[unit_code], key=lambda item: item.code)
+            previewed = 0
+            for video in videos:
+                snapshot = selected[video.code]
+                row = snapshot.student_rows[key]
+                column = snapshot.video_columns[video.code]
+                raw = row[column] if column < len(row) else None
+                if parse_progress(raw) >= PASSING_PROGRESS:
+                    previewed += 1
+            rows.append(PreviewRateRow(
+                student_id=student_id,
+                unit_code=unit_code,
+                preview_score=round_score((previewed / len(videos)) * 100),
+                eligible_video_count=len(videos),
+                previewed_video_count=previewed,
+                latest_checkpoint_at=format_dt(max(v.checkpoint_at for v in videos)),
+                source_snapshot_at=format_dt(max(selected[v.code].snapshot_at for v in videos)),
+            ))
+    rows.sort(key=lambda item: (item.student_id, item.unit_code))
+    return rows
+
+
+def _inputs(n_students: int, n_snapshots: int):
+    rng = random.Random(n_students)
+    codes = [f"{chapter}-1-{video:02d}" for chapter in range(1, 6) for video in range(1, 7)]
+    checkpoint_videos = {
+        code: CheckpointVideo(
+            code=code,
+            title=code,
+            checkpoint_at=START + timedelta(days=1 + i * n_snapshots / len(codes) / 2),
+            unit_code=f"unit_{code.split('-')[0]}",
+        )
+        for i, code in enumerate(codes)
+    }
+    snapshots = []
+    for index in range(n_snapshots):
+        shuffled = rng.sample(codes, len(codes))  # header drift between snapshots
+        students = {
+            f"41357{sid:04d}": [f"41357{sid:04d}", *(rng.choice(CELLS) for _ in shuffled)]
+            for sid in range(n_students)
+        }
+        students["413570000"] = students["413570000"][:3]  # short row: missing cells
+        at = START + timedelta(hours=12 * index)
+        snapshots.append(CompletionSnapshot(
+            path=Path(f"{at:%Y%m%d%H%M}.xlsx"),
+            snapshot_at=at,
+            account_header="帳號",
+            video_columns={code: column for column, code in enumerate(shuffled, start=1)},
+            student_rows=students,
+        ))
+    return checkpoint_videos, snapshots
+
+
+@pytest.mark.parametrize("n_students", [200, 2_000])
+def test_preview_rate_matrix(n_students, tmp_path, capsys):
+    checkpoint_videos, snapshots = _inputs(n_students, 50)
+
+    start = time.perf_counter()
+    expected = _scalar(checkpoint_videos, snapshots)
+    scalar_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = build_student_unit_rows(checkpoint_videos, snapshots)
+    matrix_elapsed = time.perf_counter() - start
+
+    write_csv(tmp_path / "expected.csv", expected)
+    write_csv(tmp_path / "matrix.csv", rows)
+    assert (tmp_path / "matrix.csv").read_bytes() == (tmp_path / "expected.csv").read_bytes()
+    assert rows == expected
+
+    with capsys.disabled():
+        print(
+            f"\n[benchmark] preview-rate rows, {n_students:,} students x 30 videos: "
+            f"scalar {scalar_elapsed * 1000:.1f} ms, matrix {matrix_elapsed * 1000:.1f} ms "
+            f"({scalar_elapsed / matrix_elapsed:.1f}x)"
+        )
@@ -0,0 +1,44 @@
+"""Benchmark: precomputed rarity tables vs. the old per-call table scan +
+``random.choices``.
+"""
+
+import random
+import time
+
+import pytest
+
+from app.services.scoring import RARITY_DEFAULT_WEIGHTS, RARITY_TABLE, RaritySampler
+
+pytestmark = pytest.mark.benchmark
+
+ROLLS = 100_000
+
+
+def _legacy_roll(level: int, rng: random.Random) -> str:
+    weights = RARITY_DEFAULT_WEIGHTS
+    for lo, hi, w in RARITY_TABLE:
+        if lo <= level <= hi:
+            weights = w
+            break
+    rarities = [r for r, w in weights.items() if w > 0]
+    return rng.choices(rarities, weights=[weights[r] for r in rarities], k=1)[0]
+
+
+def test_rarity_sampler():
+    level_rng = random.Random(1)
+    levels = [level_rng.randint(1, 100) for _ in range(ROLLS)]
+
+    rng = random.Random(2)
+    start = time.perf_counter()
+    legacy = [_legacy_roll(level, rng) for level in levels]
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rolled = RaritySampler(seed=2).roll_many(levels)
+    sampler_elapsed = time.perf_counter() - start
+
+    print(
+        f"\n[benchmark] rarity rolls x{ROLLS:,}: legacy {legacy_elapsed * 1000:.1f} ms, "
+        f"sampler {sampler_elapsed * 1000:.1f} ms ({legacy_elapsed / sampler_elapsed:.1f}x)"
+    )
+    assert rolled == legacy
@@ -0,0 +1,54 @@
+"""Benchmark: pool checkouts per authenticated request, before and after the
+request-scoped session shared by AuthMiddleware and ``get_db``.
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.database import connection_metrics, get_db
+from app.models.student import Student
+from app.services.identity_cache import identity_cache
+from main import app
+
+pytestmark = pytest.mark.benchmark
+
+REQUESTS = 10
+
+
+@pytest.fixture()
+async def student(db_session):
+    db_session.add(
+        Student(email="test@example.com", student_id="411000001", name="Test", role="student")
+    )
+    await db_session.commit()
+
+
+async def _checkouts_per_request(client, auth_headers) -> float:
+    connection_metrics.reset()
+    for _ in range(REQUESTS):
+        identity_cache.clear()  # force the middleware lookup every time
+        resp = await client.get("/api/tokens/history", headers=auth_headers)
+        assert resp.status_code == 200, resp.text
+    return connection_metrics.snapshot()["avg_per_request"]
+
+
+async def test_request_scoped_session_single_checkout(
+    client, async_engine, student, auth_headers
+):
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _separate_session():
+        async with factory() as session:
+            yield session
+
+    # Before: route dependencies open their own session next to the middleware's
+    app.dependency_overrides[get_db] = _separate_session
+    before = await _checkouts_per_request(client, auth_headers)
+
+    # After: get_db reuses request.state.db
+    app.dependency_overrides.pop(get_db)
+    after = await _checkouts_per_request(client, auth_headers)
+
+    print(f"\n[benchmark] pool checkouts/request: separate={before} shared={after}")
+    assert before == 2
+    assert after == 1
@@ -0,0 +1,78 @@
+"""Benchmark: mixed readers and writers on a file database, default rollback
+journal vs. the tuned WAL profile from ``app.sqlite_tuning``.
+"""
+
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.sqlite_tuning import install_sqlite_pragmas
+
+from tests.test_benchmarks.conftest import report
+
+pytestmark = pytest.mark.benchmark
+
+READERS = 4
+WRITERS = 2
+OPS = 50
+
+
+async def _mixed_load(engine) -> tuple[float, int]:
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE cards (id INTEGER PRIMARY KEY, status TEXT)"))
+
+    errors = 0
+
+    async def reader():
+        nonlocal errors
+        async with engine.connect() as conn:
+            for _ in range(OPS):
+                try:
+                    await conn.execute(text("SELECT count(*) FROM cards WHERE status = 'completed'"))
+                    await conn.commit()
+                except OperationalError:
+                    errors += 1
+                await asyncio.sleep(0)
+
+    async def writer():
+        nonlocal errors
+        async with engine.connect() as conn:
+            for _ in range(OPS):
+                try:
+                    await conn.execute(text("INSERT INTO cards (status) VALUES ('completed')"))
+                    await conn.commit()
+                except OperationalError:
+                    errors += 1
+                    await conn.rollback()
+                await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(reader() for _ in range(READERS)), *(writer() for _ in range(WRITERS))
+    )
+    return time.perf_counter() - start, errors
+
+
+async def test_wal_profile_mixed_readers_writers(tmp_path):
+    ops = (READERS + WRITERS) * OPS
+
+    baseline = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'default.db'}")
+    tuned = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}")
+    install_sqlite_pragmas(tuned)
+    try:
+        before, before_errors = await _mixed_load(baseline)
+        after, after_errors = await _mixed_load(tuned)
+        async with tuned.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+    finally:
+        await baseline.dispose()
+        await tuned.dispose()
+
+    report(f"rollback journal ({before_errors} errors)", ops, before)
+    report(f"WAL profile ({after_errors} errors)", ops, after)
+    assert journal_mode == "wal"
+    assert after_errors == 0
@@ -0,0 +1,88 @@
+"""Benchmark: AuthMiddleware cost on static assets, with and without the
+route-classification fast path.
+
+"Before" is ``fast_path=False`` with the identity cache disabled, i.e. every
+``/static`` hit resolves the user against SQLite as the middleware used to.
+"""
+
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import middleware as middleware_module
+from app.config import settings
+from app.middleware import (
+    ROUTE_BYPASS,
+    ROUTE_PROTECTED,
+    ROUTE_PUBLIC,
+    AuthMiddleware,
+    RouteClassifier,
+)
+from app.models.student import Student
+from app.services.identity_cache import IdentityCache
+
+from tests.test_benchmarks.conftest import report
+
+pytestmark = pytest.mark.benchmark
+
+REQUESTS = 200
+HEADERS = {"cf-access-authenticated-user-email": "bench@example.com"}
+
+
+def _build_app(async_engine, *, fast_path: bool) -> FastAPI:
+    bench_app = FastAPI()
+    bench_app.add_middleware(AuthMiddleware, fast_path=fast_path)
+    bench_app.mount(
+        "/static", StaticFiles(directory=str(settings.STATIC_DIR)), name="static"
+    )
+    bench_app.state.session_factory = async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    return bench_app
+
+
+async def _hammer(bench_app: FastAPI, path: str) -> float:
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=bench_app), base_url="http://testserver"
+    ) as ac:
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            resp = await ac.get(path, headers=HEADERS)
+            assert resp.status_code == 200
+        return time.perf_counter() - start
+
+
+def test_classifier_prefixes_match_whole_segments():
+    classifier = RouteClassifier(bypass_prefixes={"/static", "/api/images"})
+    assert classifier.classify("/static/css/style.css") == ROUTE_BYPASS
+    assert classifier.classify("/api/images/proxy/a.png") == ROUTE_BYPASS
+    assert classifier.classify("/staticky") == ROUTE_PROTECTED
+    assert classifier.classify("/register") == ROUTE_PUBLIC
+    assert classifier.classify("/") == ROUTE_PROTECTED
+
+
+async def test_static_assets_skip_db(async_engine, db_session, query_counter, monkeypatch):
+    db_session.add(
+        Student(email="bench@example.com", student_id="411999999", name="Bench", role="student")
+    )
+    await db_session.commit()
+    monkeypatch.setattr(middleware_module, "identity_cache", IdentityCache(maxsize=0))
+
+    path = "/static/css/style.css"
+
+    query_counter.reset()
+    before = await _hammer(_build_app(async_engine, fast_path=False), path)
+    before_queries = query_counter.count
+
+    query_counter.reset()
+    after = await _hammer(_build_app(async_engine, fast_path=True), path)
+    after_queries = query_counter.count
+
+    report("static, full resolution", REQUESTS, before)
+    report("static, fast path", REQUESTS, after)
+    assert before_queries >= REQUESTS
+    assert after_queries == 0
@@ -0,0 +1,82 @@
+"""Benchmark: a 2,000-recipient achievement grant, per-row ORM flush (the old
+batch-token / score-import loop) vs. the bulk ledger writer.
+"""
+
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.achievement import StudentAchievement
+from app.models.student import Student
+from app.models.token_transaction import TokenTransaction
+from app.services.token_ledger import Grant, apply_grants
+
+pytestmark = pytest.mark.benchmark
+
+RECIPIENTS = 2_000
+AMOUNT = 20
+
+
+async def _seed(db, offset: int) -> list[Student]:
+    students = [
+        Student(email=f"s{i}@example.com", student_id=f"S{i:05d}", name=f"S{i}", tokens=0)
+        for i in range(offset, offset + RECIPIENTS)
+    ]
+    db.add_all(students)
+    await db.commit()
+    return students
+
+
+async def _per_row(db, students: list[Student], key: str) -> None:
+    now = datetime.now(timezone.utc)
+    for s in students:
+        s.tokens += AMOUNT
+        tx = TokenTransaction(student_id=s.id, amount=AMOUNT, reason="問卷", created_at=now)
+        db.add(tx)
+        await db.flush()
+        db.add(StudentAchievement(
+            student_id=s.id, achievement_key=key, token_transaction_id=tx.id, awarded_at=now,
+        ))
+
+
+async def test_bulk_token_grant(db_session, query_counter):
+    legacy_students = await _seed(db_session, 0)
+    query_counter.reset()
+    start = time.perf_counter()
+    await _per_row(db_session, legacy_students, "survey_mid")
+    await db_session.commit()
+    legacy_elapsed = time.perf_counter() - start
+    legacy_queries = query_counter.count
+
+    students = await _seed(db_session, RECIPIENTS)
+    query_counter.reset()
+    start = time.perf_counter()
+    await apply_grants(
+        db_session, [Grant(s.id, AMOUNT, "問卷", "survey_mid") for s in students]
+    )
+    await db_session.commit()
+    bulk_elapsed = time.perf_counter() - start
+    bulk_queries = query_counter.count
+
+    print(
+        f"\n[benchmark] token grant, {RECIPIENTS:,} recipients: "
+        f"per-row {legacy_elapsed * 1000:.0f} ms / {legacy_queries} statements, "
+        f"bulk {bulk_elapsed * 1000:.0f} ms / {bulk_queries} statements "
+        f"({legacy_elapsed / bulk_elapsed:.1f}x)"
+    )
+    assert bulk_queries <= 4  # ledger insert, achievement insert, balance update, commit
+    ids = [s.id for s in students]
+    total = (await db_session.execute(
+        select(func.sum(Student.tokens)).where(Student.id.in_(ids))
+    )).scalar_one()
+    assert total == RECIPIENTS * AMOUNT
+    linked = (await db_session.execute(
+        select(func.count())
+        .select_from(StudentAchievement)
+        .join(TokenTransaction, StudentAchievement.token_transaction_id == TokenTransaction.id)
+        .where(StudentAchievement.student_id == TokenTransaction.student_id)
+        .where(StudentAchievement.student_id.in_(ids))
+    )).scalar_one()
+    assert linked == RECIPIENTS
@@ -0,0 +1,110 @@
+"""Tests for the versioned migration runner and startup fingerprint check."""
+
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.migrations import LATEST_VERSION, schema_fingerprint, schema_status, upgrade
+
+
+@pytest.fixture()
+def db_path(tmp_path) -> Path:
+    return tmp_path / "scholaverse.db"
+
+
+@pytest.fixture()
+async def engine(db_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    yield engine
+    await engine.dispose()
+
+
+def _columns(db_path: Path, table: str) -> set[str]:
+    with sqlite3.connect(db_path) as conn:
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+async def test_fresh_database_then_fast_path(engine, db_path):
+    assert await upgrade(engine) == list(range(1, LATEST_VERSION + 1))
+    assert "cloud_quality" in _columns(db_path, "cards")
+
+    statements: list[str] = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    assert await upgrade(engine) is None
+    # Only the version lookup: no create_all reflection, no DDL
+    assert len(statements) == 1
+    assert statements[0].startswith("SELECT version, fingerprint FROM schema_version")
+
+    status = await schema_status(engine)
+    assert status == {
+        "version": LATEST_VERSION,
+        "latest_version": LATEST_VERSION,
+        "fingerprint_matches": True,
+    }
+
+
+async def test_legacy_database_gets_columns_and_backfills(engine, db_path):
+    with sqlite3.connect(db_path) as conn:
+        # A pre-migration cards/students table as created by an old create_all
+        conn.executescript(
+            """
+            CREATE TABLE students (
+                id INTEGER PRIMARY KEY, email TEXT, student_id TEXT, name TEXT,
+                role TEXT, tokens INTEGER
+            );
+            CREATE TABLE cards (
+                id INTEGER PRIMARY KEY, student_id INTEGER, status TEXT,
+                is_latest BOOLEAN, level_number INTEGER, created_at DATETIME
+            );
+            INSERT INTO cards (student_id, status, is_latest) VALUES (1, 'completed', 1);
+            """
+        )
+
+    await upgrade(engine)
+
+    assert {"is_display", "rarity", "history_visible", "backend_used"} <= _columns(db_path, "cards")
+    assert {"last_login_date", "last_login_at"} <= _columns(db_path, "students")
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute("SELECT is_display, rarity, backend_used FROM cards").fetchone()
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert row == (1, "N", "local")
+    assert "ix_cards_hall" in indexes
+
+
+async def test_fingerprint_change_reruns_create_all(engine, db_path):
+    await upgrade(engine)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE schema_version SET fingerprint = 'stale'")
+        conn.execute("DROP TABLE announcements")
+
+    assert await upgrade(engine) == []
+    with sqlite3.connect(db_path) as conn:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        stored = conn.execute(
+            "SELECT fingerprint FROM schema_version WHERE version = ?", (LATEST_VERSION,)
+        ).fetchone()[0]
+    assert "announcements" in tables
+    assert stored == schema_fingerprint()
+
+
+async def test_concurrent_workers_do_not_race(db_path):
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{db_path}") for _ in range(3)]
+    try:
+        results = await asyncio.gather(*(upgrade(e) for e in engines))
+    finally:
+        for e in engines:
+            await e.dispose()
+
+    applied = [r for r in results if r]
+    assert applied == [list(range(1, LATEST_VERSION + 1))]
+    with sqlite3.connect(db_path) as conn:
+        versions = [r[0] for r in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == list(range(1, LATEST_VERSION + 1))
@@ -0,0 +1,191 @@
+"""Tests for the TronClass Excel endpoints (preview tokens, size limit, preview-rate export)."""
+
+from __future__ import annotations
+
+import re
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.dependencies import require_teacher
+from app.models.achievement import StudentAchievement
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services.parse_pool import parse_pool
+from main import app
+from scripts import export_preview_rates
+from tests.test_services.test_excel_import import workbook_bytes
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@pytest.fixture()
+async def teacher(db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="老師", role="teacher")
+    db_session.add(teacher)
+    await db_session.commit()
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    yield teacher
+    app.dependency_overrides.pop(require_teacher, None)
+
+
+@pytest.fixture()
+async def enrolled(db_session):
+    db_session.add_all([
+        Unit(code=f"unit_{i}", name=f"Unit {i}", unlock_attribute=f"attr_{i}", sort_order=i)
+        for i in range(1, 7)
+    ])
+    student = Student(email="s@example.com", student_id="411000001", name="甲", role="student")
+    db_session.add(student)
+    await db_session.commit()
+    return student
+
+
+def _token(html: str) -> str:
+    return re.search(r'data-import-token="([0-9a-f]{64})"', html).group(1)
+
+
+def _completion_upload() -> dict:
+    content = workbook_bytes([
+        ["排名", "帳號", "1-人工智慧與深度學習的基礎"],
+        [1, "411000001", "87.5%"],
+    ])
+    return {"file": ("完成度_AI.xlsx", content, XLSX)}
+
+
+async def test_completion_commit_uses_preview_token(client, teacher, enrolled, db_session):
+    resp = await client.post(
+        "/api/admin/import-excel/completion/preview", files=_completion_upload()
+    )
+    assert resp.status_code == 200
+    token = _token(resp.text)
+
+    resp = await client.post("/api/admin/import-excel/completion/commit", data={"token": token})
+    assert resp.status_code == 200
+    record = (await db_session.execute(select(LearningRecord))).scalar_one()
+    assert (record.student_id, record.completion_rate) == (enrolled.id, 87.5)
+
+    # A preview commits once; the token is not valid for the other import type either
+    resp = await client.post("/api/admin/import-excel/completion/commit", data={"token": token})
+    assert resp.status_code == 404
+    resp = await client.post("/api/admin/import-excel/scores/commit", data={"token": token})
+    assert resp.status_code == 404
+
+
+async def test_scores_preview_is_parsed_once_and_grants_applied(
+    client, teacher, enrolled, db_session, monkeypatch
+):
+    parses = []
+    parse_upload = parse_pool.parse_upload
+
+    async def counting_parse_upload(func, upload):
+        parses.append(func.__name__)
+        return await parse_upload(func, upload)
+
+    monkeypatch.setattr(parse_pool, "parse_upload", counting_parse_upload)
+    content = workbook_bytes([
+        ["分組"],
+        ["帳號", "第一章 前測", "第一章 課後測驗"],
+        ["411000001", "60", "80"],
+    ])
+    files = {"file": ("score_list.xlsx", content, XLSX)}
+
+    first = await client.post("/api/admin/import-excel/scores/preview", files=files)
+    second = await client.post("/api/admin/import-excel/scores/preview", files=files)
+    assert first.status_code == second.status_code == 200
+    assert _token(first.text) == _token(second.text)
+    assert parses == ["parse_score_excel"]
+
+    resp = await client.post(
+        "/api/admin/import-excel/scores/commit", data={"token": _token(first.text)}
+    )
+    assert resp.status_code == 200
+    assert parses == ["parse_score_excel"]
+    keys = (await db_session.execute(select(StudentAchievement.achievement_key))).scalars().all()
+    assert sorted(keys) == ["chapter_1_complete", "chapter_1_pretest"]
+
+
+def _score_upload() -> dict:
+    content = workbook_bytes([
+        ["分組"],
+        ["帳號", "第一章 前測", "第一章 課後測驗"],
+        ["411000001", "60", "80"],
+    ])
+    return {"file": ("score_list.xlsx", content, XLSX)}
+
+
+async def test_commit_rejected_when_records_changed_after_preview(
+    client, teacher, enrolled, db_session
+):
+    resp = await client.post("/api/admin/import-excel/scores/preview", files=_score_upload())
+    assert "成就：<span" in resp.text
+    token = _token(resp.text)
+
+    # Someone edits the record between preview and commit
+    unit = (await db_session.execute(select(Unit).where(Unit.code == "unit_1"))).scalar_one()
+    db_session.add(LearningRecord(student_id=enrolled.id, unit_id=unit.id, pretest_score=10))
+    await db_session.commit()
+
+    resp = await client.post("/api/admin/import-excel/scores/commit", data={"token": token})
+    assert resp.status_code == 409
+    record = (await db_session.execute(select(LearningRecord))).scalar_one()
+    assert (record.pretest_score, record.quiz_score) == (10, None)
+    assert (await db_session.execute(select(StudentAchievement))).first() is None
+
+
+async def test_commit_rejected_when_planned_grant_already_made(
+    client, teacher, enrolled, db_session
+):
+    resp = await client.post("/api/admin/import-excel/scores/preview", files=_score_upload())
+    token = _token(resp.text)
+
+    db_session.add(StudentAchievement(student_id=enrolled.id, achievement_key="chapter_1_pretest"))
+    await db_session.commit()
+
+    resp = await client.post("/api/admin/import-excel/scores/commit", data={"token": token})
+    assert resp.status_code == 409
+    assert (await db_session.execute(select(LearningRecord))).first() is None
+
+    # A fresh preview plans around the existing grant and commits
+    resp = await client.post("/api/admin/import-excel/scores/preview", files=_score_upload())
+    resp = await client.post(
+        "/api/admin/import-excel/scores/commit", data={"token": _token(resp.text)}
+    )
+    assert resp.status_code == 200
+    keys = (await db_session.execute(select(StudentAchievement.achievement_key))).scalars().all()
+    assert sorted(keys) == ["chapter_1_complete", "chapter_1_pretest"]
+
+
+async def test_upload_size_limit(client, teacher, monkeypatch):
+    monkeypatch.setattr(settings, "EXCEL_MAX_UPLOAD_MB", 0)
+    resp = await client.post(
+        "/api/admin/import-excel/completion/preview", files=_completion_upload()
+    )
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "檔案超過 0MB 限制"
+
+
+async def test_preview_rates_export_reports_missing_inputs(client, teacher, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    resp = await client.post("/api/admin/import-preview-rates/export")
+    assert resp.status_code == 400
+    assert "checkpoint.xlsx" in resp.json()["detail"]
+
+
+async def test_preview_rates_export_parses_sequentially_in_the_pool_job(
+    client, teacher, monkeypatch, tmp_path
+):
+    # A nested process pool inside the job would escape PARSE_POOL_MAX_JOBS
+    calls = []
+
+    def fake_run(workspace_dir, *, workers):
+        calls.append((workspace_dir, workers))
+        return workspace_dir / "preview_rates.csv"
+
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(export_preview_rates, "run", fake_run)
+    resp = await client.post("/api/admin/import-preview-rates/export")
+    assert resp.status_code == 200
+    assert calls == [(tmp_path, 1)]
@@ -0,0 +1,66 @@
+"""Tests for the admin student list and selected-students CSV export."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.dependencies import require_teacher
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.unit import Unit
+from main import app
+
+
+@pytest.fixture()
+async def teacher(db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="老師", role="teacher")
+    db_session.add(teacher)
+    await db_session.commit()
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    yield teacher
+    app.dependency_overrides.pop(require_teacher, None)
+
+
+@pytest.fixture()
+async def roster(db_session):
+    units = [
+        Unit(code=f"unit_{i}", name=f"Unit {i}", unlock_attribute=f"attr_{i}", sort_order=i)
+        for i in range(1, 7)
+    ]
+    students = [
+        Student(email="a@example.com", student_id="S002", name="乙", role="student", tokens=3),
+        Student(email="__unbound__S001", student_id="S001", name="甲", role="student"),
+    ]
+    db_session.add_all([*units, *students])
+    await db_session.flush()
+    db_session.add_all([
+        LearningRecord(
+            student_id=students[0].id, unit_id=units[0].id,
+            preview_score=85, completion_rate=90.5, quiz_score=77,
+        ),
+        LearningRecord(student_id=students[0].id, unit_id=units[5].id, completion_rate=66.6),
+        LearningRecord(student_id=students[1].id, unit_id=units[1].id, quiz_score=None),
+    ])
+    await db_session.commit()
+    return students
+
+
+async def test_export_selected_csv(client, teacher, roster):
+    resp = await client.get(
+        "/admin/students/export-selected",
+        params={"student_ids": [s.id for s in roster]},
+    )
+    assert resp.status_code == 200
+    assert resp.content.startswith("﻿".encode("utf-8"))
+    lines = resp.content.decode("utf-8-sig").splitlines()
+    assert lines == [
+        "學號,姓名,Email,角色,代幣,卡牌,Ch1,Ch2,Ch3,Ch4,Ch5,Ch6",
+        "S001,甲,,student,0,0,,0.0,,,,",
+        "S002,乙,a@example.com,student,3,0,84.0,,,,,66.6",
+    ]
+
+
+async def test_students_page_shows_levels(client, teacher, roster):
+    resp = await client.get("/admin/students")
+    assert resp.status_code == 200
+    assert "Unit 1：84.0 EXP（A）" in resp.text and "等級" in resp.text
@@ -0,0 +1,87 @@
+"""Tests for the batch options endpoint and get_available_options_bulk."""
+
+import pytest
+
+from app.models.card_config import CardConfig
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services.student_options import refresh_student_options
+from app.services.scoring import get_available_options, get_available_options_bulk
+
+SCORES = {
+    "unit_1": (95, 100, 95),
+    "unit_2": (60, 70, 50),
+    "unit_3": (20, 30, 10),
+    "unit_4": (80, 90, 85),
+}
+
+
+@pytest.fixture()
+async def student(db_session):
+    student = Student(email="test@example.com", student_id="411000001", name="Test", role="student")
+    db_session.add(student)
+    units = {
+        f"unit_{i}": Unit(code=f"unit_{i}", name=f"Unit {i}", unlock_attribute="x", sort_order=i)
+        for i in range(1, 7)
+    }
+    db_session.add_all(units.values())
+    await db_session.flush()
+    for code, (preview, completion, quiz) in SCORES.items():
+        db_session.add(
+            LearningRecord(
+                student_id=student.id,
+                unit_id=units[code].id,
+                preview_score=preview,
+                completion_rate=completion,
+                quiz_score=quiz,
+            )
+        )
+    # unit_5 is unlocked but has no quiz score yet
+    db_session.add(LearningRecord(student_id=student.id, unit_id=units["unit_5"].id, pretest_score=40))
+    db_session.add(
+        CardConfig(
+            student_id=student.id,
+            unit_id=units["unit_2"].id,
+            attribute_type="class",
+            attribute_value="archer",
+        )
+    )
+    await refresh_student_options(db_session, [student.id])
+    await db_session.commit()
+    return student
+
+
+async def test_bulk_matches_per_unit_calls(db_session, student):
+    records = {
+        code: LearningRecord(preview_score=p, completion_rate=c, quiz_score=q)
+        for code, (p, c, q) in SCORES.items()
+    }
+    configs = [CardConfig(attribute_type="class", attribute_value="archer")]
+
+    bulk = await get_available_options_bulk(records, configs, db=db_session)
+
+    assert set(bulk) == set(SCORES)
+    for code, (p, c, q) in SCORES.items():
+        expected = await get_available_options(
+            code, p, c, q,
+            character_class="archer" if code == "unit_4" else None,
+            db=db_session,
+        )
+        assert bulk[code] == expected
+
+
+async def test_options_endpoint_returns_every_scored_unit(client, student, auth_headers):
+    resp = await client.get("/api/config/options", headers=auth_headers)
+    assert resp.status_code == 200
+    units = resp.json()["units"]
+
+    assert set(units) == set(SCORES)  # unit_5 has no quiz score, unit_6 no record
+    single = await client.get("/api/config/unit_4/options", headers=auth_headers)
+    assert units["unit_4"] == single.json()["options"]
+    assert set(units["unit_4"]["weapon_type"]["options"]) <= {"bow", "dagger"}
+
+
+async def test_options_endpoint_requires_login(client):
+    resp = await client.get("/api/config/options")
+    assert resp.status_code in (302, 303, 307, 401)
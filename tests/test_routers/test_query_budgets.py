@@ -0,0 +1,121 @@
+"""Query budgets for the main pages, plus the Server-Timing / N+1 reporting.
+
+Budgets are pinned at the current counts; lowering one is an improvement,
+raising one needs a reason (usually a new loop over rows → N+1).
+"""
+
+import logging
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_db
+from app.dependencies import require_teacher
+from app.models.card import Card
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.token_transaction import TokenTransaction
+from app.models.unit import Unit
+from app.services.student_options import refresh_student_options
+from app.services.auth import TAIPEI_TZ
+from app.sqlite_tuning import STATUS_PRAGMAS
+from main import app
+
+UNIT_COUNT = 6
+
+
+@pytest.fixture()
+async def seeded(db_session):
+    """A logged-in student with records in every unit, a card and tokens."""
+    student = Student(
+        email="test@example.com",
+        student_id="411000001",
+        name="Test Student",
+        role="student",
+        tokens=10,
+        last_login_date=datetime.now(TAIPEI_TZ).date(),
+        last_login_at=datetime.now(timezone.utc),
+    )
+    db_session.add(student)
+    units = [
+        Unit(code=f"unit_{i}", name=f"Unit {i}", unlock_attribute="race_gender", sort_order=i)
+        for i in range(1, UNIT_COUNT + 1)
+    ]
+    db_session.add_all(units)
+    await db_session.flush()
+    db_session.add_all(
+        LearningRecord(
+            student_id=student.id,
+            unit_id=unit.id,
+            preview_score=80,
+            pretest_score=50,
+            completion_rate=90,
+            quiz_score=85,
+        )
+        for unit in units
+    )
+    db_session.add(
+        Card(student_id=student.id, status="completed", is_display=True, level_number=3)
+    )
+    db_session.add(TokenTransaction(student_id=student.id, amount=1, reason="test"))
+    await refresh_student_options(db_session, [student.id])
+    await db_session.commit()
+    return student
+
+
+# (path, max queries) — includes the middleware's identity lookup on a cold cache
+PAGE_BUDGETS = [
+    ("/", 5),
+    ("/cards", 2),
+    ("/hall", 3),
+    ("/progress", 8),
+    ("/tokens", 2),
+    ("/api/tokens/history", 2),
+    ("/api/config/options", 2),
+]
+
+
+@pytest.mark.parametrize("path,budget", PAGE_BUDGETS)
+async def test_page_query_budget(client, seeded, auth_headers, assert_max_queries, path, budget):
+    with assert_max_queries(budget):
+        resp = await client.get(path, headers=auth_headers)
+    assert resp.status_code == 200
+
+
+async def test_admin_dashboard_query_budget(client, seeded, assert_max_queries):
+    app.dependency_overrides[require_teacher] = lambda: seeded
+    try:
+        # counts, units, one GROUP BY for the unit table, SQLite status pragmas
+        with assert_max_queries(5 + len(STATUS_PRAGMAS)):
+            resp = await client.get("/admin")
+    finally:
+        app.dependency_overrides.pop(require_teacher, None)
+    assert resp.status_code == 200
+
+
+async def test_server_timing_header_reports_queries(client, seeded, auth_headers):
+    resp = await client.get("/api/tokens/history", headers=auth_headers)
+    timing = resp.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="2 queries"' in timing
+
+
+async def test_repeated_statement_logged_as_n_plus_one(client, seeded, auth_headers, caplog, monkeypatch):
+    async def per_unit_loop(db: AsyncSession = Depends(get_db)):
+        for unit_id in range(1, UNIT_COUNT + 1):
+            await db.execute(select(Unit).where(Unit.id == unit_id))
+        return {}
+
+    monkeypatch.setattr(settings, "QUERY_REPEAT_WARN_THRESHOLD", 3)
+    app.add_api_route("/api/_test/n-plus-one", per_unit_loop)
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.middleware"):
+            resp = await client.get("/api/_test/n-plus-one", headers=auth_headers)
+    finally:
+        app.router.routes.pop()
+    assert resp.status_code == 200
+    assert any("Possible N+1 on GET /api/_test/n-plus-one" in r.message for r in caplog.records)
@@ -0,0 +1,63 @@
+"""EXPLAIN QUERY PLAN regression tests for the hot router queries.
+
+Each entry is built by the same builder the named route executes
+(``app.queries`` and the routers' private builders). The test fails if
+SQLite would answer any of them with a full scan of a large table, which
+usually means an index in ``__table_args__`` was dropped or a query stopped
+matching it.
+"""
+
+import pytest
+
+from app import queries
+from app.models.card import Card
+from app.routers.admin import _generation_history_query
+from app.services.cohort import cohort_records_query
+
+HOT_TABLES = ("cards", "token_transactions", "learning_records")
+
+HOT_QUERIES = {
+    # pages.index
+    "display_card": queries.display_cards(1).limit(1),
+    # generation.generate_card (keep mode) / generation.generate_info
+    "display_card_completed": queries.display_cards(1).where(Card.status == "completed"),
+    # generation.generate_card / pages.progress — regen and in-flight checks
+    "regen_check": queries.first_card_in_status(1, queries.ACTIVE_CARD_STATUSES),
+    "in_flight_check": queries.first_card_in_status(1, queries.IN_FLIGHT_CARD_STATUSES),
+    # pages.cards_gallery
+    "gallery": queries.gallery_cards(1),
+    # pages.hall
+    "hall": queries.hall_cards(),
+    # admin.admin_generation_history
+    "generation_history": _generation_history_query("all"),
+    "generation_history_filtered": _generation_history_query("completed"),
+    # tokens.token_history / pages.tokens_page / admin student detail
+    "token_history": queries.token_history(1),
+    # admin.admin_students (one page of students)
+    "cohort_records": cohort_records_query([1, 2, 3]),
+}
+
+
+async def _plan(conn, query) -> list[str]:
+    sql = str(query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+    return [row[3] for row in result]
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+async def test_hot_query_uses_index(async_engine, name):
+    async with async_engine.connect() as conn:
+        plan = await _plan(conn, HOT_QUERIES[name])
+
+    for step in plan:
+        for table in HOT_TABLES:
+            assert not step.startswith(f"SCAN {table}"), f"{name}: {plan}"
+
+
+async def test_dashboard_unit_stats_group_on_the_unit_index(async_engine):
+    # admin.admin_dashboard aggregates every record, so it must scan; the
+    # index keeps the GROUP BY from sorting the table in a temp B-tree
+    async with async_engine.connect() as conn:
+        plan = await _plan(conn, queries.unit_record_stats())
+
+    assert plan == ["SCAN learning_records USING INDEX ix_learning_records_unit"]
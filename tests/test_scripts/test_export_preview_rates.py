@@ -8,9 +8,12 @@ from pathlib import Path
 
 from openpyxl import Workbook
 
+import scripts.export_preview_rates as export_preview_rates
 from scripts.export_preview_rates import (
+    CompletionSnapshot,
     PreviewRateError,
     format_dt,
+    progress_matrix,
     run,
 )
 
@@ -242,3 +245,76 @@ def test_run_aligns_full_account_ids_with_short_student_ids(tmp_path: Path) -> N
             "source_snapshot_at": "2026-03-19 07:00",
         }
     ]
+
+
+def test_run_reuses_cached_snapshots_until_they_change(tmp_path: Path, capsys) -> None:
+    """Unchanged snapshots come from .snapshot_cache; edited ones are parsed again."""
+
+    write_workbook(
+        tmp_path / "checkpoint.xlsx",
+        [
+            ["video", "time"],
+            ["1-1-01 Intro Video", datetime(2026, 3, 19, 9, 10)],
+            ["1-1-02 Second Video", datetime(2026, 3, 26, 10, 30)],
+        ],
+    )
+    write_workbook(
+        tmp_path / "202603190700.xlsx",
+        [
+            ["學號", "1-1-01 Intro Video", "1-1-02 Second Video"],
+            ["0036", "已完成", "未完成"],
+        ],
+    )
+    write_workbook(
+        tmp_path / "202603261010.xlsx",
+        [
+            ["帳號", "1-1-02 Second Video", "1-1-01 Intro Video"],
+            ["413570036", "完成50.0%", "已完成"],
+        ],
+    )
+
+    output_path = run(tmp_path)
+    first = output_path.read_bytes()
+    assert "(parsed: 2, cached: 0)" in capsys.readouterr().out
+    assert sorted(p.name for p in (tmp_path / ".snapshot_cache").iterdir()) == [
+        "202603190700.xlsx.bin",
+        "202603261010.xlsx.bin",
+    ]
+
+    run(tmp_path)
+    captured = capsys.readouterr().out
+    assert "(parsed: 0, cached: 2)" in captured
+    assert "uses '學號' instead of '帳號'" in captured  # warned for cached snapshots too
+    assert output_path.read_bytes() == first
+
+    write_workbook(
+        tmp_path / "202603261010.xlsx",
+        [
+            ["帳號", "1-1-02 Second Video", "1-1-01 Intro Video"],
+            ["413570036", "已完成", "已完成"],
+        ],
+    )
+    (tmp_path / ".snapshot_cache" / "202603190700.xlsx.bin").write_bytes(b"corrupt")
+    run(tmp_path)
+    assert "(parsed: 2, cached: 0)" in capsys.readouterr().out
+    with output_path.open("r", encoding="utf-8-sig", newline="") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert [row["preview_score"] for row in rows] == ["100.00"]
+
+
+def test_progress_matrix_parses_equal_cells_of_different_types_separately(monkeypatch) -> None:
+    """True, 1 and 1.0 compare equal but must not share a parsed ratio."""
+
+    ratios = {bool: 0.25, int: 0.5, float: 0.75}
+    monkeypatch.setattr(export_preview_rates, "parse_progress", lambda value: ratios[type(value)])
+    snapshot = CompletionSnapshot(
+        path=Path("snapshot.xlsx"),
+        snapshot_at=datetime(2026, 3, 19, 9, 0),
+        account_header="account",
+        video_columns={"1-1-01": 0, "1-1-02": 1, "1-1-03": 2},
+        student_rows={"s1": [True, 1, 1.0]},
+    )
+
+    matrix = progress_matrix(snapshot, ["s1"], ["1-1-01", "1-1-02", "1-1-03"], {})
+
+    assert matrix.tolist() == [[0.25, 0.5, 0.75]]
@@ -0,0 +1,23 @@
+"""Tests for the rarity lab CLI report formatting."""
+
+from __future__ import annotations
+
+from scripts.rarity_lab import format_report
+
+
+def test_format_report_prints_shares_per_band() -> None:
+    band = {
+        "band": "1-10",
+        "students": 2,
+        "expected": {"N": 1600.0, "R": 360.0, "SR": 40.0, "SSR": 0.0, "UR": 0.0},
+        "simulated": {"N": 1610, "R": 350, "SR": 40, "SSR": 0, "UR": 0},
+        "actual": {"N": 0, "R": 0, "SR": 0, "SSR": 0, "UR": 0},
+    }
+    report = {"students": 2, "draws_per_student": 1000, "total_draws": 2000, "bands": [band]}
+
+    lines = format_report(report).splitlines()
+
+    assert lines[0] == "2 students × 1,000 draws = 2,000 simulated cards"
+    assert lines[3].split()[:5] == ["1-10", "2", "expected", "80.0%", "18.0%"]
+    assert lines[4].split()[:2] == ["simulated", "80.5%"]
+    assert lines[5].split() == ["actual", "—", "—", "—", "—", "—", "n=0"]
@@ -0,0 +1,181 @@
+"""Tests for the incremental, change-driven achievement engine."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.dependencies import require_teacher
+from app.models.achievement import StudentAchievement
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services.achievement_engine import AchievementEngine, build_rules
+from app.services.record_import import RecordChange
+from app.services.token_ledger import Grant, apply_grants
+from main import app
+
+
+def test_rules_are_derived_from_achievement_types():
+    rules = {(r.key, r.unit_code, r.field) for r in build_rules()}
+    assert ("chapter_1_pretest", "unit_1", "pretest_score") in rules
+    assert ("chapter_5_complete", "unit_5", "quiz_score") in rules
+    assert len(rules) == 10  # chapters 1-5; surveys / early bird stay manual
+
+    custom = build_rules({"chapter_7_complete": {"label": "第7章", "tokens": 5}, "x": {}})
+    assert [(r.key, r.unit_code, r.tokens) for r in custom] == [("chapter_7_complete", "unit_7", 5)]
+
+
+@pytest.fixture()
+async def course(db_session):
+    units = [
+        Unit(code=f"unit_{i}", name=f"Unit {i}", unlock_attribute=f"attr_{i}", sort_order=i)
+        for i in range(1, 7)
+    ]
+    students = [
+        Student(email=f"s{i}@example.com", student_id=f"S{i}", name=f"學生{i}", tokens=0)
+        for i in range(2)
+    ]
+    db_session.add_all([*units, *students])
+    await db_session.commit()
+    return students, {u.code: u.id for u in units}
+
+
+async def test_only_changed_fields_with_rules_are_evaluated(db_session, course, assert_max_queries):
+    (s0, s1), units = course
+    engine = AchievementEngine()
+    changes = [
+        RecordChange(s0.id, units["unit_1"], "quiz_score", 80.0),
+        RecordChange(s0.id, units["unit_1"], "completion_rate", 90.0),  # no rule
+        RecordChange(s0.id, units["unit_6"], "quiz_score", 70.0),  # no chapter_6 rule
+        RecordChange(s1.id, units["unit_2"], "pretest_score", None),  # cleared
+        RecordChange(s1.id, units["unit_2"], "pretest_score", 55.0),
+    ]
+    with assert_max_queries(3):  # unit ids, table generation, earned achievements of s0, s1
+        grants = await engine.evaluate(db_session, changes)
+    assert grants == [(s0.id, "chapter_1_complete"), (s1.id, "chapter_2_pretest")]
+
+    with assert_max_queries(0):
+        assert await engine.evaluate(db_session, [changes[1]]) == []
+
+
+async def test_process_grants_once_and_bitset_skips_earned(db_session, course, assert_max_queries):
+    (s0, _), units = course
+    engine = AchievementEngine()
+    changes = [RecordChange(s0.id, units["unit_3"], "quiz_score", 88.0)]
+
+    grants = await engine.process(db_session, changes)
+    await db_session.commit()
+    engine.mark_earned(grants)
+    assert grants == [(s0.id, "chapter_3_complete")]
+    assert engine.has_earned(s0.id, "chapter_3_complete")
+    assert s0.tokens == 10
+
+    # The score changes again: answered from the bitset, nothing written
+    with assert_max_queries(0):
+        assert await engine.process(db_session, changes) == []
+
+
+async def test_stale_bitset_is_confirmed_against_the_database(db_session, course):
+    (s0, _), units = course
+    engine = AchievementEngine()
+    assert await engine.evaluate(
+        db_session, [RecordChange(s0.id, units["unit_1"], "pretest_score", 60.0)]
+    ) == [(s0.id, "chapter_1_pretest")]
+
+    # Granted elsewhere (another worker), so this engine's bits are stale
+    await apply_grants(db_session, [Grant(s0.id, 10, "完成第1章前測", "chapter_1_pretest")])
+    await db_session.commit()
+
+    assert await engine.process(
+        db_session, [RecordChange(s0.id, units["unit_1"], "pretest_score", 65.0)]
+    ) == []
+    assert engine.has_earned(s0.id, "chapter_1_pretest")
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def test_revoked_grant_is_forgotten_on_next_generation(db_session, course):
+    (s0, _), units = course
+    clock = FakeClock()
+    engine = AchievementEngine(check_interval=2.0, clock=clock)
+    changes = [RecordChange(s0.id, units["unit_1"], "pretest_score", 60.0)]
+    grants = await engine.process(db_session, changes)
+    await db_session.commit()
+    engine.mark_earned(grants)
+
+    # Revoked outside the app: trusted only until the next generation check
+    await db_session.execute(delete(StudentAchievement))
+    await db_session.commit()
+    assert await engine.evaluate(db_session, changes) == []
+
+    clock.now += 2
+    assert await engine.evaluate(db_session, changes) == [(s0.id, "chapter_1_pretest")]
+    assert not engine.has_earned(s0.id, "chapter_1_pretest")
+
+
+async def test_reused_student_pk_does_not_inherit_bits(db_session, course):
+    (_, s1), units = course
+    clock = FakeClock()
+    engine = AchievementEngine(check_interval=2.0, clock=clock)
+    pk = s1.id  # the highest id, so SQLite hands it out again
+    changes = [RecordChange(pk, units["unit_2"], "quiz_score", 90.0)]
+    engine.mark_earned(await engine.process(db_session, changes))
+    await db_session.commit()
+
+    await db_session.execute(delete(StudentAchievement))
+    await db_session.execute(delete(Student).where(Student.id == pk))
+    await db_session.commit()
+    db_session.expunge_all()
+    newcomer = Student(email="new@example.com", student_id="S9", name="新生", tokens=0)
+    db_session.add(newcomer)
+    await db_session.commit()
+    assert newcomer.id == pk
+
+    clock.now += 2
+    assert await engine.evaluate(db_session, changes) == [(pk, "chapter_2_complete")]
+
+
+@pytest.fixture()
+async def teacher(db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="老師", role="teacher")
+    db_session.add(teacher)
+    await db_session.commit()
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    yield teacher
+    app.dependency_overrides.pop(require_teacher, None)
+
+
+async def _keys(db_session) -> list[str]:
+    return sorted((await db_session.execute(
+        select(StudentAchievement.achievement_key)
+    )).scalars().all())
+
+
+async def test_csv_import_and_record_edit_grant_achievements(client, db_session, course, teacher):
+    (s0, _), units = course
+    csv_body = "student_id,unit_code,preview_score,completion_rate,quiz_score\nS0,unit_2,,,75\n"
+    files = {"file": ("records.csv", csv_body.encode(), "text/csv")}
+
+    resp = await client.post("/api/admin/import", files=files)
+    assert resp.status_code == 200
+    assert resp.json()["achievements"]["breakdown"] == {"chapter_2_complete": 1}
+    resp = await client.post("/api/admin/import", files=files)  # unchanged: no new grant
+    assert resp.json()["achievements"]["achievements"] == 0
+
+    resp = await client.put(
+        f"/api/admin/students/{s0.id}/records/{units['unit_2']}", json={"pretest_score": 40}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["achievements"] == ["chapter_2_pretest"]
+
+    assert await _keys(db_session) == ["chapter_2_complete", "chapter_2_pretest"]
+    tokens = (await db_session.execute(
+        select(Student.tokens).where(Student.id == s0.id)
+    )).scalar_one()
+    assert tokens == 20
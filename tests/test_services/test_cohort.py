@@ -0,0 +1,102 @@
+"""Tests for the vectorized cohort scoring matrices."""
+
+import random
+from types import SimpleNamespace
+
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services.cohort import CohortScores, load_cohort
+from app.services.scoring import _learning_exp, _tier, calculate_card_level
+
+UNITS = [SimpleNamespace(id=100 + k, code=f"unit_{k}") for k in range(1, 7)]
+
+
+def _random_rows(n_students: int, seed: int = 7):
+    rng = random.Random(seed)
+
+    def score():
+        return None if rng.random() < 0.1 else round(rng.uniform(0, 100), rng.choice([0, 1, 2]))
+
+    rows = []
+    for sid in range(1, n_students + 1):
+        for unit in UNITS:
+            if rng.random() < 0.8:
+                rows.append((sid, unit.id, score(), score(), score()))
+    return rows
+
+
+def _scalar_exp(unit_code, p, c, q):
+    return c if unit_code == "unit_6" else _learning_exp(p, c, q)
+
+
+def test_matches_scalar_scoring():
+    rows = _random_rows(300)
+    student_ids = list(range(1, 301))
+    cohort = CohortScores.from_rows(student_ids, UNITS, rows)
+    by_cell = {(sid, uid): (p, c, q) for sid, uid, p, c, q in rows}
+    tiers = cohort.tiers
+
+    for i, sid in enumerate(student_ids):
+        total = 0.0
+        display = cohort.display_exp(sid)
+        for j, unit in enumerate(UNITS):
+            cell = by_cell.get((sid, unit.id))
+            if cell is None or (unit.code == "unit_6" and cell[1] is None):
+                assert display[j] is None and tiers[i, j] == ""
+                continue
+            exp = _scalar_exp(unit.code, *cell)
+            total += exp
+            assert cohort.exp[i, j] == exp
+            assert display[j] == (exp if unit.code == "unit_6" else round(exp, 1))
+            assert tiers[i, j] == _tier(display[j])
+        assert cohort.total_exp[i] == total
+        assert cohort.levels[i] == calculate_card_level(total)
+
+
+def test_tier_boundaries():
+    scores = [100, 90, 89.99, 80, 60, 59.9, 40, 39.99, 0]
+    rows = [(i + 1, UNITS[5].id, None, s, None) for i, s in enumerate(scores)]
+    cohort = CohortScores.from_rows(list(range(1, len(scores) + 1)), UNITS, rows)
+    assert list(cohort.tiers[:, 5]) == [_tier(s) for s in scores]
+
+
+def test_tier_follows_displayed_exp():
+    # 89.96 shows as 90 and is S; 89.94 shows as 89.9 and is A; unit_6 is not rounded
+    rows = [
+        (1, UNITS[0].id, 89.96, 89.96, 89.96),
+        (1, UNITS[1].id, 89.94, 89.94, 89.94),
+        (1, UNITS[5].id, None, 89.96, None),
+    ]
+    cohort = CohortScores.from_rows([1], UNITS, rows)
+    assert cohort.display_exp(1)[:2] == [90.0, 89.9]
+    assert list(cohort.tiers[0, [0, 1, 5]]) == ["S", "A", "A"]
+
+
+def test_unknown_students_and_units_are_ignored():
+    rows = [(1, UNITS[0].id, 80, 80, 80), (2, UNITS[0].id, 1, 1, 1), (1, 999, 1, 1, 1)]
+    cohort = CohortScores.from_rows([1], UNITS, rows)
+    assert cohort.display_exp(1) == [80.0, None, None, None, None, None]
+    assert cohort.display_exp(2) == [None] * 6
+    assert CohortScores.from_rows([], UNITS, []).levels.shape == (0,)
+
+
+async def test_load_cohort(db_session):
+    students = [Student(email=f"s{i}@example.com", student_id=f"S{i}", name="S") for i in range(3)]
+    units = [Unit(code=f"unit_{k}", name="U", unlock_attribute="x", sort_order=k) for k in (2, 1)]
+    db_session.add_all([*students, *units])
+    await db_session.flush()
+    db_session.add_all([
+        LearningRecord(student_id=students[0].id, unit_id=units[1].id, quiz_score=100),
+        LearningRecord(student_id=students[2].id, unit_id=units[0].id, completion_rate=50),
+    ])
+    await db_session.commit()
+
+    everyone = await load_cohort(db_session, units)
+    assert everyone.student_ids == [students[0].id, students[2].id]
+    assert everyone.unit_codes == ["unit_2", "unit_1"]
+    assert everyone.display_exp(students[0].id) == [None, 40.0]
+
+    selected = await load_cohort(db_session, units, [students[1].id, students[2].id])
+    assert selected.display_exp(students[1].id) == [None, None]
+    assert selected.display_exp(students[2].id) == [20.0, None]
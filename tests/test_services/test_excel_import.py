@@ -0,0 +1,83 @@
+"""Tests for the TronClass Excel report parsers."""
+
+import io
+
+from openpyxl import Workbook
+
+from app.services.excel_import import (
+    StudentRecord,
+    parse_completion_excel,
+    parse_score_excel,
+)
+
+
+def workbook_bytes(rows: list[list[object]]) -> bytes:
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_parse_completion_excel():
+    content = workbook_bytes([
+        ["排名", "帳號", "1-人工智慧與深度學習的基礎", "第一章 課後測驗", "6-自主學習", "備註"],
+        [1, "411000001", "87.5%", "100.0分", "—", None],
+        [2, "411000002", None, "未完成", "40%", None],
+        [None, None, None, None, None, None],
+        [3, " 411000001 ", "90%", None, "10%", None],  # duplicate row updates in place
+    ])
+
+    result = parse_completion_excel(content)
+
+    assert result.unrecognized_headers == ["備註"]
+    assert result.records == [
+        StudentRecord("411000001", "unit_1", completion_rate=90.0),
+        StudentRecord("411000002", "unit_6", completion_rate=40.0),
+        StudentRecord("411000001", "unit_6", completion_rate=10.0),
+    ]
+
+
+def test_parse_score_excel_merges_fields_per_unit():
+    content = workbook_bytes([
+        ["分組標題"],
+        ["帳號", "第一章 前測(10%)", "第一章 課後測驗(40%)", "第二章 課後測驗", "總分"],
+        ["411000001", "60", "未繳", "88.5", "100"],
+        ["411000002", "未批改", "70", None, "90"],
+        ["平均", "50", "50", "50", "50"],  # footer row
+    ])
+
+    result = parse_score_excel(content)
+
+    assert result.unrecognized_headers == ["總分"]
+    assert result.records == [
+        StudentRecord("411000001", "unit_1", pretest_score=60.0),
+        StudentRecord("411000001", "unit_2", quiz_score=88.5),
+        StudentRecord("411000002", "unit_1", quiz_score=70.0),
+    ]
+
+
+def test_unreadable_file_reports_error():
+    result = parse_score_excel(b"not an excel file")
+    assert result.records == [] and len(result.parse_errors) == 1
+
+
+def test_parsers_accept_file_objects_and_short_sheets():
+    content = workbook_bytes([
+        ["排名", "帳號", "6-自主學習"],
+        [1, "411000001", "55%"],
+    ])
+    result = parse_completion_excel(io.BytesIO(content))
+    assert result.records == [StudentRecord("411000001", "unit_6", completion_rate=55.0)]
+
+    # Score report with only its group header row: nothing to import, no error
+    result = parse_score_excel(workbook_bytes([["分組標題"]]))
+    assert result.records == [] and result.parse_errors == []
+
+
+def test_parse_errors_on_invalid_workbook():
+    result = parse_completion_excel(b"not an xlsx")
+    assert result.records == []
+    assert result.parse_errors[0].startswith("無法讀取 Excel 檔案")
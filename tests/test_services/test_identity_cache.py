@@ -0,0 +1,186 @@
+"""Tests for the email → Student identity cache."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy import select, update
+
+from app.dependencies import require_teacher
+from app.models.student import Student
+from app.services.auth import TAIPEI_TZ
+from app.services.identity_cache import IdentityCache, identity_cache
+from main import app
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _student(pk: int, email: str, tokens: int = 0) -> Student:
+    return Student(
+        id=pk,
+        email=email,
+        student_id=f"S{pk:03d}",
+        name=f"Student {pk}",
+        role="student",
+        tokens=tokens,
+    )
+
+
+def test_get_returns_independent_detached_copies():
+    cache = IdentityCache(maxsize=4, ttl=30)
+    cache.put(_student(1, "a@example.com", tokens=7))
+
+    first = cache.get("a@example.com")
+    second = cache.get("a@example.com")
+
+    assert first is not second
+    assert first.tokens == 7
+    assert sa_inspect(first).detached
+    first.tokens = 99
+    assert cache.get("a@example.com").tokens == 7
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = IdentityCache(maxsize=4, ttl=30, clock=clock)
+    cache.put(_student(1, "a@example.com"))
+
+    clock.now += 29
+    assert cache.get("a@example.com") is not None
+    clock.now += 2
+    assert cache.get("a@example.com") is None
+    assert len(cache) == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = IdentityCache(maxsize=2, ttl=30)
+    cache.put(_student(1, "a@example.com"))
+    cache.put(_student(2, "b@example.com"))
+    cache.get("a@example.com")  # a becomes most recent
+    cache.put(_student(3, "c@example.com"))
+
+    assert cache.get("b@example.com") is None
+    assert cache.get("a@example.com") is not None
+    assert cache.get("c@example.com") is not None
+
+
+def test_invalidate_by_primary_key_and_email_change():
+    cache = IdentityCache(maxsize=4, ttl=30)
+    cache.put(_student(1, "a@example.com"))
+    cache.invalidate(student_id=1)
+    assert cache.get("a@example.com") is None
+
+    cache.put(_student(2, "old@example.com"))
+    cache.put(_student(2, "new@example.com"))
+    assert cache.get("old@example.com") is None
+    assert cache.get("new@example.com") is not None
+
+
+def test_zero_size_disables_cache():
+    cache = IdentityCache(maxsize=0, ttl=30)
+    cache.put(_student(1, "a@example.com"))
+    assert cache.get("a@example.com") is None
+
+
+@pytest.fixture()
+async def tracked_student(db_session):
+    """A registered student whose daily login is already recorded."""
+    student = Student(
+        email="test@example.com",
+        student_id="411000001",
+        name="Test Student",
+        role="student",
+        tokens=10,
+        last_login_date=datetime.now(TAIPEI_TZ).date(),
+        last_login_at=datetime.now(timezone.utc),
+    )
+    db_session.add(student)
+    await db_session.commit()
+    await db_session.refresh(student)
+    return student
+
+
+async def test_middleware_populates_cache_and_admin_update_invalidates(
+    client, db_session, tracked_student, auth_headers
+):
+    resp = await client.get("/tokens", headers=auth_headers)
+    assert resp.status_code == 200
+    assert identity_cache.get("test@example.com") is not None
+
+    app.dependency_overrides[require_teacher] = lambda: tracked_student
+    try:
+        resp = await client.put(
+            f"/api/admin/students/{tracked_student.id}", json={"tokens": 42}
+        )
+    finally:
+        app.dependency_overrides.pop(require_teacher, None)
+    assert resp.status_code == 200
+    assert identity_cache.get("test@example.com") is None
+
+    await client.get("/tokens", headers=auth_headers)
+    assert identity_cache.get("test@example.com").tokens == 42
+
+
+async def test_spend_tokens_uses_cached_identity_and_invalidates(
+    client, db_session, tracked_student, auth_headers
+):
+    await client.get("/tokens", headers=auth_headers)
+
+    resp = await client.post(
+        "/api/tokens/spend",
+        json={"amount": 3, "reason": "test"},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["remaining_tokens"] == 7
+    assert identity_cache.get("test@example.com") is None
+
+
+async def _set_tokens_out_of_band(db_session, student_pk: int, tokens: int) -> None:
+    # Another worker's write: the cached identity does not see it
+    await db_session.execute(
+        update(Student)
+        .where(Student.id == student_pk)
+        .values(tokens=tokens)
+        .execution_options(synchronize_session=False)
+    )
+    await db_session.commit()
+
+
+async def test_spend_charges_row_balance_not_cached_snapshot(
+    client, db_session, tracked_student, auth_headers
+):
+    student_pk = tracked_student.id
+    await client.get("/tokens", headers=auth_headers)
+    assert identity_cache.get("test@example.com").tokens == 10
+
+    # A grant lands after the identity was cached; spending must not undo it
+    await _set_tokens_out_of_band(db_session, student_pk, 15)
+    resp = await client.post(
+        "/api/tokens/spend", json={"amount": 3, "reason": "test"}, headers=auth_headers
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["remaining_tokens"] == 12
+
+    # Balance drained elsewhere: the cached 12 must not allow an overspend
+    await client.get("/tokens", headers=auth_headers)
+    await _set_tokens_out_of_band(db_session, student_pk, 2)
+    resp = await client.post(
+        "/api/tokens/spend", json={"amount": 3, "reason": "test"}, headers=auth_headers
+    )
+    assert resp.status_code == 400
+    assert "餘額 2" in resp.json()["detail"]
+
+    await db_session.rollback()
+    tokens = (
+        await db_session.execute(select(Student.tokens).where(Student.id == student_pk))
+    ).scalar_one()
+    assert tokens == 2
@@ -0,0 +1,83 @@
+"""Tests for the Excel preview → commit token store."""
+
+from app.services.excel_import import ExcelParseResult, StudentRecord
+from app.services.import_tokens import ImportPlan, ImportPreview, ImportTokenStore
+from app.services.record_import import RecordChange, RecordDiff
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _preview(import_type: str = "scores") -> ImportPreview:
+    result = ExcelParseResult(
+        records=[StudentRecord("411000001", "unit_1", pretest_score=60.0, quiz_score=80.0)],
+        unrecognized_headers=["總分"],
+    )
+    return ImportPreview(import_type, result)
+
+
+def test_disk_copy_survives_eviction_and_other_workers(tmp_path):
+    store = ImportTokenStore(tmp_path, maxsize=1)
+    token = store.token_for("scores", "a" * 64)
+    store.put(token, _preview())
+    store.put(store.token_for("scores", "b" * 64), _preview())  # evicts the first
+    assert len(store) == 1
+
+    other_worker = ImportTokenStore(tmp_path)
+    assert other_worker.get(token, "scores") == _preview()
+    assert store.pop(token, "scores") == _preview()
+    # The file was the claim: neither process can commit it again
+    assert other_worker.pop(token, "scores") is None
+    assert store.pop(token, "scores") is None
+
+
+def test_type_mismatch_and_bad_tokens(tmp_path):
+    store = ImportTokenStore(tmp_path)
+    token = store.token_for("scores", "a" * 64)
+    store.put(token, _preview())
+    assert store.pop(token, "completion") is None
+    assert store.get("../../app", "scores") is None
+    assert store.pop(token, "scores") is not None
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    store = ImportTokenStore(None, ttl=60, clock=clock)
+    token = store.token_for("completion", "a" * 64)
+    store.put(token, _preview("completion"))
+    clock.now += 59
+    assert store.get(token, "completion") is not None
+    clock.now += 2
+    assert store.get(token, "completion") is None
+    assert len(store) == 0
+
+
+def test_plan_round_trips_through_disk(tmp_path):
+    plan = ImportPlan(
+        fields=["pretest_score", "quiz_score"],
+        base={(1, 1): None, (1, 2): {"pretest_score": 50.0, "quiz_score": None}},
+        diff=RecordDiff(
+            created={(1, 1): {"pretest_score": 60.0, "quiz_score": 80.0}},
+            changed={},
+            unchanged=1,
+            field_changes={"pretest_score": 1, "quiz_score": 1},
+            changes=[
+                RecordChange(1, 1, "pretest_score", 60.0),
+                RecordChange(1, 1, "quiz_score", 80.0),
+            ],
+        ),
+        grants=[(1, "chapter_1_pretest"), (1, "chapter_1_complete")],
+        warnings=["找不到學號 411999999，已略過"],
+    )
+    preview = _preview()
+    preview.plan = plan
+    store = ImportTokenStore(tmp_path)
+    token = store.token_for("scores", "a" * 64)
+    store.put(token, preview)
+
+    assert ImportTokenStore(tmp_path).pop(token, "scores") == preview
@@ -0,0 +1,150 @@
+"""Tests for the write-behind daily login tracker."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.student import Student
+from app.models.token_transaction import TokenTransaction
+from app.services.auth import TAIPEI_TZ
+from app.services.identity_cache import identity_cache
+from app.services.login_tracker import LoginTracker, login_tracker
+
+
+@pytest.fixture()
+def session_factory(async_engine):
+    return async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture()
+async def student(db_session):
+    student = Student(
+        email="test@example.com",
+        student_id="411000001",
+        name="Test Student",
+        role="student",
+        tokens=10,
+        last_login_date=date(2020, 1, 1),
+    )
+    db_session.add(student)
+    await db_session.commit()
+    await db_session.refresh(student)
+    return student
+
+
+async def _bonus_rows(session_factory) -> int:
+    async with session_factory() as db:
+        return await db.scalar(
+            select(func.count()).select_from(TokenTransaction)
+        )
+
+
+async def _reload(session_factory, pk: int) -> Student:
+    async with session_factory() as db:
+        return await db.get(Student, pk)
+
+
+async def test_observe_queues_once_per_day(student):
+    tracker = LoginTracker()
+    assert tracker.observe(student) is True
+    assert tracker.observe(student) is False
+    assert tracker.pending_count == 1
+
+
+async def test_flush_writes_login_and_awards_bonus_once(student, session_factory):
+    tracker = LoginTracker()
+    tracker.observe(student)
+    assert await tracker.flush(session_factory) == 1
+
+    row = await _reload(session_factory, student.id)
+    assert row.tokens == 11
+    assert row.last_login_date == datetime.now(TAIPEI_TZ).date()
+    assert row.last_login_at is not None
+
+    # A restarted process still holding the stale snapshot must not re-award
+    restarted = LoginTracker()
+    assert restarted.observe(student) is True
+    assert await restarted.flush(session_factory) == 0
+    assert (await _reload(session_factory, student.id)).tokens == 11
+    assert await _bonus_rows(session_factory) == 1
+
+
+async def test_teacher_login_recorded_without_bonus(db_session, session_factory):
+    teacher = Student(email="t@example.com", student_id="T001", name="T", role="teacher")
+    db_session.add(teacher)
+    await db_session.commit()
+
+    tracker = LoginTracker()
+    tracker.observe(teacher)
+    assert await tracker.flush(session_factory) == 0
+    assert (await _reload(session_factory, teacher.id)).last_login_at is not None
+    assert await _bonus_rows(session_factory) == 0
+
+
+async def test_failed_flush_requeues_batch(student, session_factory):
+    tracker = LoginTracker()
+    tracker.observe(student)
+
+    def broken_factory():
+        raise RuntimeError("database is locked")
+
+    with pytest.raises(RuntimeError):
+        await tracker.flush(broken_factory)
+    assert tracker.pending_count == 1
+
+    assert await tracker.flush(session_factory) == 1
+
+
+async def test_new_day_observes_again(student):
+    tracker = LoginTracker()
+    tracker.observe(student)
+    tracker._seen_day = tracker._seen_day - timedelta(days=1)
+    tracker._pending.clear()
+    assert tracker.observe(student) is True
+
+
+async def test_middleware_defers_login_write_until_flush(
+    client, student, session_factory, auth_headers
+):
+    resp = await client.get("/tokens", headers=auth_headers)
+    assert resp.status_code == 200
+    assert (await _reload(session_factory, student.id)).tokens == 10
+    assert login_tracker.pending_count == 1
+
+    assert await login_tracker.flush(session_factory) == 1
+    assert identity_cache.get("test@example.com") is None
+    row = await _reload(session_factory, student.id)
+    assert row.tokens == 11
+    assert row.last_login_date == datetime.now(TAIPEI_TZ).date()
+
+
+async def test_flush_batches_writes_and_backfills_login_at(
+    db_session, session_factory, assert_max_queries
+):
+    today = datetime.now(TAIPEI_TZ).date()
+    returning = [
+        Student(email=f"s{i}@example.com", student_id=f"41100010{i}", name="S",
+                role="student", tokens=0, last_login_date=date(2020, 1, 1))
+        for i in range(3)
+    ]
+    # Date recorded today but never stamped: no second bonus, just the stamp
+    stamped_late = Student(email="late@example.com", student_id="411000200", name="L",
+                           role="student", tokens=5, last_login_date=today)
+    teacher = Student(email="t@example.com", student_id="T001", name="T", role="teacher")
+    db_session.add_all([*returning, stamped_late, teacher])
+    await db_session.commit()
+
+    tracker = LoginTracker()
+    for s in [*returning, stamped_late, teacher]:
+        assert tracker.observe(s) is True
+
+    with assert_max_queries(3):
+        assert await tracker.flush(session_factory) == 3
+
+    rows = [await _reload(session_factory, s.id) for s in [*returning, stamped_late, teacher]]
+    assert [r.tokens for r in rows[:3]] == [1, 1, 1]
+    assert rows[3].tokens == 5 and rows[3].last_login_at is not None
+    assert rows[4].last_login_date == today and rows[4].last_login_at is not None
+    assert await _bonus_rows(session_factory) == 3
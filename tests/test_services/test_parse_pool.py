@@ -0,0 +1,69 @@
+"""Tests for the worker pool used by Excel parsing."""
+
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+from app.services.excel_import import StudentRecord, parse_completion_excel
+from app.services.parse_pool import ParsePool, ParseTimeoutError
+from tests.test_services.test_excel_import import workbook_bytes
+
+
+def _completion_upload() -> io.BytesIO:
+    return io.BytesIO(workbook_bytes([
+        ["排名", "帳號", "1-人工智慧與深度學習的基礎"],
+        [1, "411000001", "87.5%"],
+    ]))
+
+
+async def test_parse_upload_in_worker_process():
+    pool = ParsePool(workers=1, max_jobs=1, timeout=60)
+    pool.start()
+    try:
+        assert pool.running
+        result = await pool.parse_upload(parse_completion_excel, _completion_upload())
+    finally:
+        pool.stop()
+    assert result.records == [StudentRecord("411000001", "unit_1", completion_rate=87.5)]
+
+
+async def test_thread_fallback_before_start():
+    pool = ParsePool(workers=2)
+    result = await pool.parse_upload(parse_completion_excel, _completion_upload())
+    assert not pool.running
+    assert result.records == [StudentRecord("411000001", "unit_1", completion_rate=87.5)]
+    pool.stop()
+
+
+async def test_concurrent_jobs_are_capped():
+    pool = ParsePool(workers=0, max_jobs=2, timeout=10)
+    lock = threading.Lock()
+    active = peak = 0
+
+    def job() -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+
+    await asyncio.gather(*(pool.run(job) for _ in range(6)))
+    pool.stop()
+    assert peak == 2
+
+
+async def test_timeout_keeps_slot_until_job_ends():
+    pool = ParsePool(workers=0, max_jobs=1, timeout=0.1)
+    with pytest.raises(ParseTimeoutError):
+        await pool.run(time.sleep, 0.5)
+    # The sleeping job still holds the only slot, so this one times out waiting
+    with pytest.raises(ParseTimeoutError):
+        await pool.run(int, "1")
+    await asyncio.sleep(0.5)
+    assert await pool.run(int, "1") == 1
+    pool.stop()
@@ -0,0 +1,104 @@
+"""Tests for the rarity lab (RARITY_TABLE simulation and audit)."""
+
+import numpy as np
+import pytest
+
+from app.dependencies import require_teacher
+from app.models.card import Card
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services import scoring
+from app.services.rarity_lab import RARITIES, parse_table, probability_matrix, simulate
+from main import app
+
+
+def test_probability_matrix_matches_roll_rarity_bands():
+    table = [(1, 10, {"N": 1}), (5, 20, {"UR": 3, "SR": 1})]  # overlap: first band wins
+    probs = probability_matrix(table)
+    assert probs[7].tolist() == [1.0, 0, 0, 0, 0]
+    assert probs[15].tolist() == [0, 0, 0.25, 0, 0.75]
+    default = np.array([scoring.RARITY_DEFAULT_WEIGHTS[r] for r in RARITIES]) / 100
+    assert np.allclose(probs[50], default)
+
+
+def test_simulation_agrees_with_roll_rarity():
+    levels = [3, 35, 35, 77, 100]
+    bands = simulate(levels, draws_per_student=200_000, seed=42)
+    for band in bands.values():
+        assert sum(band["simulated"].values()) == band["students"] * 200_000
+        assert sum(band["expected"].values()) == pytest.approx(band["students"] * 200_000)
+        for rarity in RARITIES:
+            assert band["simulated"][rarity] == pytest.approx(band["expected"][rarity], rel=0.05, abs=500)
+
+    # Spot-check the band shares against the scalar roller itself
+    rolls = scoring.RaritySampler(seed=42).roll_many([77] * 20_000)
+    sr_share = rolls.count("SR") / len(rolls)
+    band = bands["71-80"]
+    assert sr_share == pytest.approx(band["expected"]["SR"] / 200_000, abs=0.02)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [[], [[0, 10, {"N": 1}]], [[1, 10, {"X": 1}]], [[1, 10, {"N": 0}]], [[1, 10, {"N": -1}]], [[1, 10]]],
+)
+def test_parse_table_rejects_bad_input(raw):
+    with pytest.raises(ValueError):
+        parse_table(raw)
+
+
+@pytest.fixture()
+async def cohort(db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="T", role="teacher")
+    students = [Student(email=f"s{i}@example.com", student_id=f"S{i}", name="S") for i in range(3)]
+    units = [Unit(code=f"unit_{i}", name="U", unlock_attribute="x", sort_order=i) for i in range(1, 7)]
+    db_session.add_all([teacher, *students, *units])
+    await db_session.flush()
+    # one student at LV 100, two with no records (LV 1)
+    db_session.add_all(
+        LearningRecord(
+            student_id=students[0].id, unit_id=u.id,
+            preview_score=100, completion_rate=100, quiz_score=100,
+        )
+        for u in units
+    )
+    db_session.add_all([
+        Card(student_id=students[0].id, status="completed", level_number=100, rarity="UR"),
+        Card(student_id=students[0].id, status="completed", level_number=95, rarity="SSR"),
+        Card(student_id=students[1].id, status="completed", level_number=1, rarity=None),
+        Card(student_id=students[1].id, status="failed", level_number=1, rarity="N"),
+    ])
+    await db_session.commit()
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    yield students
+    app.dependency_overrides.pop(require_teacher, None)
+
+
+async def test_rarity_lab_endpoint(client, cohort):
+    resp = await client.post("/api/admin/rarity-lab", json={"draws_per_student": 1000, "seed": 1})
+    assert resp.status_code == 200
+    report = resp.json()
+    assert report["students"] == 3 and report["total_draws"] == 3000
+
+    bands = {b["band"]: b for b in report["bands"]}
+    assert set(bands) == {"1-10", "91-100"}
+    assert bands["91-100"]["students"] == 1
+    assert bands["91-100"]["actual"] == {"N": 0, "R": 0, "SR": 0, "SSR": 1, "UR": 1}
+    assert bands["1-10"]["students"] == 2
+    assert bands["1-10"]["actual"]["N"] == 1  # failed cards are not counted
+
+
+async def test_rarity_lab_candidate_table(client, cohort):
+    resp = await client.post(
+        "/api/admin/rarity-lab",
+        json={"table": [[1, 100, {"UR": 1}]], "draws_per_student": 10},
+    )
+    assert resp.status_code == 200
+    band = resp.json()["bands"][0]
+    assert band["band"] == "1-100"
+    assert band["simulated"] == {"N": 0, "R": 0, "SR": 0, "SSR": 0, "UR": 30}
+
+    resp = await client.post("/api/admin/rarity-lab", json={"draws_per_student": 0})
+    assert resp.status_code == 400
+    resp = await client.post("/api/admin/rarity-lab", json={"table": [[1, 10, {"X": 1}]]})
+    assert resp.status_code == 400
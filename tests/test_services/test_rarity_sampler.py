@@ -0,0 +1,64 @@
+"""Tests for the precomputed rarity sampler behind roll_rarity."""
+
+import random
+
+import pytest
+
+from app.services import scoring
+from app.services.scoring import RARITY_DEFAULT_WEIGHTS, RARITY_TABLE, RaritySampler
+
+
+def _legacy_roll(level: int, rng: random.Random) -> str:
+    """roll_rarity as it was before the precomputed tables."""
+    level = max(1, min(100, level))
+    weights = RARITY_DEFAULT_WEIGHTS
+    for lo, hi, w in RARITY_TABLE:
+        if lo <= level <= hi:
+            weights = w
+            break
+    rarities = [r for r, w in weights.items() if w > 0]
+    return rng.choices(rarities, weights=[weights[r] for r in rarities], k=1)[0]
+
+
+def test_same_draws_as_random_choices():
+    level_rng = random.Random(0)
+    levels = [level_rng.randint(-10, 120) for _ in range(5_000)]
+    rng = random.Random(123)
+    expected = [_legacy_roll(level, rng) for level in levels]
+    assert RaritySampler(seed=123).roll_many(levels) == expected
+
+
+def test_roll_many_matches_repeated_roll():
+    levels = list(range(1, 101)) * 3
+    single = RaritySampler(seed=9)
+    assert RaritySampler(seed=9).roll_many(levels) == [single.roll(level) for level in levels]
+
+
+def test_streams_are_independent_and_reproducible():
+    base = RaritySampler(seed=1)
+    a = base.stream(7)
+    b = base.stream(7)
+    assert [a.roll(95) for _ in range(50)] == [b.roll(95) for _ in range(50)]
+
+    base.roll_many([95] * 100)  # advancing one stream does not move another
+    c = base.stream(7)
+    assert c.roll_many([95] * 50) == b.stream(7).roll_many([95] * 50)
+
+
+def test_does_not_touch_global_random_state():
+    random.seed(5)
+    before = random.getstate()
+    scoring.roll_rarity(50)
+    scoring.simulation_rarity_sampler.roll_many([50] * 10)
+    assert random.getstate() == before
+
+
+def test_zero_weight_rarities_never_drawn():
+    sampler = RaritySampler([(1, 100, {"N": 0, "R": 0, "SR": 0, "SSR": 0, "UR": 1})], seed=0)
+    assert set(sampler.roll_many(range(1, 101))) == {"UR"}
+
+
+@pytest.mark.parametrize("level", [-3, 0, 150])
+def test_levels_are_clamped(level):
+    clamped = 1 if level < 1 else 100
+    assert RaritySampler(seed=4).roll_many([level] * 20) == RaritySampler(seed=4).roll_many([clamped] * 20)
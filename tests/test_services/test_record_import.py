@@ -0,0 +1,80 @@
+"""Tests for the bulk diff-based learning record upsert."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.unit import Unit
+from app.services.record_import import RecordUpdate, diff_records, upsert_records
+
+FIELDS = ("completion_rate", "quiz_score")
+
+
+def test_diff_merges_in_order_and_counts_fields():
+    existing = {(1, 1): {"completion_rate": 50.0, "quiz_score": 70.0}}
+    diff = diff_records(existing, [
+        RecordUpdate(1, 1, {"completion_rate": 60.0, "quiz_score": None}),
+        RecordUpdate(1, 1, {"completion_rate": 65.0, "quiz_score": None}),  # later row wins
+        RecordUpdate(2, 1, {"completion_rate": None, "quiz_score": 90.0}),
+        RecordUpdate(3, 1, {"completion_rate": None, "quiz_score": None}),
+    ], FIELDS)
+
+    assert diff.changed == {(1, 1): {"completion_rate": 65.0, "quiz_score": 70.0}}
+    assert diff.created == {
+        (2, 1): {"completion_rate": None, "quiz_score": 90.0},
+        (3, 1): {"completion_rate": None, "quiz_score": None},
+    }
+    assert diff.field_changes == {"completion_rate": 1, "quiz_score": 1}
+
+
+def test_diff_detects_unchanged_records():
+    existing = {(1, 1): {"completion_rate": 50.0, "quiz_score": None}}
+    diff = diff_records(existing, [RecordUpdate(1, 1, {"completion_rate": 50.0})], FIELDS)
+    assert diff.unchanged == 1 and not diff.changed and not diff.created
+
+
+@pytest.fixture()
+async def roster(db_session):
+    units = [Unit(code=f"unit_{i}", name=f"Unit {i}", unlock_attribute="x", sort_order=i) for i in (1, 2)]
+    students = [Student(email=f"s{i}@example.com", student_id=f"S{i}", name=f"S{i}") for i in range(3)]
+    db_session.add_all([*units, *students])
+    await db_session.flush()
+    db_session.add(LearningRecord(
+        student_id=students[0].id, unit_id=units[0].id, completion_rate=50.0, quiz_score=70.0,
+        updated_at=datetime(2026, 1, 1),
+    ))
+    db_session.add(LearningRecord(
+        student_id=students[1].id, unit_id=units[0].id, completion_rate=40.0,
+        updated_at=datetime(2026, 1, 1),
+    ))
+    await db_session.commit()
+    return students, units
+
+
+async def test_upsert_writes_only_changes_in_few_queries(db_session, roster, assert_max_queries):
+    (s0, s1, s2), (u1, u2) = roster
+    updates = [
+        RecordUpdate(s0.id, u1.id, {"completion_rate": 50.0, "quiz_score": None}),  # unchanged
+        RecordUpdate(s1.id, u1.id, {"completion_rate": 45.0, "quiz_score": 88.0}),  # changed
+        RecordUpdate(s2.id, u2.id, {"completion_rate": 10.0, "quiz_score": None}),  # created
+    ]
+    with assert_max_queries(2):  # existing-row load + one upsert batch
+        result = await upsert_records(db_session, updates, FIELDS)
+    await db_session.commit()
+
+    assert (result.created, result.updated, result.unchanged) == (1, 1, 1)
+    assert result.field_changes == {"completion_rate": 2, "quiz_score": 1}
+
+    rows = {
+        (r.student_id, r.unit_id): r
+        for r in (await db_session.execute(
+            select(LearningRecord).execution_options(populate_existing=True)
+        )).scalars()
+    }
+    assert rows[(s0.id, u1.id)].updated_at == datetime(2026, 1, 1)
+    assert (rows[(s1.id, u1.id)].completion_rate, rows[(s1.id, u1.id)].quiz_score) == (45.0, 88.0)
+    assert rows[(s1.id, u1.id)].updated_at > datetime(2026, 1, 1)
+    assert rows[(s2.id, u2.id)].completion_rate == 10.0
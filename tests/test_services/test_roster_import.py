@@ -0,0 +1,110 @@
+"""Tests for the set-based roster CSV import."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+
+from app.dependencies import require_teacher
+from app.models.student import Student
+from app.services.roster_import import import_roster
+from main import app
+
+
+def _rows(*pairs):
+    return [{"id": sid, "name": name} for sid, name in pairs]
+
+
+@pytest.fixture()
+async def existing(db_session):
+    db_session.add_all([
+        Student(email="a@example.com", student_id="S001", name="甲"),
+        Student(email="__unbound__S002@placeholder", student_id="S002", name="乙"),
+    ])
+    await db_session.commit()
+
+
+async def _names(db_session) -> dict[str, str]:
+    result = await db_session.execute(
+        select(Student.student_id, Student.name).execution_options(populate_existing=True)
+    )
+    return dict(result.all())
+
+
+async def test_import_creates_renames_and_skips_unchanged(db_session, existing, assert_max_queries):
+    rows = _rows(("S001", "甲"), ("S002", "乙二"), ("S003", "丙"), ("", "無學號"), ("S003", "丙二"))
+    with assert_max_queries(4):  # (IN prefetch + upsert) per chunk
+        result = await import_roster(db_session, rows, chunk_size=3)
+    await db_session.commit()
+
+    assert result.created == [("S003", "丙二")]  # repeated ID: last name wins
+    assert result.renamed == [("S002", "乙", "乙二")]
+    assert result.unchanged == 1
+    assert result.total == 3
+    assert result.errors == ["Row 5: missing id or name"]
+    assert await _names(db_session) == {"S001": "甲", "S002": "乙二", "S003": "丙二"}
+
+    created = (await db_session.execute(
+        select(Student).where(Student.student_id == "S003")
+    )).scalar_one()
+    assert created.email == "__unbound__S003@placeholder"
+    assert (created.role, created.tokens) == ("student", 0)
+
+
+async def test_rename_back_within_one_file_is_unchanged(db_session, existing):
+    rows = _rows(("S002", "乙二"), ("S002", "乙"))
+    result = await import_roster(db_session, rows, chunk_size=1)
+    await db_session.commit()
+
+    assert result.renamed == [] and result.unchanged == 1
+    assert (await _names(db_session))["S002"] == "乙"
+
+
+async def test_dry_run_writes_nothing(db_session, existing, assert_max_queries):
+    rows = _rows(("S002", "乙二"), ("S003", "丙"))
+    with assert_max_queries(1):
+        result = await import_roster(db_session, rows, dry_run=True)
+    await db_session.commit()
+
+    assert result.dry_run
+    assert result.created == [("S003", "丙")]
+    assert result.renamed == [("S002", "乙", "乙二")]
+    assert await _names(db_session) == {"S001": "甲", "S002": "乙"}
+
+
+@pytest.fixture()
+async def teacher(db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="老師", role="teacher")
+    db_session.add(teacher)
+    await db_session.commit()
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    yield teacher
+    app.dependency_overrides.pop(require_teacher, None)
+
+
+async def test_roster_endpoint_dry_run_then_import(client, db_session, existing, teacher):
+    csv_bytes = "\ufeffid,name\nS001,甲\nS002,乙二\nS003,丙\n".encode()
+    files = {"file": ("roster.csv", csv_bytes, "text/csv")}
+
+    resp = await client.post("/api/admin/roster", params={"dry_run": "true"}, files=files)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["dry_run"] is True
+    assert (data["created"], data["updated"], data["unchanged"], data["total"]) == (1, 1, 1, 3)
+    assert data["changes"] == {
+        "created": [{"id": "S003", "name": "丙"}],
+        "renamed": [{"id": "S002", "old_name": "乙", "name": "乙二"}],
+    }
+    assert "S003" not in await _names(db_session)
+
+    resp = await client.post("/api/admin/roster", files=files)
+    assert resp.status_code == 200
+    assert resp.json()["dry_run"] is False
+    assert (await _names(db_session))["S003"] == "丙"
+
+
+async def test_roster_endpoint_rejects_non_utf8(client, teacher):
+    files = {"file": ("roster.csv", "id,name\nS001,甲\n".encode("big5"), "text/csv")}
+    resp = await client.post("/api/admin/roster", files=files)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "CSV 檔案必須是 UTF-8 編碼"
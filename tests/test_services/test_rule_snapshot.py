@@ -0,0 +1,131 @@
+"""Tests for the compiled attribute_rules snapshot used by the scoring engine."""
+
+import json
+
+import pytest
+
+from app.dependencies import require_teacher
+from app.models.attribute_rule import AttributeRule
+from app.models.student import Student
+from app.services.rule_snapshot import CompiledRules, RuleSnapshotStore, rule_snapshot
+from app.services.scoring import get_available_options
+from main import app
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _rule(pk, unit_code, attribute_type, tier, options, labels=None, sort_order=0):
+    return AttributeRule(
+        id=pk,
+        unit_code=unit_code,
+        attribute_type=attribute_type,
+        tier=tier,
+        options=json.dumps(options),
+        labels=json.dumps(labels or {o: o.upper() for o in options}),
+        sort_order=sort_order,
+    )
+
+
+def _rules():
+    return [
+        _rule(1, "unit_1", "race", "S", ["dragon", "elf"], sort_order=1),
+        _rule(2, "unit_1", "race", "B", ["human", "elf"], sort_order=1),
+        _rule(3, "unit_1", "race", "D", ["slime"], sort_order=1),
+        _rule(4, "unit_1", "gender", "D", ["male", "female"], sort_order=0),
+        _rule(5, "unit_4", "weapon_type", "S", ["staff", "sword", "bow"], sort_order=0),
+    ]
+
+
+def test_inclusive_tiers_are_premerged():
+    compiled = CompiledRules.from_rules(_rules())
+
+    top = compiled.options_for("unit_1", "S")
+    assert list(top) == ["gender", "race"]  # ordered by sort_order
+    assert top["race"]["options"] == ["dragon", "elf", "human", "slime"]
+    assert top["race"]["labels"]["dragon"] == "DRAGON"
+
+    assert compiled.options_for("unit_1", "A")["race"]["options"] == ["human", "elf", "slime"]
+    assert compiled.options_for("unit_1", "D")["race"]["options"] == ["slime"]
+    assert compiled.options_for("unit_9", "S") == {}
+
+
+def test_weapon_affinity_filters_without_touching_snapshot():
+    compiled = CompiledRules.from_rules(_rules())
+
+    filtered = compiled.options_for("unit_4", "S", character_class="archer")
+    assert filtered["weapon_type"]["options"] == ["bow"]
+    assert set(filtered["weapon_type"]["labels"]) == {"bow"}
+    assert compiled.options_for("unit_4", "S")["weapon_type"]["options"] == ["staff", "sword", "bow"]
+
+
+async def test_lookups_hit_db_once(db_session, assert_max_queries):
+    db_session.add_all(_rules()[:4])
+    await db_session.commit()
+    rule_snapshot.invalidate()
+    try:
+        with assert_max_queries(2):  # the rules and their version, once
+            for _ in range(6):
+                options = await get_available_options(
+                    "unit_1", preview_score=100, completion_rate=100, quiz_score=100, db=db_session
+                )
+        assert options["race"]["options"][0] == "dragon"
+    finally:
+        rule_snapshot.invalidate()
+
+
+async def test_admin_rule_update_rebuilds_snapshot(client, db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="T", role="teacher")
+    db_session.add_all([teacher, *_rules()[:4]])
+    await db_session.commit()
+
+    before = await get_available_options("unit_1", 100, 100, 100, db=db_session)
+    assert before["race"]["options"][0] == "dragon"
+
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    try:
+        resp = await client.put("/api/admin/rules/1", json={"options": ["phoenix"]})
+        assert resp.status_code == 200
+        resp = await client.delete("/api/admin/rules/4")
+        assert resp.status_code == 200
+    finally:
+        app.dependency_overrides.pop(require_teacher, None)
+
+    after = await get_available_options("unit_1", 100, 100, 100, db=db_session)
+    assert after["race"]["options"][0] == "phoenix"
+    assert "gender" not in after
+
+
+async def test_other_worker_notices_rule_change(db_session, assert_max_queries):
+    db_session.add_all(_rules()[:4])
+    await db_session.commit()
+    clock = FakeClock()
+    editor, other = (RuleSnapshotStore(2.0, clock=clock) for _ in range(2))
+    assert (await other.get(db_session)).rule_count == 4
+
+    rule = await db_session.get(AttributeRule, 1)
+    rule.options = json.dumps(["phoenix"])
+    await db_session.commit()
+    await editor.refresh(db_session)  # only the worker that served the edit
+
+    with assert_max_queries(0):
+        assert (await other.get(db_session)).options_for("unit_1", "S")["race"]["options"][0] == "dragon"
+
+    clock.now += 2
+    with assert_max_queries(3):  # version check, then the rebuild
+        compiled = await other.get(db_session)
+    assert compiled.options_for("unit_1", "S")["race"]["options"][0] == "phoenix"
+
+    clock.now += 2
+    with assert_max_queries(1):  # unchanged: just the version check
+        assert await other.get(db_session) is compiled
+
+    await db_session.delete(await db_session.get(AttributeRule, 4))
+    await db_session.commit()
+    clock.now += 2
+    assert (await other.get(db_session)).rule_count == 3
@@ -0,0 +1,196 @@
+"""Tests for the materialized student_unit_options table and its writers."""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.dependencies import require_teacher
+from app.models.learning_record import LearningRecord
+from app.models.student import Student
+from app.models.attribute_rule import AttributeRule
+from app.models.student_unit_options import StudentUnitOptions
+from app.models.unit import Unit
+from app.services.rule_snapshot import rule_snapshot
+from app.services.scoring import get_available_options
+from app.services.student_options import (
+    load_student_options,
+    refresh_all_student_options,
+    refresh_stale_student_options,
+    refresh_student_options,
+)
+from main import app
+
+
+@pytest.fixture()
+async def world(db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="T", role="teacher")
+    student = Student(email="test@example.com", student_id="411000001", name="S", role="student")
+    other = Student(email="o@example.com", student_id="411000002", name="O", role="student")
+    units = [
+        Unit(code=f"unit_{i}", name=f"Unit {i}", unlock_attribute="x", sort_order=i)
+        for i in range(1, 7)
+    ]
+    db_session.add_all([teacher, student, other, *units])
+    await db_session.flush()
+    db_session.add_all([
+        LearningRecord(student_id=student.id, unit_id=units[0].id, preview_score=50, completion_rate=50, quiz_score=50),
+        LearningRecord(student_id=student.id, unit_id=units[3].id, preview_score=100, completion_rate=100, quiz_score=100),
+        LearningRecord(student_id=student.id, unit_id=units[4].id, pretest_score=30),  # no quiz yet
+        LearningRecord(student_id=other.id, unit_id=units[0].id, preview_score=100, completion_rate=100, quiz_score=100),
+    ])
+    await refresh_all_student_options(db_session)
+    await db_session.commit()
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    yield {"student": student, "other": other, "units": units}
+    app.dependency_overrides.pop(require_teacher, None)
+
+
+async def test_rows_match_live_scoring(db_session, world):
+    options = await load_student_options(db_session, world["student"].id)
+    assert set(options) == {"unit_1", "unit_4"}
+    assert options["unit_1"] == await get_available_options("unit_1", 50, 50, 50, db=db_session)
+    assert options["unit_4"] == await get_available_options("unit_4", 100, 100, 100, db=db_session)
+
+
+async def test_record_edit_refreshes_only_that_student(client, db_session, world):
+    student, other, units = world["student"], world["other"], world["units"]
+    before_other = await load_student_options(db_session, other.id)
+
+    resp = await client.put(
+        f"/api/admin/students/{student.id}/records/{units[4].id}", json={"quiz_score": 90}
+    )
+    assert resp.status_code == 200
+
+    options = await load_student_options(db_session, student.id)
+    assert set(options) == {"unit_1", "unit_4", "unit_5"}
+    assert await load_student_options(db_session, other.id) == before_other
+
+
+async def test_csv_import_refreshes_affected_students(client, db_session, world):
+    csv_body = "student_id,unit_code,preview_score,completion_rate,quiz_score\n411000002,unit_2,90,90,90\n"
+    resp = await client.post(
+        "/api/admin/import", files={"file": ("records.csv", csv_body.encode(), "text/csv")}
+    )
+    assert resp.status_code == 200 and resp.json()["created"] == 1
+    assert set(await load_student_options(db_session, world["other"].id)) == {"unit_1", "unit_2"}
+
+
+async def test_class_choice_refreshes_weapon_options(client, db_session, world, auth_headers):
+    resp = await client.put(
+        "/api/config/unit_2",
+        json={"attribute_type": "class", "attribute_value": "archer"},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200
+
+    weapons = (await load_student_options(db_session, world["student"].id))["unit_4"]["weapon_type"]
+    assert set(weapons["options"]) <= {"bow", "dagger"}
+
+    resp = await client.get("/api/config/unit_4/options", headers=auth_headers)
+    assert resp.json()["options"]["weapon_type"] == weapons
+
+
+async def test_rule_edit_refreshes_everyone(client, db_session, world):
+    resp = await client.post(
+        "/api/admin/rules",
+        json={
+            "unit_code": "unit_1",
+            "attribute_type": "race",
+            "tier": "S",
+            "options": ["phoenix"],
+            "labels": {"phoenix": "鳳凰"},
+        },
+    )
+    assert resp.status_code == 200
+
+    assert (await load_student_options(db_session, world["other"].id))["unit_1"]["race"]["options"] == ["phoenix"]
+    # the student's unit_1 is tier C: the S-only rule does not apply, so it falls back to defaults
+    assert "phoenix" not in (await load_student_options(db_session, world["student"].id))["unit_1"]["race"]["options"]
+
+
+async def test_refresh_replaces_stale_rows(db_session, world):
+    student = world["student"]
+    db_session.add(StudentUnitOptions(student_id=student.id, unit_code="unit_6", options=json.dumps({"x": 1})))
+    await db_session.commit()
+
+    await refresh_student_options(db_session, [student.id])
+    await db_session.commit()
+    codes = (
+        await db_session.execute(
+            select(StudentUnitOptions.unit_code).where(StudentUnitOptions.student_id == student.id)
+        )
+    ).scalars().all()
+    assert sorted(codes) == ["unit_1", "unit_4"]
+
+
+async def test_startup_rebuild_skipped_until_rules_change(db_session, world):
+    # world already ran a full rebuild, which stamped the fingerprint
+    assert await refresh_stale_student_options(db_session) is False
+
+    db_session.add(AttributeRule(
+        unit_code="unit_1", attribute_type="race", tier="S",
+        options=json.dumps(["phoenix"]), labels=json.dumps({"phoenix": "鳳凰"}),
+    ))
+    await db_session.commit()
+    rule_snapshot.invalidate()  # seeded outside the app: a fresh process
+    assert await refresh_stale_student_options(db_session) is True
+    await db_session.commit()
+    assert (await load_student_options(db_session, world["other"].id))["unit_1"]["race"]["options"] == ["phoenix"]
+    assert await refresh_stale_student_options(db_session) is False
+
+
+async def test_startup_rebuild_runs_on_empty_table(db_session, world):
+    await db_session.execute(delete(StudentUnitOptions))
+    await db_session.commit()
+
+    assert await refresh_stale_student_options(db_session) is True
+    assert set(await load_student_options(db_session, world["student"].id)) == {"unit_1", "unit_4"}
+
+
+async def test_progress_computes_missing_rows_without_writing(client, db_session, world, auth_headers):
+    student = world["student"]
+    await db_session.execute(
+        delete(StudentUnitOptions).where(
+            StudentUnitOptions.student_id == student.id, StudentUnitOptions.unit_code == "unit_4"
+        )
+    )
+    await db_session.commit()
+
+    resp = await client.get("/progress", headers=auth_headers)
+    assert resp.status_code == 200
+
+    # the page did not write: the gap is left to the writers / startup refresh
+    assert set(await load_student_options(db_session, student.id)) == {"unit_1"}
+
+
+async def test_startup_refreshes_students_with_records_written_outside_the_app(db_session, world):
+    student, other, units = world["student"], world["other"], world["units"]
+    other_row_ids = sorted((
+        await db_session.execute(
+            select(StudentUnitOptions.id).where(StudentUnitOptions.student_id == other.id)
+        )
+    ).scalars())
+    # records from two hours ago, rows from one; then a seed script raises a quiz score
+    now = datetime.now(timezone.utc)
+    await db_session.execute(update(LearningRecord).values(updated_at=now - timedelta(hours=2)))
+    await db_session.execute(update(StudentUnitOptions).values(updated_at=now - timedelta(hours=1)))
+    await db_session.execute(
+        update(LearningRecord)
+        .where(LearningRecord.student_id == student.id, LearningRecord.unit_id == units[0].id)
+        .values(quiz_score=100, updated_at=now - timedelta(minutes=1))
+    )
+    await db_session.commit()
+
+    assert await refresh_stale_student_options(db_session) is True
+    await db_session.commit()
+    options = await load_student_options(db_session, student.id)
+    assert options["unit_1"] == await get_available_options("unit_1", 50, 50, 100, db=db_session)
+    # the other student's rows were not rewritten
+    assert sorted((
+        await db_session.execute(
+            select(StudentUnitOptions.id).where(StudentUnitOptions.student_id == other.id)
+        )
+    ).scalars()) == other_row_ids
+    assert await refresh_stale_student_options(db_session) is False
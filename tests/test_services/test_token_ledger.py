@@ -0,0 +1,96 @@
+"""Tests for the bulk token ledger writer and the grant endpoints using it."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+
+from app.dependencies import require_teacher
+from app.models.achievement import StudentAchievement
+from app.models.student import Student
+from app.models.token_transaction import TokenTransaction
+from app.services.token_ledger import Grant, apply_grants
+from main import app
+
+
+@pytest.fixture()
+async def students(db_session):
+    students = [
+        Student(email=f"s{i}@example.com", student_id=f"S{i}", name=f"學生{i}", tokens=5)
+        for i in range(3)
+    ]
+    db_session.add_all(students)
+    await db_session.commit()
+    return students
+
+
+async def test_apply_grants_links_achievements_and_updates_balances(
+    db_session, students, assert_max_queries
+):
+    s0, s1, s2 = students
+    grants = [
+        Grant(s0.id, 10, "完成第1章前測", "chapter_1_pretest"),
+        Grant(s0.id, 10, "完成第1章學習", "chapter_1_complete"),
+        Grant(s1.id, 20, "期中問卷", "survey_mid"),
+        Grant(s2.id, 3, "加分"),
+    ]
+    # ledger insert + achievement insert + one UPDATE per distinct total (20, 3)
+    with assert_max_queries(4):
+        tx_ids = await apply_grants(db_session, grants)
+    await db_session.commit()
+
+    assert s0.tokens == 25 and s1.tokens == 25 and s2.tokens == 8  # session objects synced
+
+    txs = {
+        tx.id: tx for tx in (await db_session.execute(select(TokenTransaction))).scalars()
+    }
+    assert [(txs[i].student_id, txs[i].amount, txs[i].reason) for i in tx_ids] == [
+        (g.student_pk, g.amount, g.reason) for g in grants
+    ]
+    achievements = (await db_session.execute(select(StudentAchievement))).scalars().all()
+    assert {(a.student_id, a.achievement_key, a.token_transaction_id) for a in achievements} == {
+        (s0.id, "chapter_1_pretest", tx_ids[0]),
+        (s0.id, "chapter_1_complete", tx_ids[1]),
+        (s1.id, "survey_mid", tx_ids[2]),
+    }
+
+
+async def test_apply_grants_empty_is_noop(db_session, assert_max_queries):
+    with assert_max_queries(0):
+        assert await apply_grants(db_session, []) == []
+
+
+@pytest.fixture()
+async def teacher(db_session):
+    teacher = Student(email="t@example.com", student_id="T001", name="老師", role="teacher")
+    db_session.add(teacher)
+    await db_session.commit()
+    app.dependency_overrides[require_teacher] = lambda: teacher
+    yield teacher
+    app.dependency_overrides.pop(require_teacher, None)
+
+
+async def test_batch_tokens_skips_students_with_the_achievement(
+    client, db_session, students, teacher
+):
+    s0, s1, s2 = students
+    await apply_grants(db_session, [Grant(s0.id, 20, "完成期中問卷", "survey_mid")])
+    await db_session.commit()
+
+    resp = await client.post("/api/admin/students/batch-tokens", json={
+        "student_ids": [s.id for s in students],
+        "amount": 20,
+        "achievement_key": "survey_mid",
+    })
+    assert resp.status_code == 200
+    data = resp.json()
+    assert (data["updated"], data["skipped"], data["skipped_names"]) == (2, 1, ["學生0"])
+
+    balances = dict((await db_session.execute(
+        select(Student.id, Student.tokens).where(Student.role == "student")
+    )).all())
+    assert balances == {s0.id: 25, s1.id: 25, s2.id: 25}
+    count = len((await db_session.execute(
+        select(StudentAchievement).where(StudentAchievement.achievement_key == "survey_mid")
+    )).all())
+    assert count == 3
@@ -0,0 +1,76 @@
+"""Tests for the SQLite connection pragmas, WAL checkpointing and admin view."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.dependencies import require_admin, require_teacher
+from app.models.student import Student
+from app.sqlite_tuning import (
+    WalCheckpointScheduler,
+    configured_pragmas,
+    install_sqlite_pragmas,
+)
+from main import app
+
+
+@pytest.fixture()
+async def file_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}")
+    install_sqlite_pragmas(engine)
+    yield engine
+    await engine.dispose()
+
+
+async def test_pragmas_applied_on_connect(file_engine):
+    async with file_engine.connect() as conn:
+        journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+        busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        temp_store = (await conn.execute(text("PRAGMA temp_store"))).scalar()
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == configured_pragmas()["busy_timeout"]
+    assert temp_store == 2  # MEMORY
+
+
+def test_invalid_pragma_value_rejected(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "SQLITE_JOURNAL_MODE", "wal; DROP TABLE students")
+    with pytest.raises(ValueError):
+        configured_pragmas()
+
+
+async def test_checkpoint_truncates_wal(file_engine, tmp_path):
+    async with file_engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        await conn.execute(text("INSERT INTO t VALUES (1), (2), (3)"))
+
+    scheduler = WalCheckpointScheduler(file_engine, interval=60)
+    result = await scheduler.checkpoint("TRUNCATE")
+    assert result["busy"] == 0
+    assert (tmp_path / "tuned.db-wal").stat().st_size == 0
+    assert scheduler.status()["last_result"] == result
+
+
+async def test_admin_sqlite_status(client, db_session):
+    admin = Student(email="admin@example.com", student_id="A001", name="Admin", role="admin")
+    db_session.add(admin)
+    await db_session.commit()
+
+    app.dependency_overrides[require_admin] = lambda: admin
+    app.dependency_overrides[require_teacher] = lambda: admin
+    try:
+        resp = await client.get("/api/admin/sqlite")
+        page = await client.get("/admin")
+    finally:
+        app.dependency_overrides.pop(require_admin, None)
+        app.dependency_overrides.pop(require_teacher, None)
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert set(body["pragmas"]) >= {"journal_mode", "busy_timeout", "mmap_size"}
+    assert body["db_path"] is None  # in-memory test database
+    assert page.status_code == 200
+    assert "資料庫狀態" in page.text